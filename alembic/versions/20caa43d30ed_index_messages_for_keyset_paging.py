@@ -0,0 +1,29 @@
+"""Index messages for keyset paging
+
+Revision ID: 20caa43d30ed
+Revises: fea4a4d83c8e
+Create Date: 2026-10-18 10:37:51.882160
+
+Databases created by the app's create_all may already have it, hence IF NOT EXISTS.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20caa43d30ed'
+down_revision: Union[str, Sequence[str], None] = 'fea4a4d83c8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE INDEX IF NOT EXISTS idx_messages_match_created ON messages (match_id, created_at, id)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS idx_messages_match_created")
@@ -0,0 +1,29 @@
+"""Add a row version to users
+
+Revision ID: 431be79aa636
+Revises: f389ff8c5d20
+Create Date: 2026-10-18 10:42:48.771845
+
+Existing rows start at version 1, the same as new ones.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '431be79aa636'
+down_revision: Union[str, Sequence[str], None] = 'f389ff8c5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE users DROP COLUMN IF EXISTS version")
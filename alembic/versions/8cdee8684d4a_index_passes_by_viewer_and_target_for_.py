@@ -0,0 +1,29 @@
+"""Index passes by viewer and target for the discovery anti-join
+
+Revision ID: 8cdee8684d4a
+Revises:
+Create Date: 2026-10-18 10:28:15.771371
+
+Databases created by the app's create_all may already have it, hence IF NOT EXISTS.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8cdee8684d4a'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE INDEX IF NOT EXISTS idx_passes_from_to ON passes (from_user_id, to_user_id)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS idx_passes_from_to")
@@ -0,0 +1,38 @@
+"""Add discovery preferences to users
+
+Revision ID: 902412936463
+Revises: 8cdee8684d4a
+Create Date: 2026-10-18 10:41:07.112508
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '902412936463'
+down_revision: Union[str, Sequence[str], None] = '8cdee8684d4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        ALTER TABLE users
+            ADD COLUMN IF NOT EXISTS preferred_gender JSONB DEFAULT '[]'::jsonb,
+            ADD COLUMN IF NOT EXISTS preferred_age_min INTEGER,
+            ADD COLUMN IF NOT EXISTS preferred_age_max INTEGER
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        ALTER TABLE users
+            DROP COLUMN IF EXISTS preferred_age_max,
+            DROP COLUMN IF EXISTS preferred_age_min,
+            DROP COLUMN IF EXISTS preferred_gender
+    """)
@@ -0,0 +1,139 @@
+"""Dedupe likes and matches and enforce one per pair
+
+Revision ID: b64fb334cdb3
+Revises: 902412936463
+Create Date: 2026-10-18 10:34:40.719558
+
+The oldest like or match for each pair is kept. Messages on a duplicate match
+move to the kept one. record_likes is copied here as it stood at this revision,
+so later edits to models_pg.RECORD_LIKES_FUNCTION don't rewrite history.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b64fb334cdb3'
+down_revision: Union[str, Sequence[str], None] = '902412936463'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+RECORD_LIKES_FUNCTION = """
+CREATE OR REPLACE FUNCTION record_likes(
+    p_from_user_id VARCHAR,
+    p_to_user_ids VARCHAR[],
+    p_liked_elements VARCHAR[],
+    p_comments TEXT[]
+) RETURNS TABLE (liked_user_id VARCHAR, match_id VARCHAR, created BOOLEAN) AS $$
+#variable_conflict use_column
+BEGIN
+    -- Lock pairs in a fixed order so overlapping batches cannot deadlock
+    PERFORM pg_advisory_xact_lock(pairs.pair_key)
+    FROM (
+        SELECT DISTINCT hashtextextended(least(p_from_user_id, t) || ':' || greatest(p_from_user_id, t), 0) AS pair_key
+        FROM unnest(p_to_user_ids) AS t
+        ORDER BY pair_key
+    ) AS pairs;
+
+    INSERT INTO likes (id, from_user_id, to_user_id, liked_element, comment, created_at)
+    SELECT gen_random_uuid()::text, p_from_user_id, s.to_id, s.element, s.comment, now()
+    FROM unnest(p_to_user_ids, p_liked_elements, p_comments) AS s(to_id, element, comment)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM likes l WHERE l.from_user_id = p_from_user_id AND l.to_user_id = s.to_id
+    )
+    ON CONFLICT DO NOTHING;
+
+    RETURN QUERY
+    WITH mutual AS (
+        SELECT s.to_id, s.element
+        FROM unnest(p_to_user_ids, p_liked_elements) AS s(to_id, element)
+        WHERE EXISTS (
+            SELECT 1 FROM likes l WHERE l.from_user_id = s.to_id AND l.to_user_id = p_from_user_id
+        )
+    ),
+    existing AS (
+        SELECT mu.to_id, m.id
+        FROM mutual mu
+        JOIN matches m
+          ON least(m.user1_id, m.user2_id) = least(p_from_user_id, mu.to_id)
+         AND greatest(m.user1_id, m.user2_id) = greatest(p_from_user_id, mu.to_id)
+    ),
+    inserted AS (
+        INSERT INTO matches (id, user1_id, user2_id, match_context, created_at, is_active)
+        SELECT gen_random_uuid()::text, p_from_user_id, mu.to_id, mu.element, now(), true
+        FROM mutual mu
+        WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.to_id = mu.to_id)
+        ON CONFLICT DO NOTHING
+        RETURNING user2_id, id
+    )
+    SELECT i.user2_id, i.id, true FROM inserted i
+    UNION ALL
+    SELECT e.to_id, e.id, false FROM existing e;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        DELETE FROM likes WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY from_user_id, to_user_id ORDER BY created_at NULLS LAST, id
+                ) AS n
+                FROM likes
+            ) AS ranked
+            WHERE n > 1
+        )
+    """)
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_likes_from_to ON likes (from_user_id, to_user_id)")
+
+    op.execute("""
+        CREATE TEMPORARY TABLE duplicate_matches AS
+        SELECT id, keep_id FROM (
+            SELECT id, first_value(id) OVER pair AS keep_id, row_number() OVER pair AS n
+            FROM matches
+            WINDOW pair AS (
+                PARTITION BY least(user1_id, user2_id), greatest(user1_id, user2_id)
+                ORDER BY created_at NULLS LAST, id
+            )
+        ) AS ranked
+        WHERE n > 1
+    """)
+    op.execute("""
+        UPDATE messages SET match_id = d.keep_id
+        FROM duplicate_matches d
+        WHERE messages.match_id = d.id
+    """)
+    op.execute("""
+        UPDATE matches m SET last_message_at = merged.last_message_at
+        FROM (
+            SELECT d.keep_id, max(dm.last_message_at) AS last_message_at
+            FROM duplicate_matches d
+            JOIN matches dm ON dm.id = d.id
+            GROUP BY d.keep_id
+        ) AS merged
+        WHERE m.id = merged.keep_id
+          AND merged.last_message_at > COALESCE(m.last_message_at, '-infinity')
+    """)
+    op.execute("DELETE FROM matches WHERE id IN (SELECT id FROM duplicate_matches)")
+    op.execute("DROP TABLE duplicate_matches")
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_matches_pair
+        ON matches (least(user1_id, user2_id), greatest(user1_id, user2_id))
+    """)
+
+    op.execute(RECORD_LIKES_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS record_likes(VARCHAR, VARCHAR[], VARCHAR[], TEXT[])")
+    op.execute("DROP INDEX IF EXISTS uq_matches_pair")
+    # create_all builds this one as a constraint, the migration as a plain index
+    op.execute("ALTER TABLE likes DROP CONSTRAINT IF EXISTS uq_likes_from_to")
+    op.execute("DROP INDEX IF EXISTS uq_likes_from_to")
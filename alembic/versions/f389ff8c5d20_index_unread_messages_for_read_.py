@@ -0,0 +1,32 @@
+"""Index unread messages for read acknowledgements
+
+Revision ID: f389ff8c5d20
+Revises: 20caa43d30ed
+Create Date: 2026-10-18 10:38:37.373433
+
+Databases created by the app's create_all may already have it, hence IF NOT EXISTS.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f389ff8c5d20'
+down_revision: Union[str, Sequence[str], None] = '20caa43d30ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_unread
+        ON messages (match_id, receiver_id, created_at) WHERE viewed = false
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS idx_messages_unread")
@@ -0,0 +1,50 @@
+"""Add inbox summary columns to matches
+
+Revision ID: fea4a4d83c8e
+Revises: b64fb334cdb3
+Create Date: 2026-10-18 10:35:43.941157
+
+The summaries themselves are filled in by the app's startup backfill.
+Inbox indexes from an earlier create_all were ascending and are rebuilt.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fea4a4d83c8e'
+down_revision: Union[str, Sequence[str], None] = 'b64fb334cdb3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        ALTER TABLE matches
+            ADD COLUMN IF NOT EXISTS last_message_id VARCHAR(36),
+            ADD COLUMN IF NOT EXISTS last_message_preview VARCHAR(200),
+            ADD COLUMN IF NOT EXISTS last_sender_id VARCHAR(36),
+            ADD COLUMN IF NOT EXISTS user1_unread_count INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS user2_unread_count INTEGER NOT NULL DEFAULT 0
+    """)
+    op.execute("DROP INDEX IF EXISTS idx_matches_user1_inbox")
+    op.execute("DROP INDEX IF EXISTS idx_matches_user2_inbox")
+    op.execute("CREATE INDEX idx_matches_user1_inbox ON matches (user1_id, last_message_at DESC NULLS LAST, created_at DESC)")
+    op.execute("CREATE INDEX idx_matches_user2_inbox ON matches (user2_id, last_message_at DESC NULLS LAST, created_at DESC)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS idx_matches_user2_inbox")
+    op.execute("DROP INDEX IF EXISTS idx_matches_user1_inbox")
+    op.execute("""
+        ALTER TABLE matches
+            DROP COLUMN IF EXISTS user2_unread_count,
+            DROP COLUMN IF EXISTS user1_unread_count,
+            DROP COLUMN IF EXISTS last_sender_id,
+            DROP COLUMN IF EXISTS last_message_preview,
+            DROP COLUMN IF EXISTS last_message_id
+    """)
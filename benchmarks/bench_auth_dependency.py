@@ -0,0 +1,53 @@
+"""
+Per-request overhead of the get_current_user dependency with and without the
+verified-token cache. Calls the dependency directly; no server or database
+needed.
+
+    python benchmarks/bench_auth_dependency.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from utils import dependencies
+from utils.auth import create_access_token, decode_token
+from utils.cache import VerifiedTokenCache
+
+USERS = 1_000
+REQUESTS = 100_000
+
+
+async def per_request_us(credentials):
+    started = time.perf_counter()
+    for n in range(REQUESTS):
+        await dependencies.get_current_user(credentials[n % len(credentials)])
+    return (time.perf_counter() - started) / REQUESTS * 1_000_000
+
+
+def main():
+    credentials = [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=create_access_token({"sub": f"user-{i}", "email": f"user-{i}@bench.local", "role": "baby"}),
+        )
+        for i in range(USERS)
+    ]
+
+    print(f"{REQUESTS} requests from {USERS} users")
+    dependencies.token_cache = VerifiedTokenCache(decode_token, max_entries=0)
+    uncached = asyncio.run(per_request_us(credentials))
+    print(f"{'jwt.decode every request':<26} {uncached:>7.2f} us/request")
+
+    dependencies.token_cache = VerifiedTokenCache(decode_token, max_entries=USERS * 2)
+    cached = asyncio.run(per_request_us(credentials))
+    print(f"{'verified-token cache':<26} {cached:>7.2f} us/request  ({uncached / cached:.1f}x)")
+    print(f"cache: {dependencies.token_cache.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Discovery feed latency vs. swipe history size.
+
+Seeds a throwaway viewer into the database configured by DATABASE_URL, grows
+its like/pass history from 0 to 100k rows and times the legacy NOT IN feed
+query against the NOT EXISTS anti-join used by /api/discovery/feed.
+All seeded rows are removed at the end.
+
+    python benchmarks/bench_discovery_feed.py
+"""
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select, and_, text
+
+from database import AsyncSessionLocal, engine, Base
+from models_pg import User, Like, Pass
+from server import discovery_feed_query
+
+HISTORY_SIZES = [0, 1_000, 10_000, 100_000]
+CANDIDATES = 1_000
+RUNS = 25
+PREFIX = f"bench-feed-{uuid.uuid4().hex[:8]}"
+
+
+def legacy_feed_query(user, excluded_ids):
+    return select(User.id).where(
+        and_(
+            User.id.notin_(excluded_ids),
+            User.is_banned == False,
+            User.role.in_(["daddy", "mommy"])
+        )
+    ).limit(20)
+
+
+async def seed_users(db, count, role, tag):
+    await db.execute(text("""
+        INSERT INTO users (id, email, password_hash, role, first_name, is_banned,
+                           photos, prompts, lifestyle_tags, created_at, last_active)
+        SELECT :prefix || '-' || :tag || '-' || g, :prefix || '-' || :tag || '-' || g || '@bench.local',
+               'x', :role, 'Bench', false, '[]', '[]', '[]', now(), now()
+        FROM generate_series(1, :count) AS g
+    """), {"prefix": PREFIX, "tag": tag, "role": role, "count": count})
+
+
+async def grow_history(db, viewer_id, start, stop):
+    # Alternate likes and passes over the swiped-on population
+    await db.execute(text("""
+        INSERT INTO likes (id, from_user_id, to_user_id, liked_element, created_at)
+        SELECT gen_random_uuid()::text, :viewer, :prefix || '-swiped-' || g, 'profile', now()
+        FROM generate_series(:start, :stop) AS g WHERE g % 2 = 0
+    """), {"viewer": viewer_id, "prefix": PREFIX, "start": start + 1, "stop": stop})
+    await db.execute(text("""
+        INSERT INTO passes (id, from_user_id, to_user_id, created_at)
+        SELECT gen_random_uuid()::text, :viewer, :prefix || '-swiped-' || g, now()
+        FROM generate_series(:start, :stop) AS g WHERE g % 2 = 1
+    """), {"viewer": viewer_id, "prefix": PREFIX, "start": start + 1, "stop": stop})
+
+
+async def time_query(build):
+    samples = []
+    for _ in range(RUNS):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            query = await build(db)
+            (await db.execute(query)).scalars().all()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), sorted(samples)[int(RUNS * 0.95) - 1]
+
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    viewer_id = f"{PREFIX}-viewer"
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("""
+            INSERT INTO users (id, email, password_hash, role, first_name, is_banned, created_at, last_active)
+            VALUES (:id, :id || '@bench.local', 'x', 'baby', 'Viewer', false, now(), now())
+        """), {"id": viewer_id})
+        await seed_users(db, CANDIDATES, "daddy", "candidate")
+        await seed_users(db, max(HISTORY_SIZES), "daddy", "swiped")
+        await db.commit()
+
+    try:
+        print(f"{'history':>10} {'legacy p50':>12} {'legacy p95':>12} {'anti-join p50':>14} {'anti-join p95':>14}")
+        grown = 0
+        for size in HISTORY_SIZES:
+            async with AsyncSessionLocal() as db:
+                if size > grown:
+                    await grow_history(db, viewer_id, grown, size)
+                    grown = size
+                await db.commit()
+            async with engine.connect() as conn:
+                await conn.execute(text("ANALYZE users, likes, passes"))
+
+            async with AsyncSessionLocal() as db:
+                viewer = (await db.execute(select(User).where(User.id == viewer_id))).scalar_one()
+
+            async def legacy(db):
+                liked = (await db.execute(select(Like.to_user_id).where(Like.from_user_id == viewer_id))).scalars().all()
+                passed = (await db.execute(select(Pass.to_user_id).where(Pass.from_user_id == viewer_id))).scalars().all()
+                return legacy_feed_query(viewer, [viewer_id] + list(liked) + list(passed))
+
+            async def anti_join(db):
+                return discovery_feed_query(viewer)
+
+            legacy_p50, legacy_p95 = await time_query(legacy)
+            anti_p50, anti_p95 = await time_query(anti_join)
+            print(f"{size:>10} {legacy_p50:>10.2f}ms {legacy_p95:>10.2f}ms {anti_p50:>12.2f}ms {anti_p95:>12.2f}ms")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("DELETE FROM users WHERE id LIKE :prefix"), {"prefix": f"{PREFIX}-%"})
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
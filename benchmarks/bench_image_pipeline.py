@@ -0,0 +1,93 @@
+"""
+Photo rendition jobs run inline on the event loop vs. on the process pool,
+measured by how late a 5 ms ticker on the loop fires while 16 phone-size
+photos (3024x4032 JPEG) are processed, plus what each rendition weighs
+against the original the feed used to send. Writes to a temporary
+directory; no database or server needed.
+
+    python benchmarks/bench_image_pipeline.py
+"""
+import asyncio
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.image_pipeline import DERIVATIVE_SIZES, ImagePipeline
+from utils.media_store import LocalObjectStore
+
+PHOTOS = 16
+TICK = 0.005
+
+
+def phone_photo(seed):
+    # Smooth noise scaled up compresses like a real photo rather than static
+    small = Image.merge("RGB", [Image.effect_noise((378, 504), 60 + seed + band) for band in range(3)])
+    buffer = io.BytesIO()
+    small.resize((3024, 4032), Image.BILINEAR).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def one_chunk(data):
+    yield data
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - started - TICK) * 1000)
+
+
+async def run(label, root, photos, workers):
+    store = LocalObjectStore(root / label)
+    store.start()
+    keys = [(await store.put(one_chunk(photo), "jpg")).key for photo in photos]
+    pipeline = ImagePipeline(store, workers=workers)
+    pipeline.start()
+    # Let the pool's processes come up before timing
+    await asyncio.sleep(0.5)
+
+    lags, stop = [], asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    started = time.perf_counter()
+    for key in keys:
+        pipeline.submit(key)
+    await pipeline.drain()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick_task
+    await pipeline.stop()
+
+    lags.sort()
+    print(
+        f"{label:<8} {elapsed:>7.2f}s {PHOTOS / elapsed:>8.1f}/s "
+        f"{lags[len(lags) // 2]:>8.1f}ms {lags[int(len(lags) * 0.99)]:>8.1f}ms {lags[-1]:>8.1f}ms"
+    )
+    return store, keys
+
+
+async def main():
+    photos = [phone_photo(n) for n in range(PHOTOS)]
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        print(f"{PHOTOS} photos, 3024x4032 JPEG; event-loop ticker every {TICK * 1000:.0f}ms")
+        print(f"{'mode':<8} {'elapsed':>8} {'photos':>9} {'lag p50':>10} {'lag p99':>10} {'lag max':>10}")
+        await run("inline", root, photos, workers=0)
+        store, keys = await run("pool", root, photos, workers=2)
+
+        original = sum(len(photo) for photo in photos) / PHOTOS
+        print(f"\naverage bytes per photo: original {original / 1024:.0f} KB", end="")
+        for name in DERIVATIVE_SIZES:
+            size = sum(store.derivative_path(key, name).stat().st_size for key in keys) / PHOTOS
+            print(f", {name} {size / 1024:.1f} KB", end="")
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Discovery feed latency during a login storm.
+
+Runs against a live backend (REACT_APP_BACKEND_URL, default
+http://localhost:8001). Signs up two throwaway accounts, measures
+/api/discovery/feed latency on its own, then again while a crowd of
+concurrent clients keeps logging in. Start the server once with
+PASSWORD_HASH_WORKERS=0 (bcrypt on the event loop, the old behaviour) and
+once with the default pool to compare before and after.
+
+    PASSWORD_HASH_WORKERS=0 uvicorn server:app --port 8001   # before
+    uvicorn server:app --port 8001                           # after
+    python benchmarks/bench_login_storm.py
+"""
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+import httpx
+
+BASE_URL = os.environ.get("REACT_APP_BACKEND_URL", "http://localhost:8001").rstrip("/")
+PHASE_SECONDS = 10
+LOGIN_CONCURRENCY = 32
+PASSWORD = "BenchPass123!"
+PREFIX = f"bench-storm-{uuid.uuid4().hex[:8]}"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def signup(client, name, role):
+    response = await client.post("/api/auth/signup", json={
+        "email": f"{PREFIX}-{name}@bench.local",
+        "phone": "+27821234567",
+        "password": PASSWORD,
+        "role": role,
+        "first_name": "Bench",
+    })
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+async def measure_feed(client, token, stop_at):
+    samples = []
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await client.get("/api/discovery/feed", headers=headers)
+        response.raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def storm_logins(client, stop_at, outcomes):
+    credentials = {"email": f"{PREFIX}-storm@bench.local", "password": PASSWORD}
+    while time.perf_counter() < stop_at:
+        response = await client.post("/api/auth/login", json=credentials)
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+
+def report(label, samples):
+    print(
+        f"{label:<14} {len(samples):>8} {statistics.median(samples):>8.1f}ms "
+        f"{percentile(samples, 95):>8.1f}ms {percentile(samples, 99):>8.1f}ms"
+    )
+
+
+async def main():
+    limits = httpx.Limits(max_connections=LOGIN_CONCURRENCY + 4)
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60, limits=limits) as client:
+        feed_token = await signup(client, "viewer", "baby")
+        await signup(client, "storm", "daddy")
+
+        print(f"{'phase':<14} {'requests':>8} {'p50':>10} {'p95':>10} {'p99':>10}")
+        quiet = await measure_feed(client, feed_token, time.perf_counter() + PHASE_SECONDS)
+        report("quiet", quiet)
+
+        outcomes = {}
+        stop_at = time.perf_counter() + PHASE_SECONDS
+        stormers = [asyncio.create_task(storm_logins(client, stop_at, outcomes)) for _ in range(LOGIN_CONCURRENCY)]
+        during = await measure_feed(client, feed_token, stop_at)
+        await asyncio.gather(*stormers)
+        report("login storm", during)
+
+        print(f"logins: {outcomes.get(200, 0)} ok, {outcomes.get(503, 0)} shed (503), "
+              f"{sum(n for status, n in outcomes.items() if status not in (200, 503))} other")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
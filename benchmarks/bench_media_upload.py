@@ -0,0 +1,73 @@
+"""
+Concurrent large video uploads into the media store: streamed in 1 MB
+chunks vs. reading each upload into memory first (what `await file.read()`
+in the handler would do). Reports throughput and peak Python memory. A
+third pass re-uploads the same videos to show deduplication. Writes to a
+temporary directory; no database or server needed.
+
+    python benchmarks/bench_media_upload.py
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.media_store import CHUNK_SIZE, LocalObjectStore
+
+UPLOADS = 8
+UPLOAD_MB = 64
+MAX_BYTES = 100 * 1024 * 1024
+BLOCK = os.urandom(CHUNK_SIZE)
+
+
+async def video_chunks(n):
+    # A distinct first chunk per upload so only the dedup pass shares content
+    yield n.to_bytes(8, "big") + BLOCK[8:]
+    for _ in range(UPLOAD_MB - 1):
+        yield BLOCK
+        await asyncio.sleep(0)
+
+
+async def streamed(store, n):
+    await store.put(video_chunks(n), "mp4", max_bytes=MAX_BYTES)
+
+
+async def buffered(root, n):
+    data = b"".join([chunk async for chunk in video_chunks(n)])
+    digest = hashlib.sha256(data).hexdigest()
+    await asyncio.to_thread((root / f"{digest}.mp4").write_bytes, data)
+
+
+async def run(label, upload):
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(upload(n) for n in range(UPLOADS)))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {UPLOADS * UPLOAD_MB / elapsed:>8.0f} MB/s {elapsed:>8.2f}s {peak / 1024 / 1024:>10.1f} MB")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalObjectStore(Path(tmp) / "store")
+        store.start()
+        buffered_root = Path(tmp) / "buffered"
+        buffered_root.mkdir()
+
+        print(f"{UPLOADS} concurrent uploads of {UPLOAD_MB} MB")
+        print(f"{'mode':<12} {'throughput':>13} {'elapsed':>9} {'peak memory':>13}")
+        await run("buffered", lambda n: buffered(buffered_root, n))
+        await run("streamed", lambda n: streamed(store, n))
+        await run("dedup", lambda n: streamed(store, n))
+        print(f"store: {store.metrics()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
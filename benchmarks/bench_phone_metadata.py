@@ -0,0 +1,83 @@
+"""
+Phone-number geolocation at signup on a cold worker vs. a warmed one.
+
+Each mode runs in a fresh interpreter so the lazily loaded geocoder and
+carrier tables start unloaded. "cold" looks numbers up as signups arrive;
+"warm" runs the startup warm-up first. Signups come from 200 regions with
+random subscriber digits, so the per-number memo rarely hits and the
+numbers measure the table loads themselves. No database needed.
+
+    python benchmarks/bench_phone_metadata.py
+"""
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+REGIONS = 200
+SIGNUPS = 2000
+
+
+def signup_numbers():
+    import phonenumbers
+    from phonenumbers import PhoneNumberType
+
+    rng = random.Random(7)
+    regions = sorted(phonenumbers.SUPPORTED_REGIONS)
+    examples = []
+    for region in rng.sample(regions, REGIONS):
+        example = phonenumbers.example_number_for_type(region, PhoneNumberType.MOBILE)
+        if example is not None:
+            examples.append(phonenumbers.format_number(example, phonenumbers.PhoneNumberFormat.E164))
+    return [
+        rng.choice(examples)[:-3] + f"{rng.randrange(1000):03d}"
+        for _ in range(SIGNUPS)
+    ]
+
+
+def run_mode(mode, numbers):
+    from utils.phone_metadata import PhoneMetadataService
+
+    service = PhoneMetadataService()
+    warmup = 0.0
+    if mode == "warm":
+        started = time.perf_counter()
+        service.warm()
+        warmup = time.perf_counter() - started
+
+    samples = []
+    for number in numbers:
+        started = time.perf_counter()
+        service.lookup_sync(number)
+        samples.append((time.perf_counter() - started) * 1000)
+    print(json.dumps({"samples": samples, "warmup": warmup}))
+
+
+def main():
+    # Generated here: building examples would load the child's metadata early
+    numbers = signup_numbers()
+    print(f"{'mode':<6} {'warm-up':>9} {'p50':>9} {'p99':>9} {'max':>9} {'total':>10}")
+    for mode in ("cold", "warm"):
+        output = subprocess.run(
+            [sys.executable, __file__, mode], input=json.dumps(numbers),
+            capture_output=True, text=True, check=True, cwd=ROOT
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples = sorted(result["samples"])
+        print(
+            f"{mode:<6} {result['warmup'] * 1000:>7.0f}ms {statistics.median(samples):>7.3f}ms "
+            f"{samples[int(len(samples) * 0.99)]:>7.2f}ms {samples[-1]:>7.2f}ms {sum(samples):>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_mode(sys.argv[1], json.loads(sys.stdin.read()))
+    else:
+        main()
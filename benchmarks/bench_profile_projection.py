@@ -0,0 +1,109 @@
+"""
+Before/after for column-projected profile reads.
+
+Seeds throwaway users with realistic photos and prompts into the database
+configured by DATABASE_URL, then compares full `select(User)` ORM loads with
+the projections used by the discovery feed, matches list and admin listing:
+wall time, peak Python memory and bytes received from Postgres.
+All seeded rows are removed at the end.
+
+    python benchmarks/bench_profile_projection.py
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select, insert, delete
+
+from database import AsyncSessionLocal, engine, Base
+from models_pg import User
+from utils.profile_cards import PROFILE_CARD, MATCH_CARD, ADMIN_USER_ROW
+
+USERS = 2_000
+RUNS = 10
+PREFIX = f"bench-cards-{uuid.uuid4().hex[:8]}"
+# Photos are stored as data URLs by the profile editor
+PHOTO = "data:image/jpeg;base64," + "A" * 40_000
+
+
+def payload_bytes(rows):
+    total = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, (list, dict)):
+                total += len(json.dumps(value))
+            elif value is not None:
+                total += len(str(value))
+    return total
+
+
+def orm_row(user, fields):
+    return tuple(getattr(user, field) for field in fields)
+
+
+async def measure(load):
+    samples, peaks = [], []
+    for _ in range(RUNS):
+        async with AsyncSessionLocal() as db:
+            tracemalloc.start()
+            started = time.perf_counter()
+            rows = await load(db)
+            samples.append((time.perf_counter() - started) * 1000)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+            tracemalloc.stop()
+    return statistics.median(samples), max(peaks), payload_bytes(rows) / 1024 / 1024
+
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {
+                "id": f"{PREFIX}-{i}", "email": f"{PREFIX}-{i}@bench.local", "phone": "+27821234567",
+                "password_hash": "$2b$12$" + "x" * 53, "role": "daddy", "first_name": f"Bench {i}",
+                "age": 30 + i % 30, "gender": "male", "location": "Cape Town", "email_otp": "123456",
+                "photos": [PHOTO] * (i % 6), "lifestyle_tags": ["Fine Dining", "Golf"],
+                "prompts": [{"question": "I spoil by...", "answer": "x" * 200}] * 3,
+                "created_at": now, "last_active": now,
+            }
+            for i in range(USERS)
+        ])
+        await db.commit()
+
+    ids = [f"{PREFIX}-{i}" for i in range(USERS)]
+    columns = [column.key for column in User.__table__.columns]
+    cases = [("discovery feed", PROFILE_CARD), ("matches list", MATCH_CARD), ("admin listing", ADMIN_USER_ROW)]
+    try:
+        print(f"{'endpoint':<16} {'read':<10} {'p50':>9} {'peak mem':>10} {'payload':>10}")
+        async def full(db):
+            result = await db.execute(select(User).where(User.id.in_(ids)))
+            return [orm_row(user, columns) for user in result.scalars().all()]
+
+        for name, projection in cases:
+            async def projected(db):
+                result = await db.execute(projection.select().where(User.id.in_(ids)))
+                return result.all()
+
+            for label, load in (("ORM", full), ("projected", projected)):
+                p50, peak, payload = await measure(load)
+                print(f"{name:<16} {label:<10} {p50:>7.1f}ms {peak:>8.1f}MB {payload:>8.1f}MB")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id.like(f"{PREFIX}-%")))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
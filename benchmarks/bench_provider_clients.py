@@ -0,0 +1,88 @@
+"""
+OTP provider calls with a new HTTP client per call (the old per-call Twilio
+Client behaviour) vs. the shared keep-alive clients from the provider
+registry. Runs against the local provider stub; no credentials or network
+needed.
+
+    python benchmarks/bench_provider_clients.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.provider_stub import ProviderStub
+from utils.notifications import Notification, ResendEmailProvider, TwilioVerifyProvider
+from utils.provider_clients import ProviderClientRegistry
+
+SENDS = 500
+CONCURRENCY = 20
+STUB_LATENCY = 0.005
+
+
+def build_providers(clients, base_url):
+    return [
+        ResendEmailProvider(clients, "re_bench", "bench@indulge.local", base_url=base_url, max_concurrency=CONCURRENCY),
+        TwilioVerifyProvider(clients, "ACbench", "token", "VAbench", base_url=base_url, max_concurrency=CONCURRENCY),
+    ]
+
+
+async def send_one(provider, n):
+    channel_to = f"user-{n}@bench.local" if provider.channel == "email" else f"+2782{n:07d}"
+    await provider.send(Notification(channel=provider.channel, to=channel_to, payload={"subject": "Code", "html": "123456"}))
+
+
+async def per_call(base_url, n):
+    clients = ProviderClientRegistry()
+    provider = build_providers(clients, base_url)[n % 2]
+    await clients.start()
+    try:
+        await send_one(provider, n)
+    finally:
+        await clients.close()
+
+
+async def run(label, stub, send):
+    stub.reset()
+    samples = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def timed(n):
+        async with semaphore:
+            started = time.perf_counter()
+            await send(n)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(n) for n in range(SENDS)))
+    elapsed = time.perf_counter() - started
+    samples.sort()
+    print(
+        f"{label:<18} {SENDS / elapsed:>8.0f}/s {samples[len(samples) // 2]:>7.2f}ms "
+        f"{samples[int(len(samples) * 0.99)]:>7.2f}ms {stub.connections:>12}"
+    )
+
+
+async def main():
+    stub = ProviderStub(latency=STUB_LATENCY)
+    port = await stub.start()
+    base_url = f"http://127.0.0.1:{port}"
+
+    pooled_clients = ProviderClientRegistry()
+    pooled = build_providers(pooled_clients, base_url)
+    await pooled_clients.start()
+
+    print(f"{SENDS} sends, {CONCURRENCY} concurrent, stub latency {STUB_LATENCY * 1000:.0f}ms")
+    print(f"{'mode':<18} {'throughput':>10} {'p50':>9} {'p99':>9} {'connections':>12}")
+    try:
+        await run("client per call", stub, lambda n: per_call(base_url, n))
+        await run("pooled registry", stub, lambda n: send_one(pooled[n % 2], n))
+    finally:
+        await pooled_clients.close()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
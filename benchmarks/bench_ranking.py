@@ -0,0 +1,114 @@
+"""
+Discovery ranking microbenchmark: vectorized NumPy scorer vs. a per-candidate
+pure-Python scorer over synthetic candidate batches. No database needed.
+
+    python benchmarks/bench_ranking.py
+"""
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+from utils.ranking import (
+    AGE_DISTANCE_SCALE, MAX_PHOTOS, RANKING_WEIGHTS, RECENCY_HALF_LIFE_HOURS,
+    CandidateBatch, ViewerPreferences, rank_candidates, score_candidates,
+)
+
+TAGS = [
+    "Luxury Travel", "Fine Dining", "Fitness", "Yachting", "Art", "Wine", "Fashion",
+    "Golf", "Business", "Shopping", "Spa Days", "Concerts", "Theatre", "Skiing",
+]
+BATCH_SIZES = [500, 2_000, 5_000]
+TOP_K = 200
+RUNS = 50
+
+
+def synthetic_rows(n, now):
+    rng = random.Random(n)
+    return [
+        (
+            f"candidate-{i}",
+            rng.choice([None] + list(range(18, 66))),
+            now - timedelta(hours=rng.expovariate(1 / 48)) if rng.random() > 0.05 else None,
+            rng.sample(TAGS, rng.randint(0, 6)),
+            rng.randint(0, 8),
+            rng.random() < 0.4,
+            rng.random() < 0.3,
+        )
+        for i in range(n)
+    ]
+
+
+def python_score(viewer, row, now):
+    _, age, last_active, tags, photos, video, voice = row
+    wanted = set(viewer.lifestyle_tags)
+    tag_score = len(wanted & set(tags)) / len(wanted) if wanted else 0.0
+
+    if last_active is None:
+        recency = 0.0
+    else:
+        hours_idle = max((now - last_active).total_seconds() / 3600.0, 0.0)
+        recency = 2 ** (-hours_idle / RECENCY_HALF_LIFE_HOURS)
+
+    if age is None:
+        age_score = 0.5
+    else:
+        low = viewer.preferred_age_min if viewer.preferred_age_min is not None else -math.inf
+        high = viewer.preferred_age_max if viewer.preferred_age_max is not None else math.inf
+        age_score = math.exp(-max(low - age, age - high, 0.0) / AGE_DISTANCE_SCALE)
+
+    media = 0.6 * min(photos, MAX_PHOTOS) / MAX_PHOTOS + 0.2 * video + 0.2 * voice
+
+    return (
+        RANKING_WEIGHTS["tags"] * tag_score
+        + RANKING_WEIGHTS["recency"] * recency
+        + RANKING_WEIGHTS["age"] * age_score
+        + RANKING_WEIGHTS["media"] * media
+    )
+
+
+def python_rank(viewer, rows, k, now):
+    scored = [(python_score(viewer, row, now), row[0]) for row in rows]
+    scored.sort(key=lambda pair: -pair[0])
+    return [candidate_id for _, candidate_id in scored[:k]]
+
+
+def timed(fn):
+    samples = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    now = datetime.now(timezone.utc)
+    viewer = ViewerPreferences(["Luxury Travel", "Fine Dining", "Fitness", "Art"], 25, 45)
+
+    print(f"{'batch':>7} {'build p50':>10} {'numpy p50':>10} {'numpy p95':>10} {'python p50':>11} {'python p95':>11} {'speedup':>8}")
+    for size in BATCH_SIZES:
+        rows = synthetic_rows(size, now)
+        batch = CandidateBatch.from_rows(rows)
+
+        expected = np.array([python_score(viewer, row, now) for row in rows])
+        assert np.allclose(score_candidates(viewer, batch, now), expected)
+
+        build_p50, _ = timed(lambda: CandidateBatch.from_rows(rows))
+        numpy_p50, numpy_p95 = timed(lambda: rank_candidates(viewer, batch, TOP_K, now))
+        python_p50, python_p95 = timed(lambda: python_rank(viewer, rows, TOP_K, now))
+        print(
+            f"{size:>7} {build_p50:>8.2f}ms {numpy_p50:>8.2f}ms {numpy_p95:>8.2f}ms "
+            f"{python_p50:>9.2f}ms {python_p95:>9.2f}ms {python_p50 / numpy_p50:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Local stand-in for the Resend and Twilio Verify REST APIs.
+
+Speaks just enough HTTP/1.1 (with keep-alive) to answer the calls the
+notification providers make, and counts connections and requests so
+connection reuse can be measured offline. Every code except 000000 is
+accepted by the verification check.
+
+    python benchmarks/provider_stub.py 8025
+    RESEND_API_URL=http://127.0.0.1:8025 TWILIO_VERIFY_API_URL=http://127.0.0.1:8025 uvicorn server:app
+"""
+import asyncio
+import json
+import sys
+import uuid
+from urllib.parse import parse_qs
+
+
+class ProviderStub:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+
+    def respond(self, method, path, body):
+        if method == "POST" and path == "/emails":
+            return 200, {"id": str(uuid.uuid4())}
+        if method == "POST" and path.startswith("/v2/Services/") and path.endswith("/Verifications"):
+            return 201, {"sid": "VE" + uuid.uuid4().hex, "status": "pending"}
+        if method == "POST" and path.startswith("/v2/Services/") and path.endswith("/VerificationCheck"):
+            code = parse_qs(body.decode()).get("Code", [""])[0]
+            return 200, {"status": "pending" if code == "000000" else "approved"}
+        return 404, {"message": "not found"}
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, payload = self.respond(method, path, body)
+                data = json.dumps(payload).encode()
+                close = headers.get("connection", "").lower() == "close"
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def main(port):
+    stub = ProviderStub()
+    await stub.start(port=port)
+    print(f"Provider stub listening on http://127.0.0.1:{port}")
+    while True:
+        await asyncio.sleep(10)
+        print(f"connections={stub.connections} requests={stub.requests}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 8025))
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
 import { 
@@ -9,6 +9,9 @@ import {
 import { useAuth } from '../contexts/AuthContext';
 import { api } from '../contexts/AuthContext';
 
+const PAGE_SIZE = 20;
+const PREFETCH_REMAINING = 5;
+
 const Discovery = () => {
   const navigate = useNavigate();
   const { user } = useAuth();
@@ -19,6 +22,10 @@ const Discovery = () => {
   const [showMatch, setShowMatch] = useState(false);
   const [matchedUser, setMatchedUser] = useState(null);
   const [activePhoto, setActivePhoto] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const prefetching = useRef(false);
+  const shownIndex = useRef(0);
+  shownIndex.current = currentIndex;
 
   useEffect(() => {
     fetchProfiles();
@@ -26,8 +33,9 @@ const Discovery = () => {
 
   const fetchProfiles = async () => {
     try {
-      const res = await api.get('/api/discovery/feed');
+      const res = await api.get('/api/discovery/feed', { params: { limit: PAGE_SIZE } });
       setProfiles(res.data.profiles || demoProfiles);
+      setNextCursor(res.data.next_cursor || null);
     } catch (err) {
       setProfiles(demoProfiles);
     } finally {
@@ -35,6 +43,28 @@ const Discovery = () => {
     }
   };
 
+  // Fetch the next page in the background while the user is still swiping
+  const prefetchNextPage = async () => {
+    if (!nextCursor || prefetching.current) return;
+    prefetching.current = true;
+    try {
+      const res = await api.get('/api/discovery/feed', { params: { cursor: nextCursor, limit: PAGE_SIZE } });
+      const page = res.data.profiles || [];
+      // A reset page starts the feed over: it replaces the cards not shown yet
+      setProfiles(prev => res.data.reset ? [...prev.slice(0, shownIndex.current + 1), ...page] : [...prev, ...page]);
+      setNextCursor(res.data.next_cursor || null);
+    } catch (err) {
+    } finally {
+      prefetching.current = false;
+    }
+  };
+
+  useEffect(() => {
+    if (profiles.length - currentIndex <= PREFETCH_REMAINING) {
+      prefetchNextPage();
+    }
+  }, [currentIndex, profiles.length, nextCursor]);
+
   const demoProfiles = [
     {
       id: 'demo1',
@@ -5,6 +5,9 @@ import { ArrowLeft, Send, Image, Smile, MoreVertical, Phone, Video, Shield } fro
 import { useAuth } from '../contexts/AuthContext';
 import { api } from '../contexts/AuthContext';
 
+const HEARTBEAT_INTERVAL = 25000;
+const RECONNECT_DELAY = 3000;
+
 const Messages = () => {
   const navigate = useNavigate();
   const { matchId } = useParams();
@@ -13,18 +16,66 @@ const Messages = () => {
   const [newMessage, setNewMessage] = useState('');
   const [match, setMatch] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [hasOlder, setHasOlder] = useState(false);
   const messagesEndRef = useRef(null);
+  const lastMessageIdRef = useRef(null);
 
   useEffect(() => {
     fetchMessages();
     fetchMatchDetails();
-    const interval = setInterval(fetchMessages, 5000);
-    return () => clearInterval(interval);
+  }, [matchId]);
+
+  // New messages are pushed over a WebSocket; history is only fetched once
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token) return;
+
+    let socket;
+    let heartbeat;
+    let retryTimer;
+    let closed = false;
+
+    const connect = () => {
+      const wsUrl = new URL('/api/ws/messages', api.defaults.baseURL);
+      wsUrl.protocol = wsUrl.protocol === 'https:' ? 'wss:' : 'ws:';
+      wsUrl.searchParams.set('token', token);
+      if (lastMessageIdRef.current) {
+        wsUrl.searchParams.set('last_message_id', lastMessageIdRef.current);
+      }
+
+      socket = new WebSocket(wsUrl.toString());
+      socket.onopen = () => {
+        heartbeat = setInterval(() => socket.send('ping'), HEARTBEAT_INTERVAL);
+      };
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'resync') {
+          fetchNewerMessages();
+        } else if (data.type === 'message') {
+          lastMessageIdRef.current = data.message.id;
+          if (data.message.match_id !== matchId) return;
+          setMessages(prev => prev.some(m => m.id === data.message.id) ? prev : [...prev, data.message]);
+          if (data.message.sender_id !== user?.id) acknowledge(data.message.id);
+        }
+      };
+      socket.onclose = () => {
+        clearInterval(heartbeat);
+        if (!closed) retryTimer = setTimeout(connect, RECONNECT_DELAY);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearInterval(heartbeat);
+      clearTimeout(retryTimer);
+      socket?.close();
+    };
   }, [matchId]);
 
   useEffect(() => {
     scrollToBottom();
-  }, [messages]);
+  }, [messages[messages.length - 1]?.id]);
 
   const demoMatch = {
     id: matchId,
@@ -56,7 +107,13 @@ const Messages = () => {
   const fetchMessages = async () => {
     try {
       const res = await api.get(`/api/messages/${matchId}`);
-      setMessages(res.data.messages || demoMessages);
+      const history = res.data.messages || demoMessages;
+      if (res.data.messages?.length) {
+        lastMessageIdRef.current = history[history.length - 1].id;
+        acknowledge(lastMessageIdRef.current);
+      }
+      setMessages(history);
+      setHasOlder(Boolean(res.data.has_more));
     } catch (err) {
       setMessages(demoMessages);
     } finally {
@@ -64,6 +121,43 @@ const Messages = () => {
     }
   };
 
+  // Read receipts are sent explicitly; loading history never marks anything viewed
+  const acknowledge = (messageId) => {
+    api.post(`/api/messages/${matchId}/ack`, { last_seen_message_id: messageId })
+      .catch(err => console.error('Failed to acknowledge messages:', err));
+  };
+
+  const fetchOlderMessages = async () => {
+    if (!messages.length) return;
+    try {
+      const res = await api.get(`/api/messages/${matchId}`, { params: { before: messages[0].id } });
+      setMessages(prev => [...res.data.messages, ...prev]);
+      setHasOlder(res.data.has_more);
+    } catch (err) {
+      console.error('Failed to load older messages:', err);
+    }
+  };
+
+  // Catch up after falling too far behind on the socket
+  const fetchNewerMessages = async () => {
+    if (!lastMessageIdRef.current) return fetchMessages();
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const res = await api.get(`/api/messages/${matchId}`, { params: { since: lastMessageIdRef.current } });
+        const newer = res.data.messages;
+        if (newer.length) {
+          lastMessageIdRef.current = newer[newer.length - 1].id;
+          setMessages(prev => [...prev, ...newer.filter(m => !prev.some(p => p.id === m.id))]);
+          acknowledge(lastMessageIdRef.current);
+        }
+        hasMore = res.data.has_more;
+      }
+    } catch (err) {
+      fetchMessages();
+    }
+  };
+
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
@@ -83,11 +177,16 @@ const Messages = () => {
     setNewMessage('');
 
     try {
-      await api.post('/api/messages', {
+      const res = await api.post('/api/messages', {
         match_id: matchId,
         receiver_id: match?.other_user?.id || 'other',
         content: tempMessage.content
       });
+      // Swap the optimistic copy for the stored message unless the push already delivered it
+      setMessages(prev => {
+        const rest = prev.filter(m => m.id !== tempMessage.id);
+        return rest.some(m => m.id === res.data.id) ? rest : [...rest, { ...tempMessage, id: res.data.id }];
+      });
     } catch (err) {
       console.error('Failed to send message:', err);
     }
@@ -241,7 +340,23 @@ const Messages = () => {
             <p style={{ color: 'var(--gray-600)', fontSize: 14 }}>Say hello to start the conversation!</p>
           </div>
         ) : (
-          messages.map((msg, i) => {
+          <>
+          {hasOlder && (
+            <button
+              onClick={fetchOlderMessages}
+              style={{
+                alignSelf: 'center',
+                background: 'none',
+                border: 'none',
+                color: 'var(--gray-500)',
+                fontSize: 13,
+                cursor: 'pointer'
+              }}
+            >
+              Load earlier messages
+            </button>
+          )}
+          {messages.map((msg, i) => {
             const isMe = msg.sender_id === user?.id;
             return (
               <motion.div
@@ -275,7 +390,8 @@ const Messages = () => {
                 </div>
               </motion.div>
             );
-          })
+          })}
+          </>
         )}
         <div ref={messagesEndRef} />
       </div>
@@ -37,12 +37,17 @@ CREATE TABLE IF NOT EXISTS users (
     
     prompts JSONB DEFAULT '[]'::jsonb,
     
+    preferred_gender JSONB DEFAULT '[]'::jsonb,
+    preferred_age_min INTEGER,
+    preferred_age_max INTEGER,
+    
     is_premium BOOLEAN DEFAULT FALSE,
     subscription_ends TIMESTAMP WITH TIME ZONE,
     
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     last_active TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    is_banned BOOLEAN DEFAULT FALSE
+    is_banned BOOLEAN DEFAULT FALSE,
+    version INTEGER NOT NULL DEFAULT 1
 );
 
 CREATE INDEX idx_users_email ON users(email);
@@ -60,6 +65,7 @@ CREATE TABLE IF NOT EXISTS likes (
 
 CREATE INDEX idx_likes_from_user ON likes(from_user_id);
 CREATE INDEX idx_likes_to_user ON likes(to_user_id);
+CREATE UNIQUE INDEX uq_likes_from_to ON likes(from_user_id, to_user_id);
 
 CREATE TABLE IF NOT EXISTS matches (
     id VARCHAR(36) PRIMARY KEY,
@@ -68,11 +74,20 @@ CREATE TABLE IF NOT EXISTS matches (
     match_context VARCHAR(255),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     last_message_at TIMESTAMP WITH TIME ZONE,
-    is_active BOOLEAN DEFAULT TRUE
+    is_active BOOLEAN DEFAULT TRUE,
+    
+    last_message_id VARCHAR(36),
+    last_message_preview VARCHAR(200),
+    last_sender_id VARCHAR(36),
+    user1_unread_count INTEGER NOT NULL DEFAULT 0,
+    user2_unread_count INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE INDEX idx_matches_user1 ON matches(user1_id);
 CREATE INDEX idx_matches_user2 ON matches(user2_id);
+CREATE UNIQUE INDEX uq_matches_pair ON matches(least(user1_id, user2_id), greatest(user1_id, user2_id));
+CREATE INDEX idx_matches_user1_inbox ON matches(user1_id, last_message_at DESC NULLS LAST, created_at DESC);
+CREATE INDEX idx_matches_user2_inbox ON matches(user2_id, last_message_at DESC NULLS LAST, created_at DESC);
 
 CREATE TABLE IF NOT EXISTS messages (
     id VARCHAR(36) PRIMARY KEY,
@@ -93,6 +108,8 @@ CREATE TABLE IF NOT EXISTS messages (
 CREATE INDEX idx_messages_match ON messages(match_id);
 CREATE INDEX idx_messages_sender ON messages(sender_id);
 CREATE INDEX idx_messages_receiver ON messages(receiver_id);
+CREATE INDEX idx_messages_match_created ON messages(match_id, created_at, id);
+CREATE INDEX idx_messages_unread ON messages(match_id, receiver_id, created_at) WHERE viewed = false;
 
 CREATE TABLE IF NOT EXISTS passes (
     id VARCHAR(36) PRIMARY KEY,
@@ -103,6 +120,7 @@ CREATE TABLE IF NOT EXISTS passes (
 
 CREATE INDEX idx_passes_from_user ON passes(from_user_id);
 CREATE INDEX idx_passes_to_user ON passes(to_user_id);
+CREATE INDEX idx_passes_from_to ON passes(from_user_id, to_user_id);
 
 CREATE TABLE IF NOT EXISTS payment_transactions (
     id VARCHAR(36) PRIMARY KEY,
@@ -125,3 +143,66 @@ CREATE TABLE IF NOT EXISTS payment_transactions (
 CREATE INDEX idx_payments_user ON payment_transactions(user_id);
 CREATE INDEX idx_payments_session ON payment_transactions(session_id);
 CREATE INDEX idx_payments_status ON payment_transactions(payment_status);
+
+CREATE TABLE IF NOT EXISTS otp_codes (
+    key VARCHAR(320) PRIMARY KEY,
+    code_hash VARCHAR(64) NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_otp_codes_expires ON otp_codes(expires_at);
+
+-- Atomic like + mutual check + match creation (see models_pg.RECORD_LIKES_FUNCTION)
+CREATE OR REPLACE FUNCTION record_likes(
+    p_from_user_id VARCHAR,
+    p_to_user_ids VARCHAR[],
+    p_liked_elements VARCHAR[],
+    p_comments TEXT[]
+) RETURNS TABLE (liked_user_id VARCHAR, match_id VARCHAR, created BOOLEAN) AS $$
+#variable_conflict use_column
+BEGIN
+    -- Lock pairs in a fixed order so overlapping batches cannot deadlock
+    PERFORM pg_advisory_xact_lock(pairs.pair_key)
+    FROM (
+        SELECT DISTINCT hashtextextended(least(p_from_user_id, t) || ':' || greatest(p_from_user_id, t), 0) AS pair_key
+        FROM unnest(p_to_user_ids) AS t
+        ORDER BY pair_key
+    ) AS pairs;
+
+    INSERT INTO likes (id, from_user_id, to_user_id, liked_element, comment, created_at)
+    SELECT gen_random_uuid()::text, p_from_user_id, s.to_id, s.element, s.comment, now()
+    FROM unnest(p_to_user_ids, p_liked_elements, p_comments) AS s(to_id, element, comment)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM likes l WHERE l.from_user_id = p_from_user_id AND l.to_user_id = s.to_id
+    )
+    ON CONFLICT DO NOTHING;
+
+    RETURN QUERY
+    WITH mutual AS (
+        SELECT s.to_id, s.element
+        FROM unnest(p_to_user_ids, p_liked_elements) AS s(to_id, element)
+        WHERE EXISTS (
+            SELECT 1 FROM likes l WHERE l.from_user_id = s.to_id AND l.to_user_id = p_from_user_id
+        )
+    ),
+    existing AS (
+        SELECT mu.to_id, m.id
+        FROM mutual mu
+        JOIN matches m
+          ON least(m.user1_id, m.user2_id) = least(p_from_user_id, mu.to_id)
+         AND greatest(m.user1_id, m.user2_id) = greatest(p_from_user_id, mu.to_id)
+    ),
+    inserted AS (
+        INSERT INTO matches (id, user1_id, user2_id, match_context, created_at, is_active)
+        SELECT gen_random_uuid()::text, p_from_user_id, mu.to_id, mu.element, now(), true
+        FROM mutual mu
+        WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.to_id = mu.to_id)
+        ON CONFLICT DO NOTHING
+        RETURNING user2_id, id
+    )
+    SELECT i.user2_id, i.id, true FROM inserted i
+    UNION ALL
+    SELECT e.to_id, e.id, false FROM existing e;
+END;
+$$ LANGUAGE plpgsql;
@@ -68,16 +68,17 @@ class UserLogin(BaseModel):
 class UserPublic(BaseModel):
     id: str
     first_name: str
-    age: int
-    gender: str
-    location: str
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    location: Optional[str] = None
     role: str
-    photos: List[str]
-    video_url: Optional[str]
-    voice_url: Optional[str]
-    prompts: List[dict]
-    income_bracket: Optional[str]
-    allowance_expectation: Optional[str]
-    lifestyle_tags: List[str]
-    is_premium: bool
-    face_verified: bool
\ No newline at end of file
+    photos: List[str] = []
+    video_url: Optional[str] = None
+    voice_url: Optional[str] = None
+    prompts: List[dict] = []
+    income_bracket: Optional[str] = None
+    allowance_expectation: Optional[str] = None
+    lifestyle_tags: List[str] = []
+    is_premium: bool = False
+    face_verified: bool = False
+    last_active: Optional[str] = None
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, JSON, Float
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, JSON, Float, Index, UniqueConstraint, DDL, event, func, text
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime, timezone
@@ -52,6 +52,11 @@ class User(Base):
     # Prompts
     prompts = Column(JSON, default=list)
     
+    # Preferences
+    preferred_gender = Column(JSON, default=list)
+    preferred_age_min = Column(Integer, nullable=True)
+    preferred_age_max = Column(Integer, nullable=True)
+    
     # Subscription
     is_premium = Column(Boolean, default=False)
     subscription_ends = Column(DateTime(timezone=True), nullable=True)
@@ -60,12 +65,21 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     last_active = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     is_banned = Column(Boolean, default=False)
+    # Bumped by every profile write (not by last_active touches); feeds the profile ETag
+    version = Column(Integer, default=1, server_default='1', nullable=False)
     
     # Relationships
     likes_given = relationship('Like', foreign_keys='Like.from_user_id', back_populates='from_user')
     likes_received = relationship('Like', foreign_keys='Like.to_user_id', back_populates='to_user')
     messages_sent = relationship('Message', foreign_keys='Message.sender_id', back_populates='sender')
     messages_received = relationship('Message', foreign_keys='Message.receiver_id', back_populates='receiver')
+    
+    # Read the bumped version back with RETURNING instead of leaving it expired
+    __mapper_args__ = {"eager_defaults": True}
+
+@event.listens_for(User, 'before_update')
+def bump_user_version(mapper, connection, target):
+    target.version = User.version + 1
 
 class Like(Base):
     __tablename__ = 'likes'
@@ -79,6 +93,11 @@ class Like(Base):
     
     from_user = relationship('User', foreign_keys=[from_user_id], back_populates='likes_given')
     to_user = relationship('User', foreign_keys=[to_user_id], back_populates='likes_received')
+    
+    __table_args__ = (
+        # One like per direction; also probed by the discovery feed anti-join
+        UniqueConstraint('from_user_id', 'to_user_id', name='uq_likes_from_to'),
+    )
 
 class Match(Base):
     __tablename__ = 'matches'
@@ -90,6 +109,21 @@ class Match(Base):
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     last_message_at = Column(DateTime(timezone=True), nullable=True)
     is_active = Column(Boolean, default=True)
+    
+    # Inbox summary, maintained by send_message/get_messages
+    last_message_id = Column(String(36), nullable=True)
+    last_message_preview = Column(String(200), nullable=True)
+    last_sender_id = Column(String(36), nullable=True)
+    user1_unread_count = Column(Integer, default=0, server_default='0', nullable=False)
+    user2_unread_count = Column(Integer, default=0, server_default='0', nullable=False)
+    
+    __table_args__ = (
+        # At most one match per unordered pair of users
+        Index('uq_matches_pair', func.least(user1_id, user2_id), func.greatest(user1_id, user2_id), unique=True),
+        # Inbox scans, one per side of the match, in inbox order
+        Index('idx_matches_user1_inbox', user1_id, last_message_at.desc().nulls_last(), created_at.desc()),
+        Index('idx_matches_user2_inbox', user2_id, last_message_at.desc().nulls_last(), created_at.desc()),
+    )
 
 class Message(Base):
     __tablename__ = 'messages'
@@ -110,6 +144,13 @@ class Message(Base):
     
     sender = relationship('User', foreign_keys=[sender_id], back_populates='messages_sent')
     receiver = relationship('User', foreign_keys=[receiver_id], back_populates='messages_received')
+    
+    __table_args__ = (
+        # Keyset paging through a conversation
+        Index('idx_messages_match_created', 'match_id', 'created_at', 'id'),
+        # Unread messages only, for read acknowledgements
+        Index('idx_messages_unread', 'match_id', 'receiver_id', 'created_at', postgresql_where=text('viewed = false')),
+    )
 
 class Pass(Base):
     __tablename__ = 'passes'
@@ -118,6 +159,11 @@ class Pass(Base):
     from_user_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     to_user_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        # Probed by the discovery feed anti-join
+        Index('idx_passes_from_to', 'from_user_id', 'to_user_id'),
+    )
 
 class PaymentTransaction(Base):
     __tablename__ = 'payment_transactions'
@@ -136,4 +182,76 @@ class PaymentTransaction(Base):
     extra_data = Column(JSON, default=dict)
     
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+class OTPCode(Base):
+    __tablename__ = 'otp_codes'
+    
+    # Purpose, user and destination, e.g. "email:<user id>:<address>"
+    key = Column(String(320), primary_key=True)
+    code_hash = Column(String(64), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+
+# Records likes from one user and creates any resulting matches in one call.
+# Likes on the same pair are serialized with a transaction-scoped advisory lock,
+# and every statement in the function takes a fresh snapshot, so of two
+# simultaneous mutual likes the second always sees the first and exactly one
+# match is created. Re-running it for an existing like is a no-op that returns
+# the existing match.
+RECORD_LIKES_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION record_likes(
+    p_from_user_id VARCHAR,
+    p_to_user_ids VARCHAR[],
+    p_liked_elements VARCHAR[],
+    p_comments TEXT[]
+) RETURNS TABLE (liked_user_id VARCHAR, match_id VARCHAR, created BOOLEAN) AS $$
+#variable_conflict use_column
+BEGIN
+    -- Lock pairs in a fixed order so overlapping batches cannot deadlock
+    PERFORM pg_advisory_xact_lock(pairs.pair_key)
+    FROM (
+        SELECT DISTINCT hashtextextended(least(p_from_user_id, t) || ':' || greatest(p_from_user_id, t), 0) AS pair_key
+        FROM unnest(p_to_user_ids) AS t
+        ORDER BY pair_key
+    ) AS pairs;
+
+    INSERT INTO likes (id, from_user_id, to_user_id, liked_element, comment, created_at)
+    SELECT gen_random_uuid()::text, p_from_user_id, s.to_id, s.element, s.comment, now()
+    FROM unnest(p_to_user_ids, p_liked_elements, p_comments) AS s(to_id, element, comment)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM likes l WHERE l.from_user_id = p_from_user_id AND l.to_user_id = s.to_id
+    )
+    ON CONFLICT DO NOTHING;
+
+    RETURN QUERY
+    WITH mutual AS (
+        SELECT s.to_id, s.element
+        FROM unnest(p_to_user_ids, p_liked_elements) AS s(to_id, element)
+        WHERE EXISTS (
+            SELECT 1 FROM likes l WHERE l.from_user_id = s.to_id AND l.to_user_id = p_from_user_id
+        )
+    ),
+    existing AS (
+        SELECT mu.to_id, m.id
+        FROM mutual mu
+        JOIN matches m
+          ON least(m.user1_id, m.user2_id) = least(p_from_user_id, mu.to_id)
+         AND greatest(m.user1_id, m.user2_id) = greatest(p_from_user_id, mu.to_id)
+    ),
+    inserted AS (
+        INSERT INTO matches (id, user1_id, user2_id, match_context, created_at, is_active)
+        SELECT gen_random_uuid()::text, p_from_user_id, mu.to_id, mu.element, now(), true
+        FROM mutual mu
+        WHERE NOT EXISTS (SELECT 1 FROM existing e WHERE e.to_id = mu.to_id)
+        ON CONFLICT DO NOTHING
+        RETURNING user2_id, id
+    )
+    SELECT i.user2_id, i.id, true FROM inserted i
+    UNION ALL
+    SELECT e.to_id, e.id, false FROM existing e;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+event.listen(Base.metadata, 'after_create', RECORD_LIKES_FUNCTION.execute_if(dialect='postgresql'))
@@ -1,45 +1,100 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Header, Query, WebSocket, WebSocketDisconnect
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from sqlalchemy import select, update, delete, and_, or_, func
+from fastapi.responses import FileResponse
+from sqlalchemy import JSON, String, select, insert, update, delete, and_, or_, all_, bindparam, func, text, case, cast, tuple_, event, union_all
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 import os
 import logging
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional
+from typing import List, Optional, Literal
 import uuid
 import asyncio
+import copy
+from types import SimpleNamespace
 import random
-import resend
-import phonenumbers
-from phonenumbers import geocoder, carrier
 
 # Database
 from database import AsyncSessionLocal, engine, Base
 from models_pg import User, Like, Match, Message, Pass, PaymentTransaction
+from utils.candidate_queue import CandidateQueue, InMemoryCandidateQueueBackend, StaleCursor
+from utils.ranking import CandidateBatch, ViewerPreferences, rank_candidates
+from utils.profile_cards import PROFILE_CARD, MATCH_CARD, ADMIN_USER_ROW
+from utils.realtime import ConnectionHub
+from utils.write_behind import WriteBehindBuffer
+from utils.activity import ActivityTracker
+from utils.password_pool import PasswordPool, PasswordPoolSaturated
+from utils.cache import TTLCache
+from utils.auth import token_cache
+from utils.provider_clients import ProviderClientRegistry
+from utils.phone_metadata import PhoneMetadataService
+from utils.profile_updates import ProfilePatchError, profile_update
+from utils.http_cache import cached_body, cached_json, etag_matches, not_modified, version_etag
+from utils.prompt_catalog import PromptCatalog, PromptCatalogError
+from utils.media_store import CHUNK_SIZE, SNIFF_BYTES, LocalObjectStore, MediaPolicy, MediaTooLarge, matches_signature
+from utils.image_pipeline import DERIVATIVE_SIZES, ImagePipeline, ImagePipelineFull
+from utils.otp_store import EXPIRED, TOO_MANY_ATTEMPTS, VERIFIED, InMemoryOTPStore, PostgresOTPStore
+from utils.notifications import (
+    FakeProvider, NotificationQueue, NotificationQueueFull, ResendEmailProvider, TwilioVerifyProvider,
+)
 
 # Models
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 # Utils
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Resend setup
-resend.api_key = os.environ.get('RESEND_API_KEY')
+RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
+RESEND_API_URL = os.environ.get('RESEND_API_URL', 'https://api.resend.com')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
 
 # Twilio setup
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
+TWILIO_VERIFY_SERVICE_SID = os.environ.get('TWILIO_VERIFY_SERVICE_SID')
+TWILIO_VERIFY_API_URL = os.environ.get('TWILIO_VERIFY_API_URL', 'https://verify.twilio.com')
+
+# 'live' sends through Resend and Twilio Verify; 'fake' keeps deliveries in memory
+NOTIFICATION_PROVIDER = os.environ.get('NOTIFICATION_PROVIDER', 'live')
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', '4'))
+NOTIFICATION_MAX_PENDING = int(os.environ.get('NOTIFICATION_MAX_PENDING', '1000'))
+
+# Media uploads are stored by content hash under MEDIA_ROOT and served from MEDIA_BASE_URL
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', str(ROOT_DIR / 'media'))
+MEDIA_BASE_URL = os.environ.get('MEDIA_BASE_URL', '/api/media')
+MB = 1024 * 1024
+MEDIA_POLICIES = {
+    "photo": MediaPolicy(
+        # No HEIC: Pillow can't decode it, so it could never be resized
+        extensions={"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"},
+        max_bytes=int(os.environ.get('MEDIA_MAX_PHOTO_MB', '10')) * MB,
+    ),
+    "video": MediaPolicy(
+        extensions={"video/mp4": "mp4", "video/quicktime": "mov", "video/webm": "webm"},
+        max_bytes=int(os.environ.get('MEDIA_MAX_VIDEO_MB', '100')) * MB,
+    ),
+    "voice": MediaPolicy(
+        extensions={"audio/mpeg": "mp3", "audio/mp4": "m4a", "audio/webm": "weba", "audio/ogg": "ogg", "audio/wav": "wav"},
+        max_bytes=int(os.environ.get('MEDIA_MAX_VOICE_MB', '10')) * MB,
+    ),
+}
+
+# Uploaded photos are re-rendered as thumb/card/full WEBP on a process pool
+IMAGE_PIPELINE_WORKERS = int(os.environ.get('IMAGE_PIPELINE_WORKERS', '2'))
+IMAGE_PIPELINE_MAX_PENDING = int(os.environ.get('IMAGE_PIPELINE_MAX_PENDING', '256'))
+IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_QUALITY', '80'))
+IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', '50000000'))
 
 # Auth setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "YOUR_SECRET_KEY_REPLACE_ME")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
@@ -74,6 +129,20 @@ class OTPVerify(BaseModel):
     value: str
     otp: str
 
+MAX_SWIPE_BATCH = 100
+
+class SwipeDecision(BaseModel):
+    to_user_id: str
+    action: Literal["like", "pass"]
+    liked_element: str = "profile"
+    comment: Optional[str] = None
+
+class SwipeBatch(BaseModel):
+    swipes: List[SwipeDecision] = Field(..., min_length=1, max_length=MAX_SWIPE_BATCH)
+
+class MessageAck(BaseModel):
+    last_seen_message_id: str
+
 # ============= DATABASE DEPENDENCY =============
 
 async def get_db():
@@ -83,13 +152,37 @@ async def get_db():
         finally:
             await session.close()
 
+# ============= ACTIVITY TRACKING =============
+
+ACTIVITY_FLUSH_SECONDS = float(os.environ.get('ACTIVITY_FLUSH_SECONDS', '30'))
+ACTIVITY_MAX_PENDING_USERS = int(os.environ.get('ACTIVITY_MAX_PENDING_USERS', '50000'))
+
+async def write_last_active(last_seen: dict):
+    """Bulk-update users.last_active; never moves a timestamp backwards"""
+    user_ids = sorted(last_seen)
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            UPDATE users SET last_active = seen.last_active
+            FROM unnest(CAST(:user_ids AS varchar[]), CAST(:seen_at AS timestamptz[])) AS seen(user_id, last_active)
+            WHERE users.id = seen.user_id
+                AND (users.last_active IS NULL OR users.last_active < seen.last_active)
+        """), {"user_ids": user_ids, "seen_at": [last_seen[user_id] for user_id in user_ids]})
+
+activity = ActivityTracker(write_last_active, interval=ACTIVITY_FLUSH_SECONDS, max_entries=ACTIVITY_MAX_PENDING_USERS)
+
 # ============= UTILITY FUNCTIONS =============
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt is deliberately slow; keep it off the event loop (0 workers = inline)
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '32'))
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+password_pool = PasswordPool(workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING)
+
+async def run_password_op(operation, *args):
+    try:
+        return await operation(*args)
+    except PasswordPoolSaturated:
+        raise HTTPException(status_code=503, detail="Too many sign-ins in progress, try again shortly", headers={"Retry-After": "1"})
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode = data.copy()
@@ -110,7 +203,7 @@ def decode_token(token: str):
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    payload = decode_token(token)
+    payload = token_cache.verify(token)
     
     if payload is None:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
@@ -119,153 +212,225 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    activity.touch(user_id)
     return {"user_id": user_id, **payload}
 
-def get_country_from_phone(phone_number: str):
+async def require_admin(current_user: dict = Depends(get_current_user)):
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+# Authenticated users are reused across requests for a few seconds (0 disables)
+HOT_USER_TTL_SECONDS = float(os.environ.get('HOT_USER_TTL_SECONDS', '5'))
+HOT_USER_CACHE_SIZE = int(os.environ.get('HOT_USER_CACHE_SIZE', '5000'))
+
+hot_users = TTLCache(max_entries=HOT_USER_CACHE_SIZE if HOT_USER_TTL_SECONDS > 0 else 0, ttl=HOT_USER_TTL_SECONDS)
+
+@event.listens_for(User, "after_update")
+def forget_hot_user(mapper, connection, target):
+    hot_users.pop(target.id)
+
+async def load_current_user(current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)) -> User:
+    """The authenticated User row, loaded once per request.
+
+    FastAPI caches dependency results per request, so handlers and nested
+    dependencies asking for it share one instance.
+    """
+    user_id = current_user["user_id"]
+    snapshot = hot_users.get(user_id)
+    if snapshot is not None:
+        # Rebuild a session-bound instance from the cached column values without a query
+        user = User(**copy.deepcopy(snapshot))
+        make_transient_to_detached(user)
+        db.add(user)
+        return user
+    
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    hot_users.set(user_id, copy.deepcopy({attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}))
+    return user
+
+async def current_user_row(user_id: str, db: AsyncSession):
+    """The user's columns from the hot-user cache, or one plain row without building a User"""
+    snapshot = hot_users.get(user_id)
+    if snapshot is not None:
+        return SimpleNamespace(**snapshot)
+    result = await db.execute(select(*User.__table__.c).where(User.id == user_id))
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    hot_users.set(user_id, copy.deepcopy(dict(row._mapping)))
+    return row
+
+# Geocoder/carrier tables are loaded in the background at startup
+phone_metadata = PhoneMetadataService(max_entries=int(os.environ.get('PHONE_METADATA_CACHE_SIZE', '10000')))
+
+async def get_country_from_phone(phone_number: str):
     """Extract country information from phone number"""
-    try:
-        parsed = phonenumbers.parse(phone_number, None)
-        country_code = phonenumbers.region_code_for_number(parsed)
-        country_name = geocoder.description_for_number(parsed, "en")
-        carrier_name = carrier.name_for_number(parsed, "en")
-        
-        return {
-            "country_code": country_code,
-            "country_name": country_name,
-            "carrier": carrier_name,
-            "is_valid": phonenumbers.is_valid_number(parsed)
-        }
-    except:
-        return {"country_code": "Unknown", "country_name": "Unknown", "carrier": "", "is_valid": False}
+    return await phone_metadata.lookup(phone_number)
 
-async def send_email_otp(email: str, otp: str):
-    """Send OTP via email using Resend"""
-    try:
-        params = {
-            "from": SENDER_EMAIL,
-            "to": [email],
-            "subject": "INDULGE - Your Verification Code",
-            "html": f"""
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; background: #0B0F19; color: white; padding: 40px; border-radius: 10px;">
-                <h1 style="color: #D4AF37; font-size: 32px; text-align: center;">INDULGE</h1>
-                <p style="font-size: 18px; margin: 30px 0; text-align: center;">Your verification code is:</p>
-                <div style="background: rgba(212, 175, 55, 0.1); border: 2px solid #D4AF37; padding: 20px; text-align: center; border-radius: 10px; margin: 20px 0;">
-                    <h2 style="font-size: 48px; letter-spacing: 10px; margin: 0; color: #D4AF37;">{otp}</h2>
-                </div>
-                <p style="color: #A1A1AA; font-size: 14px; text-align: center;">This code will expire in 10 minutes.</p>
-                <p style="color: #A1A1AA; font-size: 14px; text-align: center;">If you didn't request this code, please ignore this email.</p>
+def otp_email(otp: str) -> dict:
+    """Subject and body of the verification code email"""
+    return {
+        "subject": "INDULGE - Your Verification Code",
+        "html": f"""
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; background: linear-gradient(135deg, #0B0F19 0%, #1a1f2e 100%); color: white; padding: 40px; border-radius: 16px;">
+            <h1 style="color: #D4AF37; font-size: 36px; text-align: center; margin-bottom: 10px;">INDULGE</h1>
+            <p style="text-align: center; color: #888; font-size: 14px; margin-bottom: 30px;">Premium Dating</p>
+            <p style="font-size: 18px; margin: 30px 0; text-align: center; color: #fff;">Your verification code is:</p>
+            <div style="background: rgba(212, 175, 55, 0.15); border: 2px solid #D4AF37; padding: 25px; text-align: center; border-radius: 12px; margin: 20px 0;">
+                <h2 style="font-size: 42px; letter-spacing: 12px; margin: 0; color: #D4AF37; font-weight: bold;">{otp}</h2>
             </div>
-            """
-        }
-        result = await asyncio.to_thread(resend.Emails.send, params)
-        print(f"✓ Email sent to {email} via Resend! ID: {result}")
-        return True
-    except Exception as e:
-        print(f"✗ Failed to send email to {email}: {e}")
-        return False
+            <p style="color: #888; font-size: 14px; text-align: center; margin-top: 25px;">This code will expire in 10 minutes.</p>
+            <p style="color: #666; font-size: 12px; text-align: center; margin-top: 15px;">If you didn't request this code, please ignore this email.</p>
+            <hr style="border: none; border-top: 1px solid #333; margin: 30px 0;">
+            <p style="color: #555; font-size: 11px; text-align: center;">© 2025 INDULGE. All rights reserved.</p>
+        </div>
+        """
+    }
 
-async def send_email_otp(email: str, otp: str):
-    """Send OTP via email using Resend"""
-    try:
-        sender = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
-        params = {
-            "from": sender,
-            "to": [email],
-            "subject": "INDULGE - Your Verification Code",
-            "html": f"""
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; background: linear-gradient(135deg, #0B0F19 0%, #1a1f2e 100%); color: white; padding: 40px; border-radius: 16px;">
-                <h1 style="color: #D4AF37; font-size: 36px; text-align: center; margin-bottom: 10px;">INDULGE</h1>
-                <p style="text-align: center; color: #888; font-size: 14px; margin-bottom: 30px;">Premium Dating</p>
-                <p style="font-size: 18px; margin: 30px 0; text-align: center; color: #fff;">Your verification code is:</p>
-                <div style="background: rgba(212, 175, 55, 0.15); border: 2px solid #D4AF37; padding: 25px; text-align: center; border-radius: 12px; margin: 20px 0;">
-                    <h2 style="font-size: 42px; letter-spacing: 12px; margin: 0; color: #D4AF37; font-weight: bold;">{otp}</h2>
-                </div>
-                <p style="color: #888; font-size: 14px; text-align: center; margin-top: 25px;">This code will expire in 10 minutes.</p>
-                <p style="color: #666; font-size: 12px; text-align: center; margin-top: 15px;">If you didn't request this code, please ignore this email.</p>
-                <hr style="border: none; border-top: 1px solid #333; margin: 30px 0;">
-                <p style="color: #555; font-size: 11px; text-align: center;">© 2025 INDULGE. All rights reserved.</p>
-            </div>
-            """
-        }
-        result = await asyncio.to_thread(resend.Emails.send, params)
-        print(f"✓ Email sent to {email} via Resend! ID: {result}")
-        return True
-    except Exception as e:
-        print(f"✗ Failed to send email to {email}: {e}")
-        return False
+# Keep-alive HTTP clients for outbound providers, opened at startup
+provider_clients = ProviderClientRegistry()
+
+def build_notification_providers():
+    if NOTIFICATION_PROVIDER == "fake":
+        return {"email": FakeProvider("email"), "sms": FakeProvider("sms")}
+    return {
+        "email": ResendEmailProvider(provider_clients, RESEND_API_KEY, SENDER_EMAIL, base_url=RESEND_API_URL),
+        "sms": TwilioVerifyProvider(
+            provider_clients, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_VERIFY_SERVICE_SID,
+            base_url=TWILIO_VERIFY_API_URL
+        ),
+    }
 
-async def send_sms_otp(phone: str):
-    """Send OTP via SMS using Twilio Verify API"""
+notification_queue = NotificationQueue(
+    build_notification_providers(),
+    workers=NOTIFICATION_WORKERS,
+    max_pending=NOTIFICATION_MAX_PENDING
+)
+
+# One-time email codes live in their own store, never in the users row
+OTP_STORE = os.environ.get('OTP_STORE', 'postgres')
+OTP_MAX_ATTEMPTS = int(os.environ.get('OTP_MAX_ATTEMPTS', '5'))
+OTP_SWEEP_SECONDS = float(os.environ.get('OTP_SWEEP_SECONDS', '300'))
+EMAIL_OTP_TTL = timedelta(minutes=10)
+
+if OTP_STORE == "memory":
+    otp_store = InMemoryOTPStore(max_attempts=OTP_MAX_ATTEMPTS)
+else:
+    otp_store = PostgresOTPStore(engine, max_attempts=OTP_MAX_ATTEMPTS)
+
+def email_otp_key(user_id: str, email: str) -> str:
+    return f"email:{user_id}:{email.strip().lower()}"
+
+async def verify_sms_otp(phone: str, code: str) -> bool:
+    """Check an SMS code with the provider that sent it"""
     try:
-        from twilio.rest import Client
-        
-        account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-        auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
-        verify_service_sid = os.environ.get('TWILIO_VERIFY_SERVICE_SID')
-        
-        if not account_sid or not auth_token:
-            print(f"⚠️  Twilio not configured")
-            return False
-        
-        client = Client(account_sid, auth_token)
-        
-        if verify_service_sid:
-            verification = client.verify.v2.services(verify_service_sid).verifications.create(
-                to=phone,
-                channel='sms'
-            )
-            print(f"✓ SMS verification sent to {phone} via Twilio Verify! SID: {verification.sid}")
-            return True
-        else:
-            print(f"⚠️  Twilio Verify Service not configured")
-            return False
-            
+        return await notification_queue.providers["sms"].check(phone, code)
     except Exception as e:
-        print(f"✗ SMS sending error for {phone}: {e}")
+        logger.warning(f"SMS verification check failed for {phone}: {e}")
         return False
 
-async def verify_sms_otp(phone: str, code: str):
-    """Verify SMS OTP via Twilio Verify API"""
-    try:
-        from twilio.rest import Client
-        
-        account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-        auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
-        verify_service_sid = os.environ.get('TWILIO_VERIFY_SERVICE_SID')
-        
-        if not verify_service_sid:
-            return False
-        
-        client = Client(account_sid, auth_token)
-        
-        verification_check = client.verify.v2.services(verify_service_sid).verification_checks.create(
-            to=phone,
-            code=code
+def discovery_feed_query(user, limit: int = 20, exclude_ids=(), columns=(User.id,)):
+    """Discovery candidates for a user, excluding swiped profiles via NOT EXISTS anti-joins"""
+    if user.role == "baby":
+        role_filter = User.role.in_(["daddy", "mommy"])
+    else:
+        role_filter = User.role == "baby"
+    
+    already_liked = select(Like.id).where(
+        and_(Like.from_user_id == user.id, Like.to_user_id == User.id)
+    )
+    already_passed = select(Pass.id).where(
+        and_(Pass.from_user_id == user.id, Pass.to_user_id == User.id)
+    )
+    
+    query = select(*columns).where(
+        and_(
+            User.id != user.id,
+            ~already_liked.exists(),
+            ~already_passed.exists(),
+            User.is_banned == False,
+            role_filter
         )
-        
-        if verification_check.status == 'approved':
-            print(f"✓ Phone {phone} verified successfully!")
-            return True
-        else:
-            print(f"✗ Verification failed for {phone}: {verification_check.status}")
-            return False
-            
-    except Exception as e:
-        print(f"✗ Verification error for {phone}: {e}")
-        return False
+    )
+    if exclude_ids:
+        # One array parameter, so the statement is the same however many ids
+        # the queue excludes (an IN list renders a placeholder per id)
+        query = query.where(User.id != all_(bindparam("exclude_ids", list(exclude_ids), type_=ARRAY(String))))
+    return query.limit(limit)
+
+def photo_count():
+    photos = cast(User.photos, JSON)
+    return case((func.json_typeof(photos) == 'array', func.json_array_length(photos)), else_=0)
+
+# Only what the ranker scores, in CandidateBatch.from_rows order; photos, video
+# and voice are reduced server-side so media payloads never leave Postgres
+RANKING_COLUMNS = (
+    User.id,
+    User.age,
+    User.last_active,
+    User.lifestyle_tags,
+    photo_count(),
+    User.video_url.isnot(None),
+    User.voice_url.isnot(None),
+)
+
+RANKING_BATCH_SIZE = int(os.environ.get('DISCOVERY_RANKING_BATCH_SIZE', 2000))
+
+async def fetch_discovery_candidates(user_id: str, exclude_ids, limit: int):
+    """Refill source for the candidate queue: rank a batch of candidates, keep the best"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User.id, User.role, User.lifestyle_tags, User.preferred_age_min, User.preferred_age_max)
+            .where(User.id == user_id)
+        )
+        user = result.first()
+        if not user:
+            return []
+        # The most recently active candidates are scored; id breaks ties so a
+        # refill sees the same batch for the same data
+        results = await db.execute(
+            discovery_feed_query(user, RANKING_BATCH_SIZE, exclude_ids, columns=RANKING_COLUMNS)
+            .order_by(User.last_active.desc().nulls_last(), User.id)
+        )
+        batch = CandidateBatch.from_rows(results.all())
+    return rank_candidates(ViewerPreferences.from_user(user), batch, limit)
+
+candidate_queue = CandidateQueue(
+    InMemoryCandidateQueueBackend(
+        max_users=int(os.environ.get('DISCOVERY_QUEUE_MAX_USERS', 10000)),
+        idle_ttl=float(os.environ.get('DISCOVERY_QUEUE_IDLE_SECONDS', 1800)),
+    ),
+    fetch_discovery_candidates,
+    depth=int(os.environ.get('DISCOVERY_QUEUE_DEPTH', 200)),
+    refill_threshold=int(os.environ.get('DISCOVERY_QUEUE_REFILL_THRESHOLD', 50)),
+    workers=int(os.environ.get('DISCOVERY_QUEUE_WORKERS', 2)),
+    history=int(os.environ.get('DISCOVERY_QUEUE_HISTORY', 1000)),
+)
 
 # ============= AUTH ROUTES =============
 
+# Admin accounts are granted in the database, never chosen at signup
+SIGNUP_ROLES = {"baby", "daddy", "mommy"}
+
 @api_router.post("/auth/signup")
 async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    if user_data.role not in SIGNUP_ROLES:
+        raise HTTPException(status_code=400, detail="Invalid role")
+    
     # Check if user exists
     result = await db.execute(select(User).where(User.email == user_data.email))
     existing_user = result.scalar_one_or_none()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    password_hash = await run_password_op(password_pool.hash, user_data.password)
+    
     # Get country from phone
-    country_info = get_country_from_phone(user_data.phone)
+    country_info = await get_country_from_phone(user_data.phone)
     
     # Create user
     user_id = str(uuid.uuid4())
@@ -274,7 +439,7 @@ async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         id=user_id,
         email=user_data.email,
         phone=user_data.phone,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         role=user_data.role,
         first_name=user_data.first_name,
         location=country_info.get("country_name", ""),
@@ -321,12 +486,10 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not verify_password(credentials.password, user.password_hash):
+    if not await run_password_op(password_pool.verify, credentials.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Update last active
-    user.last_active = datetime.now(timezone.utc)
-    await db.commit()
+    activity.touch(user.id)
     
     token = create_access_token(data={"sub": user.id, "email": user.email, "role": user.role})
     
@@ -345,63 +508,60 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
         }
     }
 
+@api_router.post("/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    if not token_cache.revoke(credentials.credentials):
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    return {"logged_out": True}
+
 # ============= VERIFICATION ROUTES =============
 
 @api_router.post("/verification/send-otp")
-async def send_otp(data: OTPRequest, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == current_user["user_id"]))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    success = False
-    message = ""
+async def send_otp(data: OTPRequest, current_user: dict = Depends(get_current_user)):
+    if data.type not in ("email", "phone"):
+        raise HTTPException(status_code=400, detail="type must be 'email' or 'phone'")
     
     if data.type == "email":
         # Generate 6-digit OTP for email (using Resend)
         otp = str(random.randint(100000, 999999))
-        expiry = datetime.now(timezone.utc) + timedelta(minutes=10)
-        user.email_otp = otp
-        user.otp_expires_at = expiry
-        await db.commit()
-        
-        success = await send_email_otp(data.value, otp)
-        message = f"Verification code sent to {data.value}"
-        
-    elif data.type == "phone":
-        # Use Twilio Verify API for SMS (it generates its own code)
-        success = await send_sms_otp(data.value)
-        message = f"Verification code sent to {data.value}"
-    
-    if success:
-        return {
-            "success": True, 
-            "message": message,
-            "note": "Please check your email or phone for the 6-digit verification code"
-        }
+        await otp_store.issue(email_otp_key(current_user["user_id"], data.value), otp, EMAIL_OTP_TTL)
+        channel, payload = "email", otp_email(otp)
+    else:
+        # Twilio Verify generates its own code
+        channel, payload = "sms", {}
     
-    error_msg = "Failed to send verification code to your email. Please try again." if data.type == "email" else "Failed to send SMS. Please check your phone number format."
-    return {"success": False, "message": error_msg}
+    # Delivery happens in the background; the client can poll its status
+    try:
+        delivery = notification_queue.enqueue(channel, data.value, payload, owner_id=current_user["user_id"])
+    except NotificationQueueFull:
+        raise HTTPException(status_code=503, detail="Verification service is busy, try again shortly", headers={"Retry-After": "5"})
+    
+    return {
+        "success": True,
+        "message": f"Verification code sent to {data.value}",
+        "note": "Please check your email or phone for the 6-digit verification code",
+        "delivery_id": delivery.id
+    }
+
+@api_router.get("/verification/deliveries/{delivery_id}")
+async def get_delivery_status(delivery_id: str, current_user: dict = Depends(get_current_user)):
+    delivery = notification_queue.get(delivery_id)
+    if delivery is None or delivery.owner_id != current_user["user_id"]:
+        raise HTTPException(status_code=404, detail="Delivery not found")
+    return delivery.to_dict()
 
 @api_router.post("/verification/verify-otp")
-async def verify_otp_endpoint(data: OTPVerify, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == current_user["user_id"]))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+async def verify_otp_endpoint(data: OTPVerify, user: User = Depends(load_current_user), db: AsyncSession = Depends(get_db)):
     if data.type == "email":
-        # Verify email OTP (stored in our database via Resend)
-        if user.otp_expires_at and datetime.now(timezone.utc) > user.otp_expires_at:
+        outcome = await otp_store.verify(email_otp_key(user.id, data.value), data.otp)
+        if outcome == EXPIRED:
             raise HTTPException(status_code=400, detail="OTP expired. Please request a new code.")
-        
-        if user.email_otp != data.otp:
+        if outcome == TOO_MANY_ATTEMPTS:
+            raise HTTPException(status_code=429, detail="Too many attempts. Please request a new code.")
+        if outcome != VERIFIED:
             raise HTTPException(status_code=400, detail="Invalid verification code")
         
         user.email_verified = True
-        user.email_otp = None
         await db.commit()
         
     elif data.type == "phone":
@@ -417,33 +577,53 @@ async def verify_otp_endpoint(data: OTPVerify, current_user: dict = Depends(get_
     return {"success": True, "message": f"{data.type} verified successfully"}
 
 @api_router.post("/verification/face")
-async def verify_face(current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == current_user["user_id"]))
-    user = result.scalar_one_or_none()
-    if user:
-        user.face_verified = True
-        await db.commit()
+async def verify_face(user: User = Depends(load_current_user), db: AsyncSession = Depends(get_db)):
+    user.face_verified = True
+    await db.commit()
     return {"success": True}
 
 @api_router.post("/verification/payment")
-async def process_verification_payment(data: dict, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == current_user["user_id"]))
-    user = result.scalar_one_or_none()
-    if user:
-        user.verification_paid = True
-        await db.commit()
+async def process_verification_payment(data: dict, user: User = Depends(load_current_user), db: AsyncSession = Depends(get_db)):
+    user.verification_paid = True
+    await db.commit()
     return {"success": True, "payment_intent": "mock_pi_123"}
 
 # ============= PROFILE ROUTES =============
 
+# Clients may keep the profile but must revalidate it on every use
+PROFILE_CACHE_CONTROL = "private, no-cache"
+
+def profile_etag(user_id: str, version: int) -> str:
+    # Prompt questions are filled in from the catalog, so its version is part of the profile's
+    return version_etag(user_id, version, prompt_catalog.version)
+
 @api_router.get("/profile/me")
-async def get_my_profile(current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == current_user["user_id"]))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_my_profile(
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Current profile; a client holding the current ETag gets a 304 after a version-only lookup"""
+    user_id = current_user["user_id"]
+    if if_none_match:
+        result = await db.execute(select(User.version).where(User.id == user_id))
+        version = result.scalar_one_or_none()
+        if version is not None:
+            if etag_matches(if_none_match, profile_etag(user_id, version)):
+                return not_modified(profile_etag(user_id, version), PROFILE_CACHE_CONTROL)
+            snapshot = hot_users.get(user_id)
+            if snapshot is not None and snapshot["version"] != version:
+                hot_users.pop(user_id)
     
+    user = await load_current_user(current_user, db)
+    return cached_json(profile_response(user), profile_etag(user.id, user.version), PROFILE_CACHE_CONTROL)
+
+def profile_response(user) -> dict:
+    """The profile body for a User, a users row, or a hot-user snapshot.
+
+    Everything in it is versioned, since the ETag is built from users.version;
+    last_active changes on every request without a bump, so it is left out.
+    """
     return {
         "id": user.id,
         "email": user.email,
@@ -465,139 +645,224 @@ async def get_my_profile(current_user: dict = Depends(get_current_user), db: Asy
         "photos": user.photos or [],
         "video_url": user.video_url,
         "voice_url": user.voice_url,
-        "prompts": user.prompts or [],
+        "prompts": prompt_catalog.expand(user.prompts),
+        "preferred_gender": user.preferred_gender or [],
+        "preferred_age_min": user.preferred_age_min,
+        "preferred_age_max": user.preferred_age_max,
         "is_premium": user.is_premium,
         "email_verified": user.email_verified,
         "phone_verified": user.phone_verified,
         "face_verified": user.face_verified,
         "verification_paid": user.verification_paid,
-        "created_at": user.created_at.isoformat() if user.created_at else None,
-        "last_active": user.last_active.isoformat() if user.last_active else None
+        "created_at": user.created_at.isoformat() if user.created_at else None
     }
 
 @api_router.put("/profile/me")
 async def update_profile(data: dict, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == current_user["user_id"]))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Update allowed fields
-    allowed_fields = [
-        'age', 'gender', 'orientation', 'location', 'income_bracket', 'net_worth',
-        'allowance_expectation', 'lifestyle_tags', 'height', 'education', 'smoking',
-        'drinking', 'photos', 'video_url', 'voice_url', 'prompts', 'preferred_gender',
-        'preferred_age_min', 'preferred_age_max'
-    ]
-    
-    for field in allowed_fields:
-        if field in data:
-            setattr(user, field, data[field])
+    user_id = current_user["user_id"]
+    try:
+        if "prompts" in data:
+            # Answers are stored as prompt references, not copies of the question
+            data = {**data, "prompts": prompt_catalog.compact(data["prompts"])}
+        statement = profile_update(user_id, data)
+    except (ProfilePatchError, PromptCatalogError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    await db.commit()
+    row = None
+    if statement is not None:
+        row = (await db.execute(statement)).one_or_none()
+        await db.commit()
+    if row is None:
+        # Nothing to apply, or every value already matched what is stored
+        user = await current_user_row(user_id, db)
+        return cached_json(profile_response(user), profile_etag(user.id, user.version), PROFILE_CACHE_CONTROL)
     
-    return await get_my_profile(current_user, db)
+    # Core UPDATEs skip the ORM after_update hook, so refresh the hot copy here
+    hot_users.set(user_id, dict(row._mapping))
+    return cached_json(profile_response(row), profile_etag(row.id, row.version), PROFILE_CACHE_CONTROL)
+
+# ============= MEDIA =============
+
+media_store = LocalObjectStore(MEDIA_ROOT)
+# Keys are content hashes, so a stored object never changes
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def media_headers(cache_control: str) -> dict:
+    # Browsers must go by the Content-Type we send, never guess from the bytes
+    return {"Cache-Control": cache_control, "X-Content-Type-Options": "nosniff"}
+MEDIA_CONTENT_TYPES = {extension: content_type for policy in MEDIA_POLICIES.values() for content_type, extension in policy.extensions.items()}
+
+image_pipeline = ImagePipeline(
+    media_store,
+    workers=IMAGE_PIPELINE_WORKERS,
+    max_pending=IMAGE_PIPELINE_MAX_PENDING,
+    quality=IMAGE_DERIVATIVE_QUALITY,
+    max_pixels=IMAGE_MAX_PIXELS,
+)
+PHOTO_EXTENSIONS = set(MEDIA_POLICIES["photo"].extensions.values())
+
+def media_url(key: str, size: Optional[str] = None) -> str:
+    return f"{MEDIA_BASE_URL}/{key}/{size}" if size else f"{MEDIA_BASE_URL}/{key}"
+
+def photo_variants(photos, size: str) -> list:
+    """Stored photo URLs pointed at one rendition size; URLs from elsewhere pass through"""
+    prefix = f"{MEDIA_BASE_URL}/"
+    return [f"{url}/{size}" if isinstance(url, str) and url.startswith(prefix) else url for url in photos or []]
+
+def submit_derivatives(key: str, force: bool = False):
+    try:
+        return image_pipeline.submit(key, force=force)
+    except ImagePipelineFull:
+        # The original keeps being served in place of every size until a later submit gets through
+        logger.warning(f"Image pipeline full; derivatives for {key} deferred")
+        return None
+
+async def read_upload(file: UploadFile):
+    """The upload in CHUNK_SIZE pieces; Starlette has spooled anything past 1 MB to disk"""
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
 
 @api_router.post("/profile/upload-media")
 async def upload_media(file: UploadFile = File(...), media_type: str = Form(...), current_user: dict = Depends(get_current_user)):
-    mock_url = f"https://storage.indulge.app/{current_user['user_id']}/{media_type}_{datetime.now().timestamp()}"
-    return {"url": mock_url}
+    """Store an upload by content hash; the returned URL goes into photos, video_url or voice_url"""
+    policy = MEDIA_POLICIES.get(media_type)
+    if policy is None:
+        raise HTTPException(status_code=400, detail=f"media_type must be one of {', '.join(MEDIA_POLICIES)}")
+    extension = policy.extensions.get(file.content_type)
+    if extension is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported {media_type} type: {file.content_type}")
+    too_large = HTTPException(status_code=413, detail=f"{media_type.capitalize()} uploads are limited to {policy.max_bytes // MB} MB")
+    if file.size is not None and file.size > policy.max_bytes:
+        raise too_large
+    head = await file.read(SNIFF_BYTES)
+    await file.seek(0)
+    if not matches_signature(file.content_type, head):
+        raise HTTPException(status_code=415, detail=f"File content is not {file.content_type}")
+    
+    try:
+        stored = await media_store.put(read_upload(file), extension, max_bytes=policy.max_bytes)
+    except MediaTooLarge:
+        raise too_large
+    
+    response = {"url": media_url(stored.key), "digest": stored.digest, "size": stored.size, "deduplicated": stored.deduplicated}
+    if media_type == "photo":
+        submit_derivatives(stored.key)
+        response["variants"] = {size: media_url(stored.key, size) for size in DERIVATIVE_SIZES}
+    return response
+
+@api_router.get("/media/{key}")
+async def get_media(key: str):
+    try:
+        path = media_store.path_for(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not await asyncio.to_thread(path.is_file):
+        raise HTTPException(status_code=404, detail="Not found")
+    return FileResponse(path, media_type=MEDIA_CONTENT_TYPES.get(path.suffix[1:]), headers=media_headers(MEDIA_CACHE_CONTROL))
+
+@api_router.get("/media/{key}/{size}")
+async def get_media_variant(key: str, size: str):
+    """A photo rendition; the original stands in (briefly cacheable) until it has been rendered"""
+    if size not in DERIVATIVE_SIZES:
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        path = media_store.path_for(key)
+        derived = media_store.derivative_path(key, size)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Not found")
+    if await asyncio.to_thread(derived.is_file):
+        return FileResponse(derived, media_type="image/webp", headers=media_headers(MEDIA_CACHE_CONTROL))
+    if not await asyncio.to_thread(path.is_file):
+        raise HTTPException(status_code=404, detail="Not found")
+    if path.suffix[1:] in PHOTO_EXTENSIONS:
+        submit_derivatives(key)
+    return FileResponse(path, media_type=MEDIA_CONTENT_TYPES.get(path.suffix[1:]), headers=media_headers("public, max-age=60"))
 
 # ============= DISCOVERY ROUTES =============
 
 @api_router.get("/discovery/feed")
-async def get_discovery_feed(current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.id == current_user["user_id"]))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get users already liked or passed
-    likes_result = await db.execute(select(Like.to_user_id).where(Like.from_user_id == current_user["user_id"]))
-    liked_ids = [row[0] for row in likes_result.fetchall()]
-    
-    passes_result = await db.execute(select(Pass.to_user_id).where(Pass.from_user_id == current_user["user_id"]))
-    passed_ids = [row[0] for row in passes_result.fetchall()]
+async def get_discovery_feed(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=50),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    user_id = current_user["user_id"]
     
-    excluded_ids = [current_user["user_id"]] + liked_ids + passed_ids
-    
-    # Build query based on role
-    if user.role == "baby":
-        role_filter = User.role.in_(["daddy", "mommy"])
-    else:
-        role_filter = User.role == "baby"
+    # Candidates come pre-computed from the user's queue, paged by keyset cursor;
+    # only the page itself is hydrated here. The viewer's row is read only when
+    # the queue refills (fetch_discovery_candidates), never per request
+    reset = False
+    try:
+        candidate_ids, next_cursor = await candidate_queue.page(user_id, cursor, limit)
+    except StaleCursor:
+        # Issued by a restarted or different worker; start over and tell the
+        # client to replace the cards it has not shown yet instead of appending
+        candidate_ids, next_cursor = await candidate_queue.page(user_id, None, limit)
+        reset = True
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not candidate_ids:
+        return {"profiles": [], "next_cursor": None, "reset": reset}
     
-    query = select(User).where(
-        and_(
-            User.id.notin_(excluded_ids),
-            User.is_banned == False,
-            role_filter
-        )
-    ).limit(20)
-    
-    results = await db.execute(query)
-    users = results.scalars().all()
-    
-    profiles = []
-    for u in users:
-        profiles.append({
-            "id": u.id,
-            "first_name": u.first_name,
-            "age": u.age,
-            "gender": u.gender,
-            "location": u.location,
-            "photos": u.photos or [],
-            "video_url": u.video_url,
-            "voice_url": u.voice_url,
-            "prompts": u.prompts or [],
-            "lifestyle_tags": u.lifestyle_tags or [],
-            "role": u.role,
-            "income_bracket": u.income_bracket,
-            "allowance_expectation": u.allowance_expectation,
-            "last_active": u.last_active.isoformat() if u.last_active else None
-        })
+    # Queued entries can be minutes old; re-check bans at hydrate time
+    results = await db.execute(PROFILE_CARD.select().where(User.id.in_(candidate_ids), User.is_banned == False))
+    by_id = {card["id"]: card for card in PROFILE_CARD.to_dicts(results.all())}
+    profiles = [by_id[candidate_id] for candidate_id in candidate_ids if candidate_id in by_id]
+    for candidate_id in candidate_ids:
+        if candidate_id not in by_id:
+            # Banned or deleted since it was queued
+            await candidate_queue.consume(user_id, candidate_id)
+    for profile in profiles:
+        profile["prompts"] = prompt_catalog.expand(profile["prompts"])
+        profile["photos"] = photo_variants(profile["photos"], "card")
     
-    return {"profiles": profiles}
+    return {"profiles": profiles, "next_cursor": next_cursor, "reset": reset}
+
+async def record_likes(db: AsyncSession, from_user_id: str, likes: List[SwipeDecision]):
+    """Insert likes and create any mutual matches in one round trip; returns (liked_user_id, match_id, created) rows"""
+    result = await db.execute(
+        text("SELECT liked_user_id, match_id, created FROM record_likes(:from_user_id, :to_user_ids, :liked_elements, :comments)"),
+        {
+            "from_user_id": from_user_id,
+            "to_user_ids": [like.to_user_id for like in likes],
+            "liked_elements": [like.liked_element for like in likes],
+            "comments": [like.comment for like in likes]
+        }
+    )
+    return result.all()
+
+async def missing_profiles(db: AsyncSession, user_ids) -> List[str]:
+    """Which of the swiped ids have no user, checked after a foreign key violation"""
+    await db.rollback()
+    result = await db.execute(select(User.id).where(User.id.in_(list(user_ids))))
+    return sorted(set(user_ids) - set(result.scalars().all()))
+
+def unknown_profiles(missing: List[str]) -> HTTPException:
+    return HTTPException(status_code=422, detail={"message": "Unknown profile", "to_user_ids": missing})
 
 @api_router.post("/discovery/like")
 async def like_profile(data: dict, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    like = Like(
-        id=str(uuid.uuid4()),
-        from_user_id=current_user["user_id"],
+    like = SwipeDecision(
         to_user_id=data["to_user_id"],
+        action="like",
         liked_element=data.get("liked_element", "profile"),
-        comment=data.get("comment"),
-        created_at=datetime.now(timezone.utc)
+        comment=data.get("comment")
     )
     
-    db.add(like)
-    await db.commit()
-    
-    # Check for mutual like
-    mutual_result = await db.execute(
-        select(Like).where(
-            and_(
-                Like.from_user_id == data["to_user_id"],
-                Like.to_user_id == current_user["user_id"]
-            )
-        )
-    )
-    mutual_like = mutual_result.scalar_one_or_none()
-    
-    if mutual_like:
-        match = Match(
-            id=str(uuid.uuid4()),
-            user1_id=current_user["user_id"],
-            user2_id=data["to_user_id"],
-            match_context=like.liked_element,
-            created_at=datetime.now(timezone.utc),
-            is_active=True
-        )
-        db.add(match)
+    # Safe to retry: a repeated like is ignored and returns the existing match
+    try:
+        matches = await record_likes(db, current_user["user_id"], [like])
         await db.commit()
-        return {"matched": True, "match_id": match.id}
+    except IntegrityError:
+        missing = await missing_profiles(db, [like.to_user_id])
+        if not missing:
+            raise
+        raise unknown_profiles(missing)
+    await candidate_queue.consume(current_user["user_id"], like.to_user_id)
+    
+    if matches:
+        return {"matched": True, "match_id": matches[0].match_id}
     
     return {"matched": False}
 
@@ -611,62 +876,143 @@ async def pass_profile(data: dict, current_user: dict = Depends(get_current_user
     )
     db.add(pass_obj)
     await db.commit()
+    await candidate_queue.consume(current_user["user_id"], data["to_user_id"])
     return {"success": True}
 
+@api_router.post("/discovery/swipes")
+async def record_swipes(batch: SwipeBatch, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    user_id = current_user["user_id"]
+    now = datetime.now(timezone.utc)
+    
+    # The last decision wins when a batch repeats a profile
+    decisions = {s.to_user_id: s for s in batch.swipes if s.to_user_id != user_id}
+    likes = [s for s in decisions.values() if s.action == "like"]
+    passes = [s for s in decisions.values() if s.action == "pass"]
+    
+    # Likes, mutual checks and matches in one call; passes in one multi-row
+    # INSERT; everything commits together. Ids are not looked up first: the
+    # foreign keys reject unknown profiles, and only then is the batch checked
+    try:
+        matches = await record_likes(db, user_id, likes) if likes else []
+        if passes:
+            await db.execute(insert(Pass).values([
+                {"id": str(uuid.uuid4()), "from_user_id": user_id, "to_user_id": s.to_user_id, "created_at": now}
+                for s in passes
+            ]))
+        await db.commit()
+    except IntegrityError:
+        missing = await missing_profiles(db, decisions)
+        if not missing:
+            raise
+        raise unknown_profiles(missing)
+    
+    for to_user_id in decisions:
+        await candidate_queue.consume(user_id, to_user_id)
+    
+    return {
+        "recorded": len(decisions),
+        "matches": [{"match_id": m.match_id, "user_id": m.liked_user_id, "new": m.created} for m in matches]
+    }
+
 # ============= MATCHES & MESSAGES =============
 
+def match_card(row) -> dict:
+    """Counterpart summary for the matches list, with thumbnail-size photos"""
+    card = MATCH_CARD.to_dict(row)
+    card["photos"] = photo_variants(card["photos"], "thumb")
+    return card
+
 @api_router.get("/matches")
 async def get_matches(current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Match).where(
-            and_(
-                or_(
-                    Match.user1_id == current_user["user_id"],
-                    Match.user2_id == current_user["user_id"]
-                ),
-                Match.is_active == True
+    user_id = current_user["user_id"]
+    
+    def inbox_side(own_id, other_id, unread_count):
+        return (
+            select(
+                Match.id,
+                Match.user1_id,
+                Match.user2_id,
+                Match.match_context,
+                Match.created_at,
+                Match.last_message_id,
+                Match.last_message_preview,
+                Match.last_sender_id,
+                Match.last_message_at,
+                unread_count,
+                *MATCH_CARD.columns
             )
+            .select_from(Match)
+            .outerjoin(User, User.id == other_id)
+            .where(own_id == user_id, Match.is_active == True)
+        )
+    
+    # The inbox reads the summary columns kept up to date on write. An OR
+    # across user1_id/user2_id can't use either inbox index, so each side of
+    # the match is its own query with its own index scan, already in inbox
+    # order, and only this user's matches are combined and ordered.
+    user1_side = inbox_side(Match.user1_id, Match.user2_id, Match.user1_unread_count)
+    user2_side = inbox_side(Match.user2_id, Match.user1_id, Match.user2_unread_count).where(Match.user1_id != user_id)
+    result = await db.execute(
+        union_all(user1_side, user2_side)
+        .order_by(
+            user1_side.selected_columns.last_message_at.desc().nulls_last(),
+            user1_side.selected_columns.created_at.desc()
         )
     )
-    matches = result.scalars().all()
     
     match_list = []
-    for match in matches:
-        other_user_id = match.user2_id if match.user1_id == current_user["user_id"] else match.user1_id
-        
-        user_result = await db.execute(select(User).where(User.id == other_user_id))
-        other_user = user_result.scalar_one_or_none()
-        
-        msg_result = await db.execute(
-            select(Message).where(Message.match_id == match.id).order_by(Message.created_at.desc()).limit(1)
-        )
-        last_message = msg_result.scalar_one_or_none()
+    for row in result.all():
+        (match_id, user1_id, user2_id, match_context, created_at, last_message_id,
+         last_message_preview, last_sender_id, last_message_at, unread) = row[:10]
+        other_user = row[10:]
         
         match_list.append({
-            "id": match.id,
-            "user1_id": match.user1_id,
-            "user2_id": match.user2_id,
-            "match_context": match.match_context,
-            "created_at": match.created_at.isoformat() if match.created_at else None,
-            "other_user": {
-                "id": other_user.id,
-                "first_name": other_user.first_name,
-                "age": other_user.age,
-                "photos": other_user.photos or [],
-                "last_active": other_user.last_active.isoformat() if other_user.last_active else None
-            } if other_user else None,
+            "id": match_id,
+            "user1_id": user1_id,
+            "user2_id": user2_id,
+            "match_context": match_context,
+            "created_at": created_at.isoformat() if created_at else None,
+            "other_user": match_card(other_user) if other_user[0] else None,
             "last_message": {
-                "id": last_message.id,
-                "content": last_message.content,
-                "sender_id": last_message.sender_id,
-                "created_at": last_message.created_at.isoformat() if last_message.created_at else None
-            } if last_message else None
+                "id": last_message_id,
+                "content": last_message_preview,
+                "sender_id": last_sender_id,
+                "created_at": last_message_at.isoformat() if last_message_at else None
+            } if last_message_id else None,
+            "unread": unread or 0
         })
     
     return {"matches": match_list}
 
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
 @api_router.get("/messages/{match_id}")
-async def get_messages(match_id: str, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def get_messages(
+    match_id: str,
+    before: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_MESSAGE_PAGE_SIZE),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """A page of the conversation, oldest first.
+
+    Without parameters this is the latest `limit` messages. `before` pages
+    back from a message id; `since` returns what came after a message id or
+    ISO timestamp. `has_more` says whether another page exists in that
+    direction.
+    """
+    if before and since:
+        raise HTTPException(status_code=400, detail="Use either before or since, not both")
+    
     # Verify user is part of the match
     match_result = await db.execute(
         select(Match).where(
@@ -684,48 +1030,81 @@ async def get_messages(match_id: str, current_user: dict = Depends(get_current_u
     if not match:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    msg_result = await db.execute(
-        select(Message).where(Message.match_id == match_id).order_by(Message.created_at.asc())
-    )
-    messages = msg_result.scalars().all()
+    # Keyset on (created_at, id), served by idx_messages_match_created
+    position = tuple_(Message.created_at, Message.id)
+    query = select(Message).where(Message.match_id == match_id)
+    anchor_id = before or since
+    since_time = parse_timestamp(since) if since else None
+    if since_time is not None:
+        query = query.where(Message.created_at > since_time)
+    elif anchor_id:
+        anchor_result = await db.execute(
+            select(Message.created_at, Message.id).where(Message.id == anchor_id, Message.match_id == match_id)
+        )
+        anchor = anchor_result.one_or_none()
+        if anchor is None:
+            raise HTTPException(status_code=404, detail="Message not found")
+        if before:
+            query = query.where(position < tuple_(*anchor))
+        else:
+            query = query.where(position > tuple_(*anchor))
     
-    # Mark messages as viewed
-    await db.execute(
-        update(Message).where(
-            and_(
-                Message.match_id == match_id,
-                Message.receiver_id == current_user["user_id"],
-                Message.viewed == False
-            )
-        ).values(viewed=True)
-    )
-    await db.commit()
+    if since:
+        query = query.order_by(Message.created_at.asc(), Message.id.asc())
+    else:
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+    msg_result = await db.execute(query.limit(limit + 1))
+    messages = msg_result.scalars().all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not since:
+        messages.reverse()
     
+    return {"messages": [serialize_message(msg) for msg in messages], "has_more": has_more}
+
+def serialize_message(msg: Message) -> dict:
     return {
-        "messages": [
-            {
-                "id": msg.id,
-                "match_id": msg.match_id,
-                "sender_id": msg.sender_id,
-                "receiver_id": msg.receiver_id,
-                "content": msg.content,
-                "media_url": msg.media_url,
-                "media_type": msg.media_type,
-                "view_once": msg.view_once,
-                "viewed": msg.viewed,
-                "created_at": msg.created_at.isoformat() if msg.created_at else None
-            }
-            for msg in messages
-        ]
+        "id": msg.id,
+        "match_id": msg.match_id,
+        "sender_id": msg.sender_id,
+        "receiver_id": msg.receiver_id,
+        "content": msg.content,
+        "media_url": msg.media_url,
+        "media_type": msg.media_type,
+        "view_once": msg.view_once,
+        "viewed": msg.viewed,
+        "created_at": msg.created_at.isoformat() if msg.created_at else None
     }
 
+MESSAGE_PREVIEW_LENGTH = 200
+
+def message_preview(message: Message) -> str:
+    if message.content:
+        return message.content[:MESSAGE_PREVIEW_LENGTH]
+    return f"[{message.media_type or 'media'}]"
+
 @api_router.post("/messages")
 async def send_message(msg_data: dict, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    sender_id = current_user["user_id"]
+    match_result = await db.execute(
+        select(Match.user1_id, Match.user2_id).where(
+            and_(
+                Match.id == msg_data["match_id"],
+                or_(Match.user1_id == sender_id, Match.user2_id == sender_id)
+            )
+        )
+    )
+    match = match_result.one_or_none()
+    
+    if not match:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    # The receiver is the other side of the match, whatever the client sent
     message = Message(
         id=str(uuid.uuid4()),
         match_id=msg_data["match_id"],
-        sender_id=current_user["user_id"],
-        receiver_id=msg_data["receiver_id"],
+        sender_id=sender_id,
+        receiver_id=match.user2_id if match.user1_id == sender_id else match.user1_id,
         content=msg_data.get("content"),
         media_url=msg_data.get("media_url"),
         media_type=msg_data.get("media_type"),
@@ -736,13 +1115,26 @@ async def send_message(msg_data: dict, current_user: dict = Depends(get_current_
     
     db.add(message)
     
-    # Update match last_message_at
+    # Update the match's inbox summary in the same transaction
+    receiver_id = message.receiver_id
     await db.execute(
-        update(Match).where(Match.id == msg_data["match_id"]).values(last_message_at=message.created_at)
+        update(Match).where(Match.id == msg_data["match_id"]).values(
+            last_message_at=message.created_at,
+            last_message_id=message.id,
+            last_message_preview=message_preview(message),
+            last_sender_id=message.sender_id,
+            user1_unread_count=case((Match.user1_id == receiver_id, Match.user1_unread_count + 1), else_=Match.user1_unread_count),
+            user2_unread_count=case((Match.user2_id == receiver_id, Match.user2_unread_count + 1), else_=Match.user2_unread_count)
+        )
     )
     
     await db.commit()
     
+    # Push to the receiver and to the sender's other open sessions
+    event = {"type": "message", "message": serialize_message(message)}
+    message_hub.publish(message.receiver_id, event)
+    message_hub.publish(message.sender_id, event)
+    
     return {
         "id": message.id,
         "match_id": message.match_id,
@@ -752,41 +1144,170 @@ async def send_message(msg_data: dict, current_user: dict = Depends(get_current_
         "created_at": message.created_at.isoformat()
     }
 
+# ============= READ RECEIPTS =============
+
+READ_ACK_FLUSH_SECONDS = float(os.environ.get('READ_ACK_FLUSH_SECONDS', '1'))
+
+async def flush_read_acks(acks: dict):
+    """Mark acknowledged messages viewed and take them off the unread counters, one statement per batch"""
+    keys = list(acks)
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            WITH acks AS (
+                SELECT * FROM unnest(CAST(:match_ids AS varchar[]), CAST(:reader_ids AS varchar[]), CAST(:seen_at AS timestamptz[]))
+                    AS a(match_id, reader_id, seen_at)
+            ),
+            marked AS (
+                UPDATE messages m SET viewed = true
+                FROM acks
+                WHERE m.match_id = acks.match_id AND m.receiver_id = acks.reader_id
+                    AND m.viewed = false AND m.created_at <= acks.seen_at
+                RETURNING m.match_id, m.receiver_id
+            ),
+            marked_counts AS (
+                SELECT match_id, receiver_id, count(*) AS n FROM marked GROUP BY match_id, receiver_id
+            )
+            UPDATE matches SET
+                user1_unread_count = GREATEST(user1_unread_count - COALESCE(
+                    (SELECT n FROM marked_counts c WHERE c.match_id = matches.id AND c.receiver_id = matches.user1_id), 0), 0),
+                user2_unread_count = GREATEST(user2_unread_count - COALESCE(
+                    (SELECT n FROM marked_counts c WHERE c.match_id = matches.id AND c.receiver_id = matches.user2_id), 0), 0)
+            WHERE id IN (SELECT match_id FROM marked_counts)
+        """), {
+            "match_ids": [match_id for match_id, _ in keys],
+            "reader_ids": [reader_id for _, reader_id in keys],
+            "seen_at": [acks[key] for key in keys],
+        })
+
+# Acks for the same conversation and reader collapse into the newest one
+read_acks = WriteBehindBuffer(flush_read_acks, interval=READ_ACK_FLUSH_SECONDS, merge=max, name="read-acks")
+
+@api_router.post("/messages/{match_id}/ack")
+async def ack_messages(match_id: str, ack: MessageAck, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Mark everything up to the given message as seen; written in the background"""
+    user_id = current_user["user_id"]
+    result = await db.execute(
+        select(Message.created_at).where(
+            Message.id == ack.last_seen_message_id,
+            Message.match_id == match_id,
+            or_(Message.receiver_id == user_id, Message.sender_id == user_id)
+        )
+    )
+    seen_at = result.scalar_one_or_none()
+    if seen_at is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    
+    read_acks.add((match_id, user_id), seen_at)
+    return {"acknowledged": True}
+
+# ============= REAL-TIME PUSH =============
+
+MESSAGE_PUSH_HEARTBEAT_SECONDS = float(os.environ.get('MESSAGE_PUSH_HEARTBEAT_SECONDS', '25'))
+MESSAGE_PUSH_MAX_PENDING = int(os.environ.get('MESSAGE_PUSH_MAX_PENDING', '100'))
+MESSAGE_RESUME_LIMIT = 500
+
+message_hub = ConnectionHub(max_pending=MESSAGE_PUSH_MAX_PENDING)
+
+async def messages_after(user_id: str, last_message_id: str, limit: int):
+    """Messages to or from user_id that are newer than last_message_id, oldest
+    first, or None when last_message_id is not one of the user's messages (it
+    was deleted, or never existed) and there is nothing to resume from"""
+    async with AsyncSessionLocal() as db:
+        anchor = (await db.execute(
+            select(Message.created_at).where(
+                Message.id == last_message_id,
+                or_(Message.receiver_id == user_id, Message.sender_id == user_id)
+            )
+        )).scalar_one_or_none()
+        if anchor is None:
+            return None
+        result = await db.execute(
+            select(Message).where(
+                or_(Message.receiver_id == user_id, Message.sender_id == user_id),
+                or_(
+                    Message.created_at > anchor,
+                    and_(Message.created_at == anchor, Message.id > last_message_id)
+                )
+            ).order_by(Message.created_at.asc(), Message.id.asc()).limit(limit)
+        )
+        return result.scalars().all()
+
+async def push_events(websocket: WebSocket, queue: asyncio.Queue):
+    """Forward hub events to the socket, sending a ping whenever the line is idle"""
+    while True:
+        try:
+            event = await asyncio.wait_for(queue.get(), timeout=MESSAGE_PUSH_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            event = {"type": "ping"}
+        if event is None:
+            await websocket.close(code=1013)
+            return
+        await websocket.send_json(event)
+
+async def receive_heartbeats(websocket: WebSocket):
+    """Answer client pings until the client goes away"""
+    while True:
+        if await websocket.receive_text() == "ping":
+            await websocket.send_json({"type": "pong"})
+
+@api_router.websocket("/ws/messages")
+async def messages_socket(websocket: WebSocket, token: str = Query(...), last_message_id: Optional[str] = None):
+    # Browsers cannot set headers on a WebSocket, so the token comes in the query string
+    payload = token_cache.verify(token)
+    user_id = payload.get("sub") if payload else None
+    if user_id is None:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    # Subscribe before replaying so nothing sent in between is lost; clients dedupe by id
+    queue = message_hub.subscribe(user_id)
+    tasks = []
+    try:
+        if last_message_id:
+            missed = await messages_after(user_id, last_message_id, MESSAGE_RESUME_LIMIT + 1)
+            # Too much to replay, or no anchor to replay from: the client refetches
+            if missed is None or len(missed) > MESSAGE_RESUME_LIMIT:
+                await websocket.send_json({"type": "resync"})
+            else:
+                for msg in missed:
+                    await websocket.send_json({"type": "message", "message": serialize_message(msg)})
+        
+        tasks = [asyncio.create_task(push_events(websocket, queue)), asyncio.create_task(receive_heartbeats(websocket))]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not isinstance(task.exception(), (WebSocketDisconnect, type(None))):
+                raise task.exception()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        message_hub.unsubscribe(user_id, queue)
+
 # ============= PROMPTS =============
 
+# Loaded once from PROMPT_CATALOG_PATH (a JSON list) or the built-in library
+prompt_catalog = PromptCatalog(os.environ.get('PROMPT_CATALOG_PATH') or None)
+PROMPTS_CACHE_CONTROL = "public, max-age=300"
+
 @api_router.get("/prompts")
-async def get_prompts():
-    return [
-        {"id": "1", "category": "The Basics", "question": "A fun fact about me..."},
-        {"id": "2", "category": "The Basics", "question": "I'm looking for..."},
-        {"id": "3", "category": "The Basics", "question": "My perfect weekend looks like..."},
-        {"id": "4", "category": "Lifestyle", "question": "My travel bucket list includes..."},
-        {"id": "5", "category": "Lifestyle", "question": "I feel most alive when..."},
-        {"id": "6", "category": "Lifestyle", "question": "My guilty pleasure is..."},
-        {"id": "7", "category": "Lifestyle", "question": "I can't live without..."},
-        {"id": "8", "category": "The Arrangement", "question": "I show appreciation by..."},
-        {"id": "9", "category": "The Arrangement", "question": "Generosity means..."},
-        {"id": "10", "category": "The Arrangement", "question": "My love language is..."},
-        {"id": "11", "category": "The Arrangement", "question": "I spoil by..."},
-        {"id": "12", "category": "The Basics", "question": "My ideal first date..."},
-        {"id": "13", "category": "Lifestyle", "question": "I'm passionate about..."},
-        {"id": "14", "category": "Lifestyle", "question": "My favorite luxury is..."},
-        {"id": "15", "category": "The Arrangement", "question": "What I value most in a connection..."},
-    ]
+async def get_prompts(category: Optional[str] = None, if_none_match: Optional[str] = Header(None)):
+    encoded = prompt_catalog.encoded(category)
+    if etag_matches(if_none_match, encoded.etag):
+        return not_modified(encoded.etag, PROMPTS_CACHE_CONTROL)
+    return cached_body(encoded.body, encoded.etag, PROMPTS_CACHE_CONTROL)
 
 # ============= SUBSCRIPTION =============
 
 @api_router.post("/subscription/subscribe")
-async def subscribe(data: dict, current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def subscribe(data: dict, user: User = Depends(load_current_user), db: AsyncSession = Depends(get_db)):
     duration_months = data.get("duration_months", 1)
     subscription_ends = datetime.now(timezone.utc) + timedelta(days=30*duration_months)
     
-    result = await db.execute(select(User).where(User.id == current_user["user_id"]))
-    user = result.scalar_one_or_none()
-    if user:
-        user.is_premium = True
-        user.subscription_ends = subscription_ends
-        await db.commit()
+    user.is_premium = True
+    user.subscription_ends = subscription_ends
+    await db.commit()
     
     return {"success": True, "subscription_ends": subscription_ends.isoformat()}
 
@@ -794,26 +1315,55 @@ async def subscribe(data: dict, current_user: dict = Depends(get_current_user),
 
 @api_router.get("/admin/users")
 async def get_all_users(current_user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User))
-    users = result.scalars().all()
+    result = await db.execute(ADMIN_USER_ROW.select())
     
+    return {"users": ADMIN_USER_ROW.to_dicts(result.all())}
+
+@api_router.post("/admin/prompts/reload")
+async def reload_prompt_catalog(current_user: dict = Depends(require_admin)):
+    """Re-read the prompt catalog in this worker; a bad source keeps the current catalog"""
+    try:
+        prompt_catalog.reload()
+    except PromptCatalogError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return prompt_catalog.metrics()
+
+@api_router.get("/admin/media/jobs/{key}")
+async def get_derivative_job(key: str, current_user: dict = Depends(require_admin)):
+    job = image_pipeline.get(key)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No derivative job for this key")
+    return job.to_dict()
+
+@api_router.post("/admin/media/{key}/reprocess")
+async def reprocess_media(key: str, current_user: dict = Depends(require_admin)):
+    """Re-render every size of a stored photo, replacing existing renditions"""
+    try:
+        path = media_store.path_for(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Not found")
+    if path.suffix[1:] not in PHOTO_EXTENSIONS or not await asyncio.to_thread(path.is_file):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        job = image_pipeline.submit(key, force=True)
+    except ImagePipelineFull:
+        raise HTTPException(status_code=503, detail="Image pipeline is busy, try again shortly", headers={"Retry-After": "5"})
+    return job.to_dict()
+
+@api_router.get("/admin/metrics")
+async def get_metrics(current_user: dict = Depends(require_admin)):
     return {
-        "users": [
-            {
-                "id": u.id,
-                "email": u.email,
-                "phone": u.phone,
-                "role": u.role,
-                "first_name": u.first_name,
-                "email_verified": u.email_verified,
-                "phone_verified": u.phone_verified,
-                "face_verified": u.face_verified,
-                "is_premium": u.is_premium,
-                "is_banned": u.is_banned,
-                "created_at": u.created_at.isoformat() if u.created_at else None
-            }
-            for u in users
-        ]
+        "read_acks": read_acks.metrics(),
+        "activity": activity.metrics(),
+        "password_pool": password_pool.metrics(),
+        "token_cache": token_cache.metrics(),
+        "hot_users": hot_users.metrics(),
+        "notifications": notification_queue.metrics(),
+        "phone_metadata": phone_metadata.metrics(),
+        "prompt_catalog": prompt_catalog.metrics(),
+        "media": media_store.metrics(),
+        "image_pipeline": image_pipeline.metrics(),
+        "message_push_connections": message_hub.connection_count(),
     }
 
 @api_router.get("/admin/stats")
@@ -847,9 +1397,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def backfill_match_summaries():
+    """Fill inbox summaries for conversations that predate them"""
+    async with engine.begin() as conn:
+        result = await conn.execute(text("""
+            UPDATE matches m SET
+                last_message_id = last.id,
+                last_message_preview = COALESCE(left(last.content, :preview_length), '[' || COALESCE(last.media_type, 'media') || ']'),
+                last_sender_id = last.sender_id,
+                last_message_at = last.created_at,
+                user1_unread_count = (SELECT count(*) FROM messages u WHERE u.match_id = m.id AND u.receiver_id = m.user1_id AND u.viewed = false),
+                user2_unread_count = (SELECT count(*) FROM messages u WHERE u.match_id = m.id AND u.receiver_id = m.user2_id AND u.viewed = false)
+            FROM matches legacy
+            CROSS JOIN LATERAL (
+                SELECT id, content, media_type, sender_id, created_at
+                FROM messages
+                WHERE match_id = legacy.id
+                ORDER BY created_at DESC, id DESC
+                LIMIT 1
+            ) AS last
+            WHERE legacy.id = m.id AND legacy.last_message_at IS NOT NULL AND legacy.last_message_id IS NULL
+        """), {"preview_length": MESSAGE_PREVIEW_LENGTH})
+    if result.rowcount:
+        logger.info(f"Backfilled inbox summaries for {result.rowcount} matches")
+
 # Create tables on startup
 @app.on_event("startup")
 async def startup():
+    phone_metadata.start()
+    media_store.start()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables created/verified")
+    await backfill_match_summaries()
+    candidate_queue.start()
+    read_acks.start()
+    activity.start()
+    password_pool.start()
+    await provider_clients.start()
+    notification_queue.start()
+    otp_store.start(sweep_interval=OTP_SWEEP_SECONDS)
+    image_pipeline.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await candidate_queue.stop()
+    await read_acks.stop()
+    await activity.stop()
+    await password_pool.stop()
+    await notification_queue.stop()
+    await provider_clients.close()
+    await otp_store.stop()
+    await image_pipeline.stop()
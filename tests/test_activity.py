@@ -0,0 +1,116 @@
+"""
+INDULGE activity tracking tests
+Exercises the write-behind last_active buffer with an in-memory writer; no
+server or database needed.
+"""
+import pytest
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.activity import ActivityTracker
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, last_seen):
+        self.batches.append(dict(last_seen))
+
+
+async def simulate_requests(tracker, users, requests):
+    started = datetime.now(timezone.utc)
+    tracker.start()
+    for n in range(requests):
+        tracker.touch(f"user-{n % users}", started + timedelta(milliseconds=n))
+        if n % 500 == 0:
+            await asyncio.sleep(0)
+    await tracker.stop()
+    return started
+
+
+class TestActivityTracker:
+    """Authenticated requests collapse into a few bulk last_active writes"""
+
+    def test_thousands_of_requests_become_one_write(self):
+        writer = RecordingWriter()
+        tracker = ActivityTracker(writer, interval=60)
+        started = asyncio.run(simulate_requests(tracker, users=200, requests=5_000))
+
+        assert len(writer.batches) == 1
+        assert len(writer.batches[0]) == 200
+        # Each user keeps their latest request time
+        assert writer.batches[0]["user-0"] == started + timedelta(milliseconds=4_800)
+        assert tracker.metrics()["coalesced"] == 4_800
+        assert tracker.metrics()["pending"] == 0
+
+    def test_writes_are_batched_per_flush(self):
+        writer = RecordingWriter()
+        tracker = ActivityTracker(writer, interval=60)
+
+        async def run():
+            for round_number in range(3):
+                for n in range(1_000):
+                    tracker.touch(f"user-{n % 50}")
+                await tracker.flush()
+
+        asyncio.run(run())
+        assert [len(batch) for batch in writer.batches] == [50, 50, 50]
+        assert tracker.metrics()["flushes"] == 3
+
+    def test_background_loop_flushes_on_its_interval(self):
+        flushed = []
+
+        async def run():
+            written = asyncio.Event()
+
+            async def writer(last_seen):
+                flushed.append(dict(last_seen))
+                written.set()
+
+            tracker = ActivityTracker(writer, interval=0.01)
+            tracker.start()
+            tracker.touch("user-1")
+            # No stop() until the loop has written by itself
+            await asyncio.wait_for(written.wait(), timeout=5)
+            await tracker.stop()
+
+        asyncio.run(run())
+        assert set(flushed[0]) == {"user-1"}
+
+    def test_memory_is_bounded(self):
+        writer = RecordingWriter()
+        tracker = ActivityTracker(writer, interval=60, max_entries=100)
+        for n in range(1_000):
+            tracker.touch(f"user-{n}")
+
+        assert len(tracker) == 100
+        assert tracker.metrics()["dropped"] == 900
+
+    def test_failed_flush_is_retried(self):
+        attempts = []
+
+        async def flaky_writer(last_seen):
+            attempts.append(dict(last_seen))
+            if len(attempts) == 1:
+                raise ConnectionError("database unavailable")
+
+        tracker = ActivityTracker(flaky_writer, interval=60)
+
+        async def run():
+            tracker.touch("user-1")
+            await tracker.flush()
+            tracker.touch("user-2")
+            await tracker.flush()
+
+        asyncio.run(run())
+        assert set(attempts[1]) == {"user-1", "user-2"}
+        assert tracker.metrics()["failed_flushes"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,67 @@
+"""
+INDULGE admin access tests
+Checks the admin role guard and which routes use it. No database is touched,
+but importing the server needs DATABASE_URL configured.
+"""
+import pytest
+import asyncio
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+load_dotenv(Path(__file__).resolve().parents[1] / '.env')
+if not os.environ.get('DATABASE_URL'):
+    pytest.skip("DATABASE_URL is not configured", allow_module_level=True)
+
+from fastapi import HTTPException
+
+import server
+
+ADMIN_ONLY = {
+    ("GET", "/api/admin/metrics"),
+    ("POST", "/api/admin/prompts/reload"),
+    ("GET", "/api/admin/media/jobs/{key}"),
+    ("POST", "/api/admin/media/{key}/reprocess"),
+}
+
+
+def dependencies(dependant):
+    for dependency in dependant.dependencies:
+        yield dependency.call
+        yield from dependencies(dependency)
+
+
+class TestAdminAccess:
+    """Admin routes need an admin token, and signup can't hand one out"""
+
+    def test_require_admin(self):
+        admin = {"user_id": "someone", "role": "admin"}
+
+        assert asyncio.run(server.require_admin(admin)) == admin
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(server.require_admin({"user_id": "someone", "role": "daddy"}))
+        assert e.value.status_code == 403
+
+    def test_admin_routes_require_admin(self):
+        guarded = {
+            (method, route.path)
+            for route in server.app.routes if hasattr(route, "dependant")
+            for method in getattr(route, "methods", ())
+            if server.require_admin in dependencies(route.dependant)
+        }
+
+        assert ADMIN_ONLY <= guarded
+
+    def test_signup_rejects_admin_role(self):
+        user_data = server.UserCreate(email="admin@example.com", phone="+15555550100", password="secret", role="admin", first_name="Admin")
+
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(server.signup(user_data, db=None))
+        assert e.value.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,232 @@
+"""
+INDULGE candidate queue tests
+Exercises the per-user discovery queue with the in-memory backend and a
+fake candidate source; no server or database needed.
+"""
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.candidate_queue import CandidateQueue, InMemoryCandidateQueueBackend, StaleCursor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CandidatePool:
+    """Stands in for the ranked database query: the first `limit` ids not excluded"""
+
+    def __init__(self, size):
+        self.ids = [f"candidate-{n}" for n in range(size)]
+        self.calls = []
+
+    async def __call__(self, user_id, exclude_ids, limit):
+        self.calls.append((user_id, set(exclude_ids), limit))
+        return [candidate_id for candidate_id in self.ids if candidate_id not in exclude_ids][:limit]
+
+
+def make_queue(pool_size=1_000, depth=50, refill_threshold=10, history=1_000, **backend_options):
+    backend = InMemoryCandidateQueueBackend(**backend_options)
+    pool = CandidatePool(pool_size)
+    return CandidateQueue(backend, pool, depth=depth, refill_threshold=refill_threshold, history=history), backend, pool
+
+
+async def read_pages(queue, user_id, pages, count=20, cursor=None):
+    served = []
+    for _ in range(pages):
+        ids, cursor = await queue.page(user_id, cursor, count)
+        served += ids
+        if cursor is None:
+            break
+    return served, cursor
+
+
+class TestInMemoryBackend:
+    """Entries keep their push order and sequence until discarded"""
+
+    def test_push_and_page_in_order(self):
+        backend = InMemoryCandidateQueueBackend()
+
+        async def run():
+            await backend.push("viewer", ["a", "b", "c", "a"])
+            first = await backend.page("viewer", None, 2)
+            rest = await backend.page("viewer", first[-1][0], 10)
+            return first, rest, await backend.size("viewer")
+
+        first, rest, size = asyncio.run(run())
+        assert [cid for _, cid in first] == ["a", "b"]
+        assert [cid for _, cid in rest] == ["c"]
+        assert size == 3
+        assert [seq for seq, _ in first + rest] == sorted(seq for seq, _ in first + rest)
+
+    def test_discarded_entries_are_skipped(self):
+        backend = InMemoryCandidateQueueBackend()
+
+        async def run():
+            await backend.push("viewer", ["a", "b", "c"])
+            await backend.discard("viewer", "b")
+            await backend.discard("viewer", "missing")
+            return await backend.page("viewer", None, 10), await backend.count_after("viewer", None)
+
+        page, count = asyncio.run(run())
+        assert [cid for _, cid in page] == ["a", "c"]
+        assert count == 2
+
+    def test_queues_are_per_user(self):
+        backend = InMemoryCandidateQueueBackend()
+
+        async def run():
+            await backend.push("one", ["a"])
+            await backend.push("two", ["b"])
+            return await backend.exclusions("one"), await backend.exclusions("two")
+
+        assert asyncio.run(run()) == ({"a"}, {"b"})
+
+    def test_idle_queues_are_dropped(self):
+        clock = FakeClock()
+        backend = InMemoryCandidateQueueBackend(idle_ttl=60, clock=clock)
+
+        async def run():
+            await backend.push("idle", ["a"])
+            await backend.push("active", ["b"])
+            clock.now += 45
+            await backend.size("active")
+            clock.now += 45
+            return await backend.size("idle"), await backend.size("active")
+
+        assert asyncio.run(run()) == (0, 1)
+
+    def test_number_of_queues_is_bounded(self):
+        backend = InMemoryCandidateQueueBackend(max_users=100)
+
+        async def run():
+            for n in range(1_000):
+                await backend.push(f"user-{n}", ["a", "b"])
+            return await backend.size("user-0"), await backend.size("user-999")
+
+        assert asyncio.run(run()) == (0, 2)
+        assert len(backend) == 100
+
+
+class TestCandidateQueue:
+    """Pages come from the queue; swipes consume; refills top it up"""
+
+    def test_first_page_refills_an_empty_queue(self):
+        queue, backend, pool = make_queue()
+
+        async def run():
+            return await queue.page("viewer", None, 20), await backend.size("viewer")
+
+        (ids, cursor), size = asyncio.run(run())
+        assert ids == [f"candidate-{n}" for n in range(20)]
+        assert cursor
+        assert size == 50
+        assert pool.calls == [("viewer", set(), 50)]
+
+    def test_cursor_continues_where_the_page_ended(self):
+        queue, _, _ = make_queue()
+
+        async def run():
+            first, cursor = await queue.page("viewer", None, 20)
+            second, _ = await queue.page("viewer", cursor, 20)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert second == [f"candidate-{n}" for n in range(20, 40)]
+        assert not set(first) & set(second)
+
+    def test_consumed_candidates_are_not_served_again(self):
+        queue, backend, _ = make_queue()
+
+        async def run():
+            ids, _ = await queue.page("viewer", None, 5)
+            await queue.consume("viewer", ids[0])
+            return await queue.page("viewer", None, 5), await backend.size("viewer")
+
+        (ids, _), size = asyncio.run(run())
+        assert "candidate-0" not in ids
+        assert size == 49
+
+    def test_refill_skips_queued_candidates(self):
+        queue, backend, pool = make_queue()
+
+        async def run():
+            await queue.refill("viewer")
+            for n in range(10):
+                await queue.consume("viewer", f"candidate-{n}")
+            added = await queue.refill("viewer")
+            return added, await backend.size("viewer")
+
+        added, size = asyncio.run(run())
+        assert added == 10
+        assert size == 50
+        assert pool.calls[-1][1] == {f"candidate-{n}" for n in range(10, 50)}
+
+    def test_invalid_cursor_is_rejected(self):
+        queue, _, _ = make_queue()
+
+        with pytest.raises(ValueError):
+            asyncio.run(queue.page("viewer", "not a cursor", 20))
+
+    def test_cursor_from_another_epoch_is_stale(self):
+        queue, _, _ = make_queue()
+        restarted, _, _ = make_queue()
+
+        async def run():
+            _, cursor = await queue.page("viewer", None, 20)
+            await restarted.page("viewer", cursor, 20)
+
+        with pytest.raises(StaleCursor):
+            asyncio.run(run())
+
+
+class TestPagingWithoutSwiping:
+    """Reading pages never runs the feed dry while the pool has candidates"""
+
+    def test_paging_past_the_queue_depth_fetches_more(self):
+        queue, _, _ = make_queue(pool_size=1_000, depth=50)
+
+        served, cursor = asyncio.run(read_pages(queue, "viewer", pages=10))
+        assert len(served) == 200
+        assert len(set(served)) == 200
+        assert cursor
+
+    def test_feed_ends_when_the_pool_is_exhausted(self):
+        queue, _, _ = make_queue(pool_size=90, depth=50)
+
+        served, cursor = asyncio.run(read_pages(queue, "viewer", pages=10))
+        assert sorted(served) == sorted(f"candidate-{n}" for n in range(90))
+        assert cursor is None
+
+    def test_refill_tops_up_ahead_of_the_reader(self):
+        queue, backend, pool = make_queue(depth=50)
+
+        async def run():
+            await queue.refill("viewer")
+            entries = await backend.page("viewer", None, 45)
+            added = await queue.refill("viewer", entries[-1][0])
+            return added, await backend.count_after("viewer", entries[-1][0])
+
+        assert asyncio.run(run()) == (45, 50)
+        assert pool.calls[-1][2] == 45
+
+    def test_served_history_is_bounded(self):
+        queue, backend, _ = make_queue(pool_size=10_000, depth=50, history=100)
+
+        served, _ = asyncio.run(read_pages(queue, "viewer", pages=40))
+        assert len(served) == 800
+        assert asyncio.run(backend.size("viewer")) <= 150
+        # Only candidates older than the kept history can come round again
+        assert all(len(set(served[n:n + 100])) == 100 for n in range(len(served) - 100))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
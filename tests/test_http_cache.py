@@ -0,0 +1,44 @@
+"""
+INDULGE HTTP cache helper tests
+Covers ETag construction and If-None-Match matching; no server or database
+needed.
+"""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.http_cache import content_etag, etag_matches, not_modified, version_etag
+
+
+class TestETags:
+    """ETags change with content and match the forms clients send back"""
+
+    def test_content_etag_ignores_key_order(self):
+        assert content_etag({"a": 1, "b": [1, 2]}) == content_etag({"b": [1, 2], "a": 1})
+        assert content_etag({"a": 1}) != content_etag({"a": 2})
+
+    def test_version_etag_includes_every_part(self):
+        assert version_etag("user-1", 3) == '"user-1-3"'
+        assert version_etag("user-1", 3) != version_etag("user-2", 3)
+
+    def test_if_none_match_forms(self):
+        etag = version_etag("user-1", 3)
+
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches(None, etag)
+        assert not etag_matches(version_etag("user-1", 2), etag)
+
+    def test_not_modified_has_no_body(self):
+        response = not_modified('"v1"', "private, no-cache")
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == '"v1"'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
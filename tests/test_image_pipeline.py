@@ -0,0 +1,191 @@
+"""
+INDULGE image pipeline tests
+Covers photo rendition jobs against a temporary media store, run inline;
+no server or database needed.
+"""
+import pytest
+import asyncio
+import io
+import sys
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.image_pipeline import DERIVATIVE_SIZES, DONE, FAILED, ImagePipeline, ImagePipelineFull
+from utils.media_store import LocalObjectStore
+
+
+async def one_chunk(data):
+    yield data
+
+
+def jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (180, 40, 90)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def stored_photo(tmp_path, data=None):
+    store = LocalObjectStore(tmp_path)
+    stored = asyncio.run(store.put(one_chunk(data or jpeg(1200, 1600)), "jpg"))
+    return store, stored.key
+
+
+class TestImagePipeline:
+    """Photos get one WEBP per size; jobs are idempotent per object key"""
+
+    def test_renders_every_size_within_its_bounds(self, tmp_path):
+        store, key = stored_photo(tmp_path)
+        pipeline = ImagePipeline(store, workers=0)
+
+        job = pipeline.submit(key)
+        asyncio.run(pipeline.process(job))
+
+        assert job.status == DONE
+        for name, edge in DERIVATIVE_SIZES.items():
+            with Image.open(store.derivative_path(key, name)) as image:
+                assert image.format == "WEBP"
+                assert max(image.size) == min(edge, 1600)
+                assert image.size[0] / image.size[1] == pytest.approx(0.75, abs=0.01)
+
+    def test_resubmitting_returns_the_same_job(self, tmp_path):
+        store, key = stored_photo(tmp_path)
+        pipeline = ImagePipeline(store, workers=0)
+
+        first = pipeline.submit(key)
+        assert pipeline.submit(key) is first
+        asyncio.run(pipeline.process(first))
+        assert pipeline.submit(key) is first
+        assert pipeline.stats["submitted"] == 1
+
+    def test_force_rerenders_existing_sizes(self, tmp_path):
+        store, key = stored_photo(tmp_path)
+        pipeline = ImagePipeline(store, workers=0)
+        asyncio.run(pipeline.process(pipeline.submit(key)))
+
+        skipped = ImagePipeline(store, workers=0)
+        job = skipped.submit(key)
+        asyncio.run(skipped.process(job))
+        assert job.status == DONE and job.written == {}
+
+        forced = pipeline.submit(key, force=True)
+        asyncio.run(pipeline.process(forced))
+        assert set(forced.written) == set(DERIVATIVE_SIZES)
+
+    def test_undecodable_upload_fails_the_job(self, tmp_path):
+        store, key = stored_photo(tmp_path, data=b"not an image")
+        pipeline = ImagePipeline(store, workers=0)
+
+        job = pipeline.submit(key)
+        asyncio.run(pipeline.process(job))
+
+        assert job.status == FAILED
+        assert pipeline.metrics()["failed"] == 1
+
+    def test_oversized_canvas_fails_before_decoding(self, tmp_path):
+        store, key = stored_photo(tmp_path, data=jpeg(1200, 1600))
+        pipeline = ImagePipeline(store, workers=0, max_pixels=1_000_000)
+
+        job = pipeline.submit(key)
+        asyncio.run(pipeline.process(job))
+
+        assert job.status == FAILED
+        assert "exceeds 1000000 pixels" in job.last_error
+        assert not store.derivative_path(key, "thumb").exists()
+
+    def test_queue_is_bounded(self, tmp_path):
+        store, key = stored_photo(tmp_path)
+        _, other_key = stored_photo(tmp_path, data=jpeg(10, 10))
+        pipeline = ImagePipeline(store, workers=0, max_pending=1)
+
+        pipeline.submit(key)
+        with pytest.raises(ImagePipelineFull):
+            pipeline.submit(other_key)
+
+
+class TestFailedJobs:
+    """A failed photo is retried with backoff, a few times, not on every request"""
+
+    def fail_once(self, pipeline, key):
+        job = pipeline.submit(key)
+        asyncio.run(pipeline.process(job))
+        assert job.status == FAILED
+        return job
+
+    def test_failed_job_is_not_resubmitted_during_backoff(self, tmp_path):
+        store, key = stored_photo(tmp_path, data=b"not an image")
+        clock = FakeClock()
+        pipeline = ImagePipeline(store, workers=0, retry_backoff=60, clock=clock)
+        failed = self.fail_once(pipeline, key)
+
+        # Every /media/{key}/card hit submits again; none of them re-queue it
+        assert all(pipeline.submit(key) is failed for _ in range(100))
+        assert pipeline.metrics()["pending"] == 0
+
+        clock.now += 60
+        retry = pipeline.submit(key)
+        assert retry is not failed
+        assert (retry.attempts, pipeline.metrics()["retried"]) == (1, 1)
+
+    def test_backoff_doubles_and_attempts_are_capped(self, tmp_path):
+        store, key = stored_photo(tmp_path, data=b"not an image")
+        clock = FakeClock()
+        pipeline = ImagePipeline(store, workers=0, max_attempts=3, retry_backoff=60, clock=clock)
+
+        job = self.fail_once(pipeline, key)
+        clock.now += 60
+        job = pipeline.submit(key)
+        asyncio.run(pipeline.process(job))
+        assert job.retry_at == clock.now + 120
+        clock.now += 120
+        job = pipeline.submit(key)
+        asyncio.run(pipeline.process(job))
+
+        clock.now += 10_000
+        assert pipeline.submit(key) is job
+        assert job.attempts == 3
+        assert pipeline.metrics()["failed"] == 3
+
+    def test_force_resubmits_a_failed_job(self, tmp_path):
+        store, key = stored_photo(tmp_path, data=b"not an image")
+        pipeline = ImagePipeline(store, workers=0, max_attempts=1)
+        failed = self.fail_once(pipeline, key)
+
+        assert pipeline.submit(key) is failed
+        assert pipeline.submit(key, force=True) is not failed
+
+
+class TestPipelineShutdown:
+    def test_stop_does_not_block_the_event_loop(self, tmp_path):
+        store, _ = stored_photo(tmp_path)
+        pipeline = ImagePipeline(store, workers=1, use_processes=False)
+
+        async def run():
+            pipeline.start()
+            release = threading.Event()
+            # Releases the worker even if stop() blocks the loop, so a regression fails instead of hanging
+            threading.Timer(1, release.set).start()
+            busy = pipeline._executor.submit(release.wait)
+            stopping = asyncio.create_task(pipeline.stop())
+            # The loop keeps running while stop() waits for the busy worker
+            await asyncio.sleep(0.01)
+            still_stopping = not stopping.done()
+            release.set()
+            await stopping
+            return still_stopping, busy.result()
+
+        assert asyncio.run(run()) == (True, True)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
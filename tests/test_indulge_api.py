@@ -6,6 +6,8 @@ import pytest
 import requests
 import os
 import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -355,6 +357,61 @@ class TestDiscovery:
         print(f"SUCCESS: Discovery feed returned {len(data['profiles'])} profiles")
 
 
+class TestConcurrentMutualLikes:
+    """Simultaneous mutual likes must create exactly one match"""
+    
+    PAIRS = 10
+    RETRIES = 3
+    
+    def signup(self, role):
+        signup_data = {
+            "email": f"test_{uuid.uuid4().hex[:8]}@example.com",
+            "phone": TEST_USER_PHONE,
+            "password": TEST_USER_PASSWORD,
+            "first_name": f"Concurrent{role.title()}",
+            "role": role
+        }
+        response = requests.post(f"{BASE_URL}/api/auth/signup", json=signup_data)
+        assert response.status_code == 200, f"Signup failed: {response.text}"
+        data = response.json()
+        return data["user"]["id"], {"Authorization": f"Bearer {data['token']}"}
+    
+    def test_simultaneous_mutual_likes_create_one_match(self):
+        """Both sides like each other at the same instant, several times over"""
+        pairs = [(self.signup("baby"), self.signup("daddy")) for _ in range(self.PAIRS)]
+        
+        # Every pair fires both likes (plus retries) through one barrier
+        requests_to_fire = []
+        for (baby_id, baby_headers), (daddy_id, daddy_headers) in pairs:
+            for _ in range(self.RETRIES):
+                requests_to_fire.append((baby_headers, daddy_id))
+                requests_to_fire.append((daddy_headers, baby_id))
+        barrier = threading.Barrier(len(requests_to_fire))
+        
+        def like(headers, to_user_id):
+            barrier.wait()
+            return requests.post(
+                f"{BASE_URL}/api/discovery/like",
+                json={"to_user_id": to_user_id, "liked_element": "profile"},
+                headers=headers
+            )
+        
+        with ThreadPoolExecutor(max_workers=len(requests_to_fire)) as pool:
+            responses = list(pool.map(lambda args: like(*args), requests_to_fire))
+        assert all(r.status_code == 200 for r in responses), [r.text for r in responses if r.status_code != 200]
+        
+        for (baby_id, baby_headers), (daddy_id, daddy_headers) in pairs:
+            for headers, other_id in ((baby_headers, daddy_id), (daddy_headers, baby_id)):
+                response = requests.get(f"{BASE_URL}/api/matches", headers=headers)
+                assert response.status_code == 200
+                pair_matches = [
+                    m for m in response.json()["matches"]
+                    if other_id in (m["user1_id"], m["user2_id"])
+                ]
+                assert len(pair_matches) == 1, f"Expected exactly one match, found {len(pair_matches)}"
+        print(f"SUCCESS: {self.PAIRS} pairs of simultaneous mutual likes each created exactly one match")
+
+
 class TestAdminStats:
     """Test admin endpoints"""
     
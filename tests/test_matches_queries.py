@@ -0,0 +1,497 @@
+"""
+INDULGE query regression tests
+Runs handlers in-process against the database in DATABASE_URL, counting the
+SQL statements they issue and checking the pages they return.
+"""
+import pytest
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parents[1] / '.env')
+if not os.environ.get('DATABASE_URL'):
+    pytest.skip("DATABASE_URL is not configured", allow_module_level=True)
+
+from sqlalchemy import event, insert, delete, select, text, or_
+
+from database import AsyncSessionLocal, engine, Base
+from fastapi import HTTPException
+
+from models_pg import User, Match, Message, Like, Pass
+import server
+
+PREFIX = f"test-queries-{uuid.uuid4().hex[:8]}"
+
+
+async def seed_matches(user_id, count):
+    """Create `count` matches for user_id, each with a few messages"""
+    other_ids = [f"{user_id}-other-{i}" for i in range(count)]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), user_rows(other_ids, role="daddy", first_name="Other"))
+        match_ids = [str(uuid.uuid4()) for _ in other_ids]
+        await db.execute(insert(Match), [match_row(mid, user_id, oid) for mid, oid in zip(match_ids, other_ids)])
+        await db.commit()
+        for n in range(3):
+            for mid, oid in zip(match_ids, other_ids):
+                await server.send_message(
+                    {"match_id": mid, "receiver_id": user_id, "content": f"message {n}"},
+                    current_user={"user_id": oid},
+                    db=db
+                )
+
+
+async def recorded(call):
+    """Run call() and return (the SQL statements it issued, its result)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        response = await call()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    return statements, response
+
+
+async def counted(call):
+    """Run call() and return (how many SQL statements it issued, its result)"""
+    statements, response = await recorded(call)
+    return len(statements), response
+
+
+def user_rows(user_ids, role="baby", first_name="Test"):
+    return [
+        {"id": uid, "email": f"{uid}@example.com", "password_hash": "x", "role": role, "first_name": first_name}
+        for uid in user_ids
+    ]
+
+
+def match_row(match_id, user1_id, user2_id):
+    return {"id": match_id, "user1_id": user1_id, "user2_id": user2_id, "match_context": "profile", "is_active": True}
+
+
+@asynccontextmanager
+async def seeded(users, matches=(), likes=()):
+    """Insert the given rows for the duration of a check; every PREFIX user, and
+    everything that cascades from them, is removed afterwards"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), list(users))
+        if matches:
+            await db.execute(insert(Match), list(matches))
+        if likes:
+            await db.execute(insert(Like), list(likes))
+        await db.commit()
+    try:
+        yield
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(User).where(User.id.like(f"{PREFIX}-%")))
+            await db.commit()
+        await engine.dispose()
+
+
+async def send(db, match_id, sender_id, content, receiver_id=None):
+    return await server.send_message(
+        {"match_id": match_id, "receiver_id": receiver_id, "content": content},
+        current_user={"user_id": sender_id},
+        db=db
+    )
+
+
+async def run_query_count_check():
+    few_id, many_id = f"{PREFIX}-few", f"{PREFIX}-many"
+    async with seeded(user_rows([few_id, many_id], first_name="Viewer")):
+        await seed_matches(few_id, 2)
+        await seed_matches(many_id, 40)
+
+        async def matches_of(user_id):
+            async with AsyncSessionLocal() as db:
+                return await counted(lambda: server.get_matches(current_user={"user_id": user_id}, db=db))
+
+        few_queries, few_result = await matches_of(few_id)
+        many_queries, many_result = await matches_of(many_id)
+        return few_queries, many_queries, few_result, many_result
+
+
+async def run_inbox_order_check():
+    user_id = f"{PREFIX}-inbox"
+    other_ids = [f"{user_id}-{n}" for n in range(4)]
+    # The viewer is user1 on even matches and user2 on odd ones
+    match_ids = {oid: str(uuid.uuid4()) for oid in other_ids}
+    matches = [
+        match_row(match_ids[oid], *((user_id, oid) if n % 2 == 0 else (oid, user_id)))
+        for n, oid in enumerate(other_ids)
+    ]
+    async with seeded(user_rows([user_id] + other_ids, first_name="Inbox"), matches):
+        async with AsyncSessionLocal() as db:
+            # other-3 never writes, so its match sorts last
+            for oid in (other_ids[1], other_ids[0], other_ids[2], other_ids[1]):
+                await send(db, match_ids[oid], oid, f"from {oid}")
+            result = await server.get_matches(current_user={"user_id": user_id}, db=db)
+        return other_ids, result["matches"]
+
+
+async def run_message_paging_check():
+    user_id, other_id = f"{PREFIX}-chat", f"{PREFIX}-chat-other"
+    match_id = str(uuid.uuid4())
+    async with seeded(user_rows([user_id, other_id], first_name="Chat"), [match_row(match_id, user_id, other_id)]):
+        async with AsyncSessionLocal() as db:
+            for n in range(120):
+                await send(db, match_id, other_id, f"message {n}")
+        pages = {}
+        async with AsyncSessionLocal() as db:
+            reader = {"user_id": user_id}
+            pages["latest"] = await server.get_messages(match_id, limit=50, current_user=reader, db=db)
+            oldest_loaded = pages["latest"]["messages"][0]["id"]
+            pages["before"] = await server.get_messages(match_id, before=oldest_loaded, limit=50, current_user=reader, db=db)
+            pages["first"] = await server.get_messages(match_id, before=pages["before"]["messages"][0]["id"], limit=50, current_user=reader, db=db)
+            pages["since"] = await server.get_messages(match_id, since=pages["before"]["messages"][-1]["id"], limit=10, current_user=reader, db=db)
+        return pages
+
+
+async def run_resume_check():
+    user_id, other_id, outsider_id = f"{PREFIX}-resume", f"{PREFIX}-resume-other", f"{PREFIX}-resume-x"
+    match_id, outsider_match_id = str(uuid.uuid4()), str(uuid.uuid4())
+    matches = [match_row(match_id, user_id, other_id), match_row(outsider_match_id, other_id, outsider_id)]
+    async with seeded(user_rows([user_id, other_id, outsider_id], first_name="Resume"), matches):
+        async with AsyncSessionLocal() as db:
+            sent = []
+            for n in range(10):
+                sender = other_id if n % 2 == 0 else user_id
+                sent.append((await send(db, match_id, sender, f"message {n}"))["id"])
+            outsider = await send(db, outsider_match_id, other_id, "not yours")
+            try:
+                await send(db, match_id, outsider_id, "let me in", receiver_id=user_id)
+            except HTTPException as e:
+                intruder = e.status_code
+            # The receiver comes from the match, not the request body
+            spoofed = await send(db, match_id, other_id, "spoofed", receiver_id=outsider_id)
+            await db.execute(delete(Message).where(Message.id == spoofed["id"]))
+            await db.commit()
+        results = {
+            "intruder": intruder,
+            "spoofed": spoofed["receiver_id"],
+            "middle": await server.messages_after(user_id, sent[3], 100),
+            "limited": await server.messages_after(user_id, sent[3], 2),
+            "latest": await server.messages_after(user_id, sent[-1], 100),
+            "unknown": await server.messages_after(user_id, str(uuid.uuid4()), 100),
+            "not_theirs": await server.messages_after(user_id, outsider["id"], 100),
+        }
+        return sent, results
+
+
+async def run_read_ack_check():
+    user_id, other_id = f"{PREFIX}-reader", f"{PREFIX}-reader-other"
+    match_id, other_match_id = str(uuid.uuid4()), str(uuid.uuid4())
+
+    async def ack(message_id, match=match_id):
+        async with AsyncSessionLocal() as db:
+            try:
+                return await server.ack_messages(match, server.MessageAck(last_seen_message_id=message_id), current_user={"user_id": user_id}, db=db)
+            except HTTPException as e:
+                return e.status_code
+
+    async def unread():
+        async with AsyncSessionLocal() as db:
+            viewed = await db.execute(select(Message.viewed).where(Message.match_id == match_id, Message.receiver_id == user_id).order_by(Message.created_at))
+            counts = await db.execute(select(Match.user1_unread_count, Match.user2_unread_count).where(Match.id == match_id))
+            return [not v for v in viewed.scalars().all()], tuple(counts.one())
+
+    async with seeded(user_rows([user_id, other_id], first_name="Reader"), [match_row(match_id, other_id, user_id)]):
+        async with AsyncSessionLocal() as db:
+            received = [(await send(db, match_id, other_id, f"message {n}"))["id"] for n in range(5)]
+            await send(db, match_id, user_id, "reply")
+        results = {"before": await unread()}
+        results["acks"] = [await ack(received[3]), await ack(received[1]), await ack(str(uuid.uuid4())), await ack(received[3], other_match_id)]
+        results["pending"] = len(server.read_acks)
+        results["flushed"] = await server.read_acks.flush()
+        results["after"] = await unread()
+        results["empty_flush"] = await server.read_acks.flush()
+        return results
+
+
+async def run_profile_update_check():
+    user_id = f"{PREFIX}-profile"
+    user = {
+        **user_rows([user_id], first_name="Profile")[0],
+        "age": 25, "photos": ["a.jpg", "b.jpg"], "prompts": [{"prompt_id": "1", "answer": "x"}, {"prompt_id": "2", "answer": "y"}],
+    }
+
+    async def xmin():
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT xmin::text FROM users WHERE id = :id"), {"id": user_id})).scalar_one()
+
+    async def put(data):
+        async with AsyncSessionLocal() as db:
+            queries, response = await counted(lambda: server.update_profile(data, current_user={"user_id": user_id}, db=db))
+        return queries, json.loads(response.body), response.headers["etag"]
+
+    async def get(etag):
+        server.hot_users.pop(user_id)
+        async with AsyncSessionLocal() as db:
+            return await counted(lambda: server.get_my_profile(if_none_match=etag, current_user={"user_id": user_id}, db=db))
+
+    async with seeded([user]):
+        results = {}
+        results["patch"] = await put({"age": 26, "photos": {"append": ["c.jpg"]}, "prompts": {"remove": [{"prompt_id": "2", "answer": "y"}]}})
+        before = await xmin()
+        results["unchanged"] = await put({"age": 26, "photos": ["a.jpg", "b.jpg", "c.jpg"]})
+        results["rewritten"] = before != await xmin()
+        server.hot_users.pop(user_id)
+        results["unchanged_cold"] = await put({"age": 26})
+        results["empty"] = await put({})
+        results["revalidated"] = await get(results["unchanged"][2])
+        results["stale"] = await get('"stale"')
+        return results
+
+
+async def run_swipe_batch_check():
+    viewer_id = f"{PREFIX}-swiper"
+    other_ids = [f"{viewer_id}-{n}" for n in range(4)]
+    users = user_rows([viewer_id], first_name="Swipe") + user_rows(other_ids, role="daddy", first_name="Swipe")
+    # other-0 already liked the viewer, so liking back is a match
+    likes = [{"id": str(uuid.uuid4()), "from_user_id": other_ids[0], "to_user_id": viewer_id, "liked_element": "profile"}]
+
+    async def swipe(*swipes):
+        batch = server.SwipeBatch(swipes=[server.SwipeDecision(**s) for s in swipes])
+        async with AsyncSessionLocal() as db:
+            try:
+                return await counted(lambda: server.record_swipes(batch, current_user={"user_id": viewer_id}, db=db))
+            except HTTPException as e:
+                return None, e
+
+    async def swiped(model):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(model.to_user_id).where(model.from_user_id == viewer_id))
+            return sorted(result.scalars().all())
+
+    async with seeded(users, likes=likes):
+        results = {}
+        results["unknown"] = await swipe(
+            {"to_user_id": other_ids[1], "action": "like"},
+            {"to_user_id": f"{viewer_id}-missing", "action": "pass"},
+        )
+        results["after_unknown"] = await swiped(Like), await swiped(Pass)
+        batch = [
+            {"to_user_id": other_ids[0], "action": "like"},
+            {"to_user_id": other_ids[1], "action": "like"},
+            {"to_user_id": other_ids[2], "action": "pass"},
+            {"to_user_id": other_ids[3], "action": "pass"},
+            {"to_user_id": other_ids[3], "action": "like"},
+            {"to_user_id": viewer_id, "action": "like"},
+        ]
+        results["first"] = await swipe(*batch)
+        results["retry"] = await swipe(*batch[:2])
+        results["likes"], results["passes"] = await swiped(Like), await swiped(Pass)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Match.id).where(or_(Match.user1_id == viewer_id, Match.user2_id == viewer_id)))
+            results["match_rows"] = len(result.all())
+        return other_ids, results
+
+
+async def run_discovery_refill_check(name):
+    # The candidate queue outlives the check, so each test brings its own viewer
+    viewer_id = f"{PREFIX}-{name}"
+    candidate_ids = [f"{viewer_id}-{n}" for n in range(5)]
+    async with seeded(user_rows([viewer_id], first_name="Refill") + user_rows(candidate_ids, role="daddy", first_name="Refill")):
+        results = {}
+        for excluded in (candidate_ids[:1], candidate_ids[:3]):
+            statements, served = await recorded(lambda: server.fetch_discovery_candidates(viewer_id, set(excluded), 10))
+            results[len(excluded)] = [cid for cid in served if cid.startswith(viewer_id)], statements
+        viewer = {"user_id": viewer_id}
+        async with AsyncSessionLocal() as db:
+            results["first_page"] = await counted(lambda: server.get_discovery_feed(None, limit=2, current_user=viewer, db=db))
+            cursor = results["first_page"][1]["next_cursor"]
+            results["next_page"] = await counted(lambda: server.get_discovery_feed(cursor, limit=2, current_user=viewer, db=db))
+        return candidate_ids, results
+
+
+class TestDiscoveryRefill:
+    """Queue refills exclude what is already queued with one array parameter"""
+
+    def test_exclusions_keep_one_statement_shape(self):
+        candidate_ids, results = asyncio.run(run_discovery_refill_check("refill"))
+
+        one, one_statements = results[1]
+        three, three_statements = results[3]
+        assert sorted(one) == candidate_ids[1:]
+        assert sorted(three) == candidate_ids[3:]
+        assert one_statements == three_statements
+
+    def test_feed_reads_the_viewer_only_to_refill(self):
+        _, results = asyncio.run(run_discovery_refill_check("feed"))
+
+        # An empty queue refills inline: viewer row, ranking batch, hydrate
+        queries, first = results["first_page"]
+        assert queries == 3
+        assert len(first["profiles"]) == 2
+        # A queued page is only hydrated
+        queries, following = results["next_page"]
+        assert queries == 1
+        assert len(following["profiles"]) == 2
+        assert not {p["id"] for p in first["profiles"]} & {p["id"] for p in following["profiles"]}
+
+
+class TestSwipeBatch:
+    """POST /api/discovery/swipes records a batch in two statements and is safe to retry"""
+
+    def test_batch_records_likes_passes_and_matches(self):
+        other_ids, results = asyncio.run(run_swipe_batch_check())
+
+        queries, response = results["first"]
+        assert queries == 2
+        assert response["recorded"] == 4
+        assert response["matches"] == [{"match_id": response["matches"][0]["match_id"], "user_id": other_ids[0], "new": True}]
+        # The last decision for a profile wins; swiping on yourself is ignored
+        assert results["likes"] == [other_ids[0], other_ids[1], other_ids[3]]
+        assert results["passes"] == [other_ids[2]]
+
+        queries, response = results["retry"]
+        assert response["matches"] == [{"match_id": results["first"][1]["matches"][0]["match_id"], "user_id": other_ids[0], "new": False}]
+        assert results["match_rows"] == 1
+
+    def test_unknown_profile_rejects_the_whole_batch(self):
+        other_ids, results = asyncio.run(run_swipe_batch_check())
+
+        _, error = results["unknown"]
+        assert error.status_code == 422
+        assert error.detail["to_user_ids"] == [f"{other_ids[0].rsplit('-', 1)[0]}-missing"]
+        assert results["after_unknown"] == ([], [])
+
+
+class TestProfileUpdate:
+    """PUT /api/profile/me is a single UPDATE that patches lists in place, and
+    GET revalidates against the row version"""
+
+    def test_patch_and_unchanged_writes(self):
+        results = asyncio.run(run_profile_update_check())
+
+        queries, profile, patched_etag = results["patch"]
+        assert queries == 1
+        assert profile["age"] == 26
+        assert profile["photos"] == ["a.jpg", "b.jpg", "c.jpg"]
+        assert profile["prompts"] == [{"prompt_id": "1", "answer": "x", "category": "The Basics", "question": "A fun fact about me..."}]
+        # Not covered by the version, so not in the ETagged body
+        assert "last_active" not in profile
+
+        queries, profile, unchanged_etag = results["unchanged"]
+        assert queries == 1
+        assert profile["photos"] == ["a.jpg", "b.jpg", "c.jpg"]
+        assert not results["rewritten"]
+        assert unchanged_etag == patched_etag
+
+        # Without a hot copy an unchanged body costs the UPDATE plus one row read
+        queries, profile, etag = results["unchanged_cold"]
+        assert queries == 2
+        assert profile["age"] == 26
+        assert etag == patched_etag
+        queries, _, etag = results["empty"]
+        assert queries == 0
+        assert etag == patched_etag
+
+    def test_conditional_get_checks_only_the_version(self):
+        results = asyncio.run(run_profile_update_check())
+
+        queries, response = results["revalidated"]
+        assert response.status_code == 304
+        assert queries == 1
+        queries, response = results["stale"]
+        assert response.status_code == 200
+        assert response.headers["etag"] == results["unchanged"][2]
+
+
+class TestMessageHistoryPaging:
+    """GET /api/messages/{match_id} returns bounded keyset pages"""
+
+    def test_pages_walk_back_and_forward(self):
+        pages = asyncio.run(run_message_paging_check())
+
+        contents = lambda page: [m["content"] for m in page["messages"]]
+        assert contents(pages["latest"]) == [f"message {n}" for n in range(70, 120)]
+        assert pages["latest"]["has_more"]
+        assert contents(pages["before"]) == [f"message {n}" for n in range(20, 70)]
+        assert contents(pages["first"]) == [f"message {n}" for n in range(0, 20)]
+        assert not pages["first"]["has_more"]
+        assert contents(pages["since"]) == [f"message {n}" for n in range(70, 80)]
+        assert pages["since"]["has_more"]
+
+
+class TestSocketResume:
+    """A reconnecting socket replays what came after the client's last message"""
+
+    def test_replays_newer_messages_in_order(self):
+        sent, results = asyncio.run(run_resume_check())
+
+        assert [m.id for m in results["middle"]] == sent[4:]
+        assert [m.id for m in results["limited"]] == sent[4:6]
+        assert results["latest"] == []
+
+    def test_unknown_anchor_is_not_an_empty_replay(self):
+        _, results = asyncio.run(run_resume_check())
+
+        # Nothing to resume from, so the socket tells the client to resync
+        assert results["unknown"] is None
+        assert results["not_theirs"] is None
+
+
+class TestSendMessage:
+    """Only the two sides of a match can write to it"""
+
+    def test_non_member_is_rejected(self):
+        _, results = asyncio.run(run_resume_check())
+
+        assert results["intruder"] == 403
+        assert results["spoofed"] == f"{PREFIX}-resume"
+
+
+class TestReadAcks:
+    """Acks are buffered per conversation and flushed as one statement"""
+
+    def test_acks_mark_messages_viewed_on_flush(self):
+        results = asyncio.run(run_read_ack_check())
+
+        assert results["before"] == ([True] * 5, (1, 5))
+        assert results["acks"] == [{"acknowledged": True}, {"acknowledged": True}, 404, 404]
+        # The older ack merges into the newer one for the same conversation
+        assert results["pending"] == 1
+        assert results["flushed"] == 1
+        assert results["after"] == ([False] * 4 + [True], (1, 1))
+        assert results["empty_flush"] == 0
+
+
+class TestInboxOrder:
+    """Matches from both sides of the pair come back newest conversation first"""
+
+    def test_both_sides_interleave_by_last_message(self):
+        other_ids, matches = asyncio.run(run_inbox_order_check())
+
+        assert [m["other_user"]["id"] for m in matches] == [other_ids[1], other_ids[2], other_ids[0], other_ids[3]]
+        assert [m["unread"] for m in matches] == [2, 1, 1, 0]
+        assert matches[-1]["last_message"] is None
+
+
+class TestMatchesQueryCount:
+    """GET /api/matches must not issue per-match queries"""
+
+    def test_query_count_independent_of_match_count(self):
+        few_queries, many_queries, few_result, many_result = asyncio.run(run_query_count_check())
+
+        assert len(few_result["matches"]) == 2
+        assert len(many_result["matches"]) == 40
+        assert all(m["other_user"] and m["last_message"] for m in many_result["matches"])
+        assert all(m["last_message"]["content"] == "message 2" for m in many_result["matches"])
+        assert all(m["unread"] == 3 for m in many_result["matches"])
+        assert few_queries == many_queries, f"{few_queries} queries for 2 matches vs {many_queries} for 40"
+        print(f"SUCCESS: /api/matches issued {many_queries} queries for both 2 and 40 matches")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
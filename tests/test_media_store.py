@@ -0,0 +1,104 @@
+"""
+INDULGE media store tests
+Covers the local content-addressed object store; no server or database
+needed.
+"""
+import pytest
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.media_store import SIGNATURES, LocalObjectStore, MediaTooLarge, matches_signature, parse_key
+
+
+async def chunks_of(data, size=4):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class TestLocalObjectStore:
+    """Uploads are hashed while streaming, deduplicated and size-capped"""
+
+    def test_put_stores_under_content_hash(self, tmp_path):
+        store = LocalObjectStore(tmp_path)
+        store.start()
+
+        stored = asyncio.run(store.put(chunks_of(b"video bytes"), "mp4"))
+
+        assert stored.digest == hashlib.sha256(b"video bytes").hexdigest()
+        assert stored.key == f"{stored.digest}.mp4"
+        assert stored.size == 11
+        assert store.path_for(stored.key).read_bytes() == b"video bytes"
+
+    def test_same_content_is_deduplicated(self, tmp_path):
+        store = LocalObjectStore(tmp_path)
+
+        async def run():
+            return await store.put(chunks_of(b"photo"), "jpg"), await store.put(chunks_of(b"photo"), "jpg")
+
+        first, second = asyncio.run(run())
+        assert second.key == first.key
+        assert (first.deduplicated, second.deduplicated) == (False, True)
+        assert store.metrics()["stored"] == 1
+        assert list(store.staging.iterdir()) == []
+
+    def test_oversized_upload_is_rejected_and_discarded(self, tmp_path):
+        store = LocalObjectStore(tmp_path)
+
+        with pytest.raises(MediaTooLarge):
+            asyncio.run(store.put(chunks_of(b"x" * 100), "mp4", max_bytes=50))
+        assert list(store.staging.iterdir()) == []
+        assert store.metrics()["rejected"] == 1
+
+    def test_keys_cannot_escape_the_store(self, tmp_path):
+        with pytest.raises(ValueError):
+            parse_key("../../etc/passwd")
+        with pytest.raises(ValueError):
+            LocalObjectStore(tmp_path).path_for("abc.jpg")
+
+    def test_start_only_removes_abandoned_uploads(self, tmp_path):
+        store = LocalObjectStore(tmp_path, staging_max_age=3600)
+        store.staging.mkdir(parents=True)
+        abandoned, in_progress = store.staging / "abandoned", store.staging / "in-progress"
+        abandoned.write_bytes(b"half")
+        in_progress.write_bytes(b"half")
+        two_hours_ago = time.time() - 7200
+        os.utime(abandoned, (two_hours_ago, two_hours_ago))
+
+        # Another worker starting up must not delete this worker's live upload
+        store.start()
+
+        assert list(store.staging.iterdir()) == [in_progress]
+
+
+class TestContentSniffing:
+    """Uploads must start with the bytes of the type they claim to be"""
+
+    SAMPLES = {
+        "image/jpeg": b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01",
+        "image/png": b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR",
+        "image/webp": b"RIFF\x24\x00\x00\x00WEBPVP8 ",
+        "video/mp4": b"\x00\x00\x00\x20ftypisom\x00\x00",
+        "audio/ogg": b"OggS\x00\x02\x00\x00\x00\x00\x00\x00",
+        "audio/wav": b"RIFF\x24\x00\x00\x00WAVEfmt ",
+    }
+
+    def test_real_headers_match(self):
+        assert all(matches_signature(content_type, head) for content_type, head in self.SAMPLES.items())
+
+    def test_mislabelled_content_is_rejected(self):
+        html = b"<html><script>"
+
+        assert not any(matches_signature(content_type, html) for content_type in SIGNATURES)
+        assert not matches_signature("image/png", self.SAMPLES["image/jpeg"])
+        assert not matches_signature("image/webp", self.SAMPLES["audio/wav"])
+        assert not matches_signature("text/html", html)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
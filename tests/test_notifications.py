@@ -0,0 +1,105 @@
+"""
+INDULGE notification queue tests
+Drives the background delivery queue with the fake provider; no server,
+database or provider credentials needed.
+"""
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.notifications import (
+    DELIVERED, FAILED, FakeProvider, NotificationQueue, NotificationQueueFull, PermanentDeliveryError,
+)
+
+
+class SlowProvider(FakeProvider):
+    """Tracks how many sends overlap"""
+
+    def __init__(self, channel, max_concurrency):
+        super().__init__(channel, max_concurrency=max_concurrency)
+        self.active = 0
+        self.peak = 0
+
+    async def send(self, notification):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return await super().send(notification)
+
+
+class RejectingProvider(FakeProvider):
+    async def send(self, notification):
+        raise PermanentDeliveryError("invalid recipient")
+
+
+async def run_queue(queue, deliveries):
+    queue.start()
+    notifications = [queue.enqueue(channel, to, {}) for channel, to in deliveries]
+    await queue.drain()
+    await queue.stop()
+    return notifications
+
+
+class TestNotificationQueue:
+    """Handlers only enqueue; workers deliver, retry and record status"""
+
+    def test_enqueue_returns_before_delivery(self):
+        provider = FakeProvider("email")
+        queue = NotificationQueue({"email": provider})
+        notification = queue.enqueue("email", "a@example.com", {"subject": "hi"})
+
+        assert notification.status == "queued"
+        assert provider.sent == []
+        assert queue.get(notification.id) is notification
+
+    def test_transient_failures_are_retried_with_backoff(self):
+        provider = FakeProvider("sms", fail_times=2)
+        queue = NotificationQueue({"sms": provider}, backoff_base=0.01)
+        [notification] = asyncio.run(run_queue(queue, [("sms", "+27821234567")]))
+
+        assert notification.status == DELIVERED
+        assert notification.attempts == 3
+        assert queue.metrics()["retried"] == 2
+        assert provider.codes["+27821234567"]
+
+    def test_gives_up_after_max_attempts(self):
+        provider = FakeProvider("email", fail_times=10)
+        queue = NotificationQueue({"email": provider}, max_attempts=3, backoff_base=0.01)
+        [notification] = asyncio.run(run_queue(queue, [("email", "a@example.com")]))
+
+        assert notification.status == FAILED
+        assert notification.attempts == 3
+        assert "fake provider failure" in notification.last_error
+
+    def test_permanent_errors_are_not_retried(self):
+        queue = NotificationQueue({"email": RejectingProvider("email")})
+        [notification] = asyncio.run(run_queue(queue, [("email", "bad")]))
+
+        assert notification.status == FAILED
+        assert notification.attempts == 1
+
+    def test_per_provider_concurrency_limit(self):
+        email = SlowProvider("email", max_concurrency=2)
+        sms = SlowProvider("sms", max_concurrency=5)
+        queue = NotificationQueue({"email": email, "sms": sms}, workers=16)
+        asyncio.run(run_queue(queue, [("email", f"u{i}@example.com") for i in range(20)] + [("sms", f"+2782{i}") for i in range(20)]))
+
+        assert email.peak == 2
+        assert sms.peak == 5
+        assert len(email.sent) == len(sms.sent) == 20
+
+    def test_bounded_backlog(self):
+        queue = NotificationQueue({"email": FakeProvider("email")}, max_pending=3)
+        for i in range(3):
+            queue.enqueue("email", f"u{i}@example.com", {})
+
+        with pytest.raises(NotificationQueueFull):
+            queue.enqueue("email", "overflow@example.com", {})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
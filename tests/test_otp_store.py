@@ -0,0 +1,83 @@
+"""
+INDULGE OTP store tests
+Covers the in-memory backend of the one-time code store; no server or
+database needed.
+"""
+import pytest
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.otp_store import EXPIRED, INVALID, TOO_MANY_ATTEMPTS, VERIFIED, InMemoryOTPStore
+
+KEY = "email:user-1:user@example.com"
+
+
+class TestInMemoryOTPStore:
+    """Codes expire, are single-use and allow a limited number of guesses"""
+
+    def test_correct_code_verifies_once(self):
+        store = InMemoryOTPStore()
+
+        async def run():
+            await store.issue(KEY, "123456", timedelta(minutes=10))
+            return await store.verify(KEY, "123456"), await store.verify(KEY, "123456")
+
+        assert asyncio.run(run()) == (VERIFIED, INVALID)
+
+    def test_codes_are_stored_hashed(self):
+        store = InMemoryOTPStore()
+        asyncio.run(store.issue(KEY, "123456", timedelta(minutes=10)))
+
+        assert "123456" not in repr(store._codes)
+
+    def test_expired_code_is_rejected(self):
+        store = InMemoryOTPStore()
+
+        async def run():
+            await store.issue(KEY, "123456", timedelta(seconds=-1))
+            return await store.verify(KEY, "123456")
+
+        assert asyncio.run(run()) == EXPIRED
+
+    def test_attempts_are_limited(self):
+        store = InMemoryOTPStore(max_attempts=3)
+
+        async def run():
+            await store.issue(KEY, "123456", timedelta(minutes=10))
+            wrong = [await store.verify(KEY, "000000") for _ in range(3)]
+            return wrong, await store.verify(KEY, "123456")
+
+        wrong, final = asyncio.run(run())
+        assert wrong == [INVALID] * 3
+        assert final == TOO_MANY_ATTEMPTS
+
+    def test_reissue_replaces_code_and_resets_attempts(self):
+        store = InMemoryOTPStore(max_attempts=2)
+
+        async def run():
+            await store.issue(KEY, "111111", timedelta(minutes=10))
+            await store.verify(KEY, "000000")
+            await store.verify(KEY, "000000")
+            await store.issue(KEY, "222222", timedelta(minutes=10))
+            return await store.verify(KEY, "111111"), await store.verify(KEY, "222222")
+
+        assert asyncio.run(run()) == (INVALID, VERIFIED)
+
+    def test_sweep_removes_only_expired_codes(self):
+        store = InMemoryOTPStore()
+
+        async def run():
+            for i in range(100):
+                await store.issue(f"email:user-{i}:x", "123456", timedelta(seconds=-1 if i % 4 else 60))
+            return await store.sweep()
+
+        assert asyncio.run(run()) == 75
+        assert len(store) == 25
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
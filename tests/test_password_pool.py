@@ -0,0 +1,112 @@
+"""
+INDULGE password pool tests
+Exercises the bounded bcrypt pool with a thread executor and a blocking
+stand-in for bcrypt; the 503 check also needs DATABASE_URL to import the server.
+"""
+import pytest
+import asyncio
+import os
+import sys
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+load_dotenv(Path(__file__).resolve().parents[1] / '.env')
+
+from utils.password_pool import PasswordPool, PasswordPoolSaturated
+
+
+async def saturate(pool, release):
+    """Fill every worker and pending slot with work that waits for `release`"""
+    blocked = [asyncio.create_task(pool._run(release.wait)) for _ in range(pool.workers + pool.max_pending)]
+    while pool.metrics()["in_flight"] < len(blocked):
+        await asyncio.sleep(0)
+    return blocked
+
+
+class TestPasswordPool:
+    """Work beyond the workers and pending slots is refused, not queued"""
+
+    def test_saturated_pool_rejects_straight_away(self):
+        pool = PasswordPool(workers=1, max_pending=2, use_processes=False)
+
+        async def run():
+            pool.start()
+            release = threading.Event()
+            blocked = await saturate(pool, release)
+            with pytest.raises(PasswordPoolSaturated):
+                await pool._run(release.wait)
+            release.set()
+            results = await asyncio.gather(*blocked)
+            # Once the backlog drains there is room again
+            after = await pool._run(lambda: "ok")
+            await pool.stop()
+            return results, after
+
+        results, after = asyncio.run(run())
+        assert results == [True, True, True]
+        assert after == "ok"
+        assert pool.metrics()["rejected"] == 1
+        assert pool.metrics()["in_flight"] == 0
+
+    def test_stop_does_not_block_the_event_loop(self):
+        pool = PasswordPool(workers=1, max_pending=0, use_processes=False)
+
+        async def run():
+            pool.start()
+            release = threading.Event()
+            blocked = await saturate(pool, release)
+            stopping = asyncio.create_task(pool.stop())
+            # The loop keeps running while stop() waits for the busy worker
+            await asyncio.sleep(0.01)
+            still_stopping = not stopping.done()
+            release.set()
+            await stopping
+            await asyncio.gather(*blocked)
+            return still_stopping
+
+        assert asyncio.run(run())
+
+    def test_inline_without_workers(self):
+        pool = PasswordPool(workers=0)
+
+        async def run():
+            pool.start()
+            hashed = await pool.hash("secret")
+            return await pool.verify("secret", hashed), await pool.verify("wrong", hashed)
+
+        assert asyncio.run(run()) == (True, False)
+
+
+@pytest.mark.skipif(not os.environ.get('DATABASE_URL'), reason="DATABASE_URL is not configured")
+class TestSignInShedding:
+    """A saturated pool turns into a 503 with Retry-After, not a queued request"""
+
+    def test_saturated_pool_is_a_503(self):
+        from fastapi import HTTPException
+        import server
+
+        pool = PasswordPool(workers=1, max_pending=0, use_processes=False)
+
+        async def run():
+            pool.start()
+            release = threading.Event()
+            blocked = await saturate(pool, release)
+            try:
+                with pytest.raises(HTTPException) as e:
+                    await server.run_password_op(pool.hash, "secret")
+            finally:
+                release.set()
+                await asyncio.gather(*blocked)
+                await pool.stop()
+            return e.value
+
+        error = asyncio.run(run())
+        assert error.status_code == 503
+        assert error.headers["Retry-After"] == "1"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,68 @@
+"""
+INDULGE phone metadata tests
+Covers signup country/carrier lookups and their per-number memo; no server or
+database needed.
+"""
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.phone_metadata import UNKNOWN, PhoneMetadataService
+
+
+class TestPhoneMetadataService:
+    """Lookups resolve country and carrier, and reuse results per prefix"""
+
+    def test_lookup_resolves_country_and_carrier(self):
+        service = PhoneMetadataService()
+
+        result = asyncio.run(service.lookup("+27821234567"))
+
+        assert result["country_code"] == "ZA"
+        assert result["country_name"] == "South Africa"
+        assert result["carrier"] == "Vodacom"
+        assert result["is_valid"] is True
+
+    def test_unparseable_number_is_unknown(self):
+        service = PhoneMetadataService()
+
+        assert service.lookup_sync("not a number") == UNKNOWN
+
+    def test_each_number_is_described_once(self):
+        service = PhoneMetadataService()
+
+        service.lookup_sync("+27821234567")
+        service.lookup_sync("+27 82 123 4567")
+        service.lookup_sync("+27831234567")
+
+        assert len(service._by_number) == 2
+        assert service.metrics()["hits"] == 1
+
+    def test_numbers_sharing_leading_digits_keep_their_own_carrier(self):
+        service = PhoneMetadataService()
+
+        # Portuguese mobile ranges are assigned nine digits deep
+        carriers = [service.lookup_sync(number)["carrier"] for number in ("+351639230123", "+351639233123", "+351639234123")]
+
+        assert carriers == ["NOS", "Digi Communications", "G9 Telecom"]
+
+    def test_validity_is_checked_per_number(self):
+        service = PhoneMetadataService()
+
+        service.lookup_sync("+27821234567")
+
+        assert service.lookup_sync("+278212")["is_valid"] is False
+
+    def test_warm_marks_service_warmed(self):
+        service = PhoneMetadataService()
+        service.warm()
+
+        assert service.warmed
+        assert service.metrics()["warmed"] is True
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,105 @@
+"""
+INDULGE prompt catalog tests
+Covers loading, pre-encoded responses, reload and prompt references; no
+server or database needed.
+"""
+import pytest
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.prompt import PROMPT_LIBRARY
+from utils.prompt_catalog import PromptCatalog, PromptCatalogError
+
+
+class TestPromptCatalog:
+    """The catalog is encoded once, filtered by category and reloaded whole"""
+
+    def test_default_catalog_is_the_prompt_library(self):
+        catalog = PromptCatalog()
+
+        assert json.loads(catalog.encoded().body) == PROMPT_LIBRARY
+
+    def test_category_bodies_are_precomputed(self):
+        catalog = PromptCatalog()
+
+        lifestyle = json.loads(catalog.encoded("Lifestyle").body)
+        assert lifestyle and all(prompt["category"] == "Lifestyle" for prompt in lifestyle)
+        assert catalog.encoded("Lifestyle") is catalog.encoded("Lifestyle")
+        assert json.loads(catalog.encoded("Nope").body) == []
+
+    def test_reload_changes_version_and_etag(self, tmp_path):
+        source = tmp_path / "prompts.json"
+        source.write_text(json.dumps(PROMPT_LIBRARY))
+        catalog = PromptCatalog(str(source))
+        version, etag = catalog.version, catalog.encoded().etag
+
+        source.write_text(json.dumps(PROMPT_LIBRARY + [{"id": "16", "category": "Lifestyle", "question": "Sundays are for..."}]))
+
+        assert catalog.reload() != version
+        assert catalog.encoded().etag != etag
+        assert catalog.get("16")["question"] == "Sundays are for..."
+
+    def test_bad_reload_keeps_current_catalog(self, tmp_path):
+        source = tmp_path / "prompts.json"
+        source.write_text(json.dumps(PROMPT_LIBRARY))
+        catalog = PromptCatalog(str(source))
+        version = catalog.version
+
+        source.write_text(json.dumps([{"id": "1", "category": "A", "question": "x"}, {"id": "1", "category": "B", "question": "y"}]))
+
+        with pytest.raises(PromptCatalogError):
+            catalog.reload()
+        assert catalog.version == version
+
+
+class TestPromptReferences:
+    """Profiles store prompt ids and get the question text back on read"""
+
+    def test_compact_accepts_id_or_question(self):
+        catalog = PromptCatalog()
+
+        compacted = catalog.compact([
+            {"prompt_id": "2", "answer": "Genuine connection"},
+            {"question": "A fun fact about me...", "answer": "I love hiking", "category": "The Basics"},
+        ])
+
+        assert compacted == [{"prompt_id": "2", "answer": "Genuine connection"}, {"prompt_id": "1", "answer": "I love hiking"}]
+
+    def test_compact_rejects_unknown_prompt_ids(self):
+        with pytest.raises(PromptCatalogError):
+            PromptCatalog().compact([{"prompt_id": "999", "answer": "x"}])
+        with pytest.raises(PromptCatalogError):
+            PromptCatalog().compact([{"answer": "no prompt at all"}])
+
+    def test_compact_keeps_legacy_free_text_answers(self):
+        legacy = {"question": "Old free-text prompt", "answer": "x", "category": "Custom"}
+        catalog = PromptCatalog()
+
+        compacted = catalog.compact([{"prompt_id": "3", "answer": "Brunch"}, legacy])
+
+        assert compacted == [{"prompt_id": "3", "answer": "Brunch"}, legacy]
+        # Reading a profile and writing it straight back changes nothing
+        assert catalog.compact(catalog.expand(compacted)) == compacted
+        assert catalog.compact({"remove": [legacy]}) == {"remove": [legacy]}
+
+    def test_compact_patch(self):
+        assert PromptCatalog().compact({"append": [{"prompt_id": "3", "answer": "Brunch"}]}) == {
+            "append": [{"prompt_id": "3", "answer": "Brunch"}]
+        }
+
+    def test_expand_fills_in_question_and_keeps_legacy_answers(self):
+        legacy = {"question": "Old free-text prompt", "answer": "x"}
+
+        expanded = PromptCatalog().expand([{"prompt_id": "3", "answer": "Brunch"}, legacy])
+
+        assert expanded == [
+            {"prompt_id": "3", "answer": "Brunch", "category": "The Basics", "question": "My perfect weekend looks like..."},
+            legacy,
+        ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
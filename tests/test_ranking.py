@@ -0,0 +1,98 @@
+"""
+INDULGE discovery ranking tests
+Scores synthetic candidate rows with the vectorized ranker; no server or
+database needed.
+"""
+import pytest
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.ranking import CandidateBatch, ViewerPreferences, rank_candidates, score_candidates
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def row(candidate_id, age=30, hours_idle=1, tags=(), photos=4, video=False, voice=False):
+    last_active = None if hours_idle is None else NOW - timedelta(hours=hours_idle)
+    return (candidate_id, age, last_active, tags if tags is None else list(tags), photos, video, voice)
+
+
+def ranked(viewer, *rows, k=10):
+    return rank_candidates(viewer, CandidateBatch.from_rows(list(rows)), k, now=NOW)
+
+
+class TestCandidateBatch:
+    """Rows as selected for ranking become column arrays"""
+
+    def test_from_rows(self):
+        batch = CandidateBatch.from_rows([
+            row("a", age=None, tags=["Art", "Wine"]),
+            row("b", hours_idle=None, tags=None, photos=0),
+        ])
+
+        assert batch.ids == ["a", "b"]
+        assert batch.ages[0] != batch.ages[0] and batch.ages[1] == 30
+        assert batch.last_active[1] != batch.last_active[1]
+        assert list(batch.tag_values) == ["Art", "Wine"]
+        assert list(batch.tag_owners) == [0, 0]
+
+    def test_empty_batch(self):
+        batch = CandidateBatch.from_rows([])
+
+        assert len(batch) == 0
+        assert rank_candidates(ViewerPreferences(), batch, 10) == []
+
+
+class TestRanking:
+    """Each signal moves a candidate up"""
+
+    def test_shared_tags_rank_first(self):
+        viewer = ViewerPreferences(lifestyle_tags=["Art", "Wine", "Golf"])
+
+        assert ranked(viewer, row("none"), row("two", tags=["Art", "Wine"]), row("one", tags=["Golf", "Skiing"])) == ["two", "one", "none"]
+
+    def test_recent_activity_ranks_first(self):
+        viewer = ViewerPreferences()
+
+        assert ranked(viewer, row("never", hours_idle=None), row("week", hours_idle=168), row("hour", hours_idle=1)) == ["hour", "week", "never"]
+
+    def test_ages_outside_the_preferred_range_rank_lower(self):
+        viewer = ViewerPreferences(preferred_age_min=25, preferred_age_max=35)
+
+        assert ranked(viewer, row("far", age=50), row("near", age=38), row("inside", age=30)) == ["inside", "near", "far"]
+
+    def test_unknown_age_scores_between_in_and_out_of_range(self):
+        viewer = ViewerPreferences(preferred_age_min=25, preferred_age_max=35)
+        scores = score_candidates(viewer, CandidateBatch.from_rows([row("in", age=30), row("unknown", age=None), row("out", age=60)]), NOW)
+
+        assert scores[0] > scores[1] > scores[2]
+
+    def test_media_counts_photos_video_and_voice(self):
+        viewer = ViewerPreferences()
+
+        assert ranked(viewer, row("bare", photos=0), row("photos", photos=8), row("all", photos=8, video=True, voice=True)) == ["all", "photos", "bare"]
+
+    def test_scores_stay_in_unit_range(self):
+        viewer = ViewerPreferences(lifestyle_tags=["Art"], preferred_age_min=20, preferred_age_max=30)
+        best = row("best", age=25, hours_idle=0, tags=["Art"], photos=20, video=True, voice=True)
+        worst = row("worst", age=90, hours_idle=None, photos=0)
+        scores = score_candidates(viewer, CandidateBatch.from_rows([best, worst]), NOW)
+
+        assert scores[0] == pytest.approx(1.0)
+        assert 0.0 <= scores[1] < 0.01
+
+    def test_top_k_is_best_first_and_repeatable(self):
+        viewer = ViewerPreferences(lifestyle_tags=["Art"])
+        rows = [row(f"plain-{n}", hours_idle=n) for n in range(50)] + [row("match", hours_idle=40, tags=["Art"])]
+
+        top = ranked(viewer, *rows, k=5)
+        assert top == ["match", "plain-0", "plain-1", "plain-2", "plain-3"]
+        assert ranked(viewer, *rows, k=5) == top
+        assert len(ranked(viewer, *rows, k=500)) == 51
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
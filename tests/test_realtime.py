@@ -0,0 +1,76 @@
+"""
+INDULGE real-time push tests
+Exercises the per-user connection hub that fans chat events out to open
+WebSockets; no server or database needed.
+"""
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.realtime import ConnectionHub
+
+
+class TestConnectionHub:
+    """Events reach every connection of the user they are published to"""
+
+    def test_publish_reaches_every_connection_of_the_user(self):
+        hub = ConnectionHub()
+
+        async def run():
+            phone, laptop, other = hub.subscribe("user"), hub.subscribe("user"), hub.subscribe("other")
+            delivered = hub.publish("user", {"type": "message", "id": "1"})
+            return delivered, phone.get_nowait(), laptop.get_nowait(), other.empty()
+
+        delivered, phone_event, laptop_event, other_empty = asyncio.run(run())
+        assert delivered == 2
+        assert phone_event == laptop_event == {"type": "message", "id": "1"}
+        assert other_empty
+
+    def test_publish_without_connections_delivers_nothing(self):
+        hub = ConnectionHub()
+
+        assert hub.publish("nobody", {"type": "message"}) == 0
+        assert hub.connection_count() == 0
+
+    def test_unsubscribe_forgets_the_user(self):
+        hub = ConnectionHub()
+
+        async def run():
+            first, second = hub.subscribe("user"), hub.subscribe("user")
+            hub.unsubscribe("user", first)
+            count = hub.connection_count("user")
+            hub.unsubscribe("user", second)
+            hub.unsubscribe("user", second)
+            return count
+
+        assert asyncio.run(run()) == 1
+        assert hub.connection_count("user") == 0
+        assert hub.connection_count() == 0
+
+    def test_slow_connection_is_closed_not_blocked_on(self):
+        hub = ConnectionHub(max_pending=3)
+
+        async def run():
+            slow, fast = hub.subscribe("user"), hub.subscribe("user")
+            for n in range(3):
+                hub.publish("user", {"type": "message", "id": str(n)})
+            while not fast.empty():
+                fast.get_nowait()
+            delivered = hub.publish("user", {"type": "message", "id": "3"})
+            slow_events = [slow.get_nowait() for _ in range(slow.qsize())]
+            return delivered, slow_events, fast.get_nowait()
+
+        delivered, slow_events, fast_event = asyncio.run(run())
+        assert delivered == 1
+        # The sentinel tells the slow connection's loop to close; the client
+        # reconnects and resumes from its last seen message
+        assert slow_events[-1] is None
+        assert fast_event == {"type": "message", "id": "3"}
+        assert hub.connection_count("user") == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
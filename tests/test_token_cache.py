@@ -0,0 +1,97 @@
+"""
+INDULGE token cache tests
+Exercises verified-token caching and logout revocation with a fake decoder
+and clock; no server or database needed.
+"""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.cache import VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDecoder:
+    """Tokens look like "<user>:<exp>"; anything else fails verification"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = 0
+
+    def __call__(self, token):
+        self.calls += 1
+        user_id, _, exp = token.partition(":")
+        if not exp or float(exp) <= self.clock():
+            return None
+        return {"sub": user_id, "exp": float(exp)}
+
+
+def make_cache(max_entries=10):
+    clock = FakeClock()
+    decoder = FakeDecoder(clock)
+    return VerifiedTokenCache(decoder, max_entries=max_entries, clock=clock), decoder, clock
+
+
+class TestVerifiedTokenCache:
+    """Repeat verifications skip decoding until the token expires"""
+
+    def test_repeat_verify_is_cached(self):
+        cache, decoder, _ = make_cache()
+
+        assert cache.verify("user-1:2000")["sub"] == "user-1"
+        assert cache.verify("user-1:2000")["sub"] == "user-1"
+        assert decoder.calls == 1
+
+    def test_expired_token_is_decoded_again_and_rejected(self):
+        cache, decoder, clock = make_cache()
+
+        cache.verify("user-1:2000")
+        clock.now = 2_000
+        assert cache.verify("user-1:2000") is None
+        assert decoder.calls == 2
+
+    def test_revoked_token_is_rejected(self):
+        cache, _, _ = make_cache()
+
+        cache.verify("user-1:2000")
+        assert cache.revoke("user-1:2000")
+        assert cache.verify("user-1:2000") is None
+        assert not cache.revoke("garbage")
+
+
+class TestRevocations:
+    """Revocations outlive any number of other revocations, but not the token"""
+
+    def test_revocations_are_never_evicted(self):
+        cache, _, _ = make_cache(max_entries=10)
+
+        tokens = [f"user-{n}:5000" for n in range(1_000)]
+        for token in tokens:
+            cache.revoke(token)
+
+        assert all(cache.verify(token) is None for token in tokens)
+        assert cache.metrics()["revoked"] == 1_000
+
+    def test_revocations_are_forgotten_once_the_token_expires(self):
+        cache, _, clock = make_cache()
+
+        cache.revoke("user-1:2000")
+        cache.revoke("user-2:3000")
+        clock.now = 2_500
+        cache.revoke("user-3:4000")
+
+        assert set(cache.revoked) == {cache.digest("user-2:3000"), cache.digest("user-3:4000")}
+        assert cache.verify("user-1:2000") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from .write_behind import BatchWriter, WriteBehindBuffer
+
+
+class ActivityTracker(WriteBehindBuffer):
+    """Last-seen timestamps per user, kept in memory and written in bulk.
+
+    Each user occupies one entry no matter how many requests they make
+    between flushes, so the buffer holds at most `max_entries` users and a
+    flush is a single UPDATE for all of them.
+    """
+
+    def __init__(self, flush: BatchWriter, interval: float = 30.0, max_entries: int = 50_000):
+        super().__init__(flush, interval=interval, max_entries=max_entries, merge=max, name="activity")
+
+    def touch(self, user_id: str, when: Optional[datetime] = None) -> None:
+        self.add(user_id, when or datetime.now(timezone.utc))
@@ -3,6 +3,8 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 import os
 
+from .cache import VerifiedTokenCache
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "YOUR_SECRET_KEY_REPLACE_ME")
@@ -30,4 +32,8 @@ def decode_token(token: str):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+# Already-verified tokens skip jwt.decode on repeat requests
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "10000"))
+token_cache = VerifiedTokenCache(decode_token, max_entries=TOKEN_CACHE_SIZE)
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+import hashlib
+import heapq
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire.
+
+    Each entry expires `ttl` seconds after it is stored, or at an explicit
+    `expires_at` (seconds since the epoch). Once `max_entries` is reached
+    the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: Optional[float] = None, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._entries[key]
+            self.stats["misses"] += 1
+            return default
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key: Hashable, value, expires_at: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        if expires_at is None and self.ttl is not None:
+            expires_at = self.clock() + self.ttl
+        elif self.ttl is not None:
+            expires_at = min(expires_at, self.clock() + self.ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def pop(self, key: Hashable, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {**self.stats, "size": len(self._entries)}
+
+
+class VerifiedTokenCache:
+    """Remembers the claims of tokens that already passed signature checks.
+
+    Tokens are keyed by their SHA-256 digest so raw bearer tokens are never
+    kept in memory, and an entry lives no longer than the token's `exp`.
+
+    Revoked tokens are remembered until they would have expired anyway and
+    are never evicted early, however many there are: forgetting one would
+    make the token valid again. Revocation is per process, so a token
+    revoked in one worker is still accepted by the others until it expires.
+    """
+
+    def __init__(self, decode: Callable[[str], Optional[dict]], max_entries: int = 10_000, clock: Callable[[], float] = time.time):
+        self.decode = decode
+        self.clock = clock
+        self.verified = TTLCache(max_entries=max_entries, clock=clock)
+        self.revoked: Dict[str, Optional[float]] = {}
+        self._revoked_expiry: List[Tuple[float, str]] = []
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Claims of a valid, unrevoked token, or None"""
+        key = self.digest(token)
+        payload = self.verified.get(key)
+        if payload is not None:
+            return payload
+        if key in self.revoked:
+            return None
+        payload = self.decode(token)
+        if payload is None:
+            return None
+        self.verified.set(key, payload, expires_at=payload.get("exp"))
+        return payload
+
+    def revoke(self, token: str) -> bool:
+        key = self.digest(token)
+        payload = self.verified.pop(key) or self.decode(token)
+        if payload is None:
+            return False
+        self._purge_revoked()
+        expires_at = payload.get("exp")
+        self.revoked[key] = expires_at
+        if expires_at is not None:
+            heapq.heappush(self._revoked_expiry, (expires_at, key))
+        return True
+
+    def _purge_revoked(self) -> None:
+        """Forget revocations of tokens that have expired and fail decoding anyway"""
+        now = self.clock()
+        while self._revoked_expiry and self._revoked_expiry[0][0] <= now:
+            _, key = heapq.heappop(self._revoked_expiry)
+            self.revoked.pop(key, None)
+
+    def metrics(self) -> dict:
+        return {**self.verified.metrics(), "revoked": len(self.revoked)}
@@ -0,0 +1,262 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from itertools import islice
+from operator import itemgetter
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import base64
+import logging
+import secrets
+import time
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# fetch(user_id, exclude_ids, limit) -> candidate ids, best first
+CandidateFetcher = Callable[[str, Set[str], int], Awaitable[List[str]]]
+
+
+class CandidateQueueBackend(ABC):
+    """Storage for per-user discovery candidate queues.
+
+    Every pushed entry gets a sequence number that only grows, so a page of
+    the queue can be read with a keyset (`after` sequence) instead of an offset.
+    Entries stay queued until the user swipes on them or `trim` drops them.
+    """
+
+    # Identifies this backend's sequence space; cursors from another epoch are stale
+    epoch: str
+
+    @abstractmethod
+    async def push(self, user_id: str, candidate_ids: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def page(self, user_id: str, after: Optional[int], count: int) -> List[Tuple[int, str]]:
+        """Up to `count` (sequence, candidate id) entries after the given sequence"""
+        ...
+
+    @abstractmethod
+    async def count_after(self, user_id: str, after: Optional[int]) -> int:
+        ...
+
+    @abstractmethod
+    async def discard(self, user_id: str, candidate_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def size(self, user_id: str) -> int:
+        ...
+
+    @abstractmethod
+    async def exclusions(self, user_id: str) -> Set[str]:
+        """Ids a refill must skip because they are already queued"""
+        ...
+
+    @abstractmethod
+    async def trim(self, user_id: str, keep: int) -> None:
+        """Drop the oldest entries until at most `keep` remain"""
+        ...
+
+
+@dataclass
+class _UserQueue:
+    entries: List[Tuple[int, str]] = field(default_factory=list)
+    live: Dict[str, int] = field(default_factory=dict)
+
+
+class InMemoryCandidateQueueBackend(CandidateQueueBackend):
+    """Process-local backend; each worker process keeps its own queues.
+
+    At most `max_users` queues are kept, least recently used first out, and
+    a queue nobody has read or written for `idle_ttl` seconds is dropped.
+    A dropped queue is simply refilled on the user's next page.
+    """
+
+    def __init__(self, max_users: int = 10_000, idle_ttl: Optional[float] = 1_800, clock: Callable[[], float] = time.time):
+        self.epoch = secrets.token_hex(4)
+        self._next_seq = 0
+        self._queues = TTLCache(max_entries=max_users, ttl=idle_ttl, clock=clock)
+
+    def _queue(self, user_id: str, create: bool = False) -> Optional[_UserQueue]:
+        queue = self._queues.get(user_id)
+        if queue is None and create:
+            queue = _UserQueue()
+        if queue is not None:
+            # Every use restarts the idle timer
+            self._queues.set(user_id, queue)
+        return queue
+
+    def __len__(self):
+        return len(self._queues)
+
+    async def push(self, user_id, candidate_ids):
+        queue = self._queue(user_id, create=True)
+        for candidate_id in candidate_ids:
+            if candidate_id not in queue.live:
+                self._next_seq += 1
+                queue.live[candidate_id] = self._next_seq
+                queue.entries.append((self._next_seq, candidate_id))
+
+    def _live_after(self, user_id, after):
+        queue = self._queue(user_id)
+        if queue is None:
+            return
+        start = 0 if after is None else bisect_right(queue.entries, after, key=itemgetter(0))
+        for seq, candidate_id in islice(queue.entries, start, None):
+            # Entries discarded after a swipe are skipped lazily
+            if queue.live.get(candidate_id) == seq:
+                yield seq, candidate_id
+
+    async def page(self, user_id, after, count):
+        return list(islice(self._live_after(user_id, after), count))
+
+    async def count_after(self, user_id, after):
+        return sum(1 for _ in self._live_after(user_id, after))
+
+    async def discard(self, user_id, candidate_id):
+        queue = self._queue(user_id)
+        if queue is None or queue.live.pop(candidate_id, None) is None:
+            return
+        if len(queue.entries) > 2 * len(queue.live) + 32:
+            queue.entries = [(seq, cid) for seq, cid in queue.entries if queue.live.get(cid) == seq]
+
+    async def size(self, user_id):
+        queue = self._queue(user_id)
+        return len(queue.live) if queue else 0
+
+    async def exclusions(self, user_id):
+        queue = self._queue(user_id)
+        return set(queue.live) if queue else set()
+
+    async def trim(self, user_id, keep):
+        queue = self._queue(user_id)
+        if queue is None or len(queue.live) <= keep:
+            return
+        kept = [(seq, cid) for seq, cid in queue.entries if queue.live.get(cid) == seq][-keep:] if keep > 0 else []
+        queue.entries = kept
+        queue.live = {cid: seq for seq, cid in kept}
+
+
+class StaleCursor(ValueError):
+    """A cursor issued by another process or before a restart"""
+
+
+class CandidateQueue:
+    """Per-user queue of discovery candidates refilled in batches off the request path.
+
+    `depth` is how many unread candidates are kept ahead of the reader's
+    cursor. Candidates already served stay queued, so refills keep
+    excluding them, until `history` of them have piled up; the oldest are
+    then dropped and may be served again.
+    """
+
+    def __init__(
+        self,
+        backend: CandidateQueueBackend,
+        fetch_candidates: CandidateFetcher,
+        depth: int = 200,
+        refill_threshold: int = 50,
+        workers: int = 2,
+        history: int = 1_000,
+    ):
+        self.backend = backend
+        self.fetch_candidates = fetch_candidates
+        self.depth = depth
+        self.refill_threshold = refill_threshold
+        self.workers = workers
+        self.history = history
+        self._pending: asyncio.Queue = asyncio.Queue()
+        # user id -> furthest sequence a page has been read up to
+        self._scheduled: Dict[str, Optional[int]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def encode_cursor(self, seq: int) -> str:
+        raw = f"{self.backend.epoch}:{seq}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """Sequence a cursor points after; no cursor starts at the head of the queue.
+
+        Raises StaleCursor for a cursor from another epoch, whose sequence
+        means nothing here, and ValueError for anything unparseable.
+        """
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            epoch, seq = raw.split(":")
+            seq = int(seq)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        if epoch != self.backend.epoch:
+            raise StaleCursor("Cursor is from another queue epoch")
+        return seq
+
+    async def page(self, user_id: str, cursor: Optional[str], count: int) -> Tuple[List[str], Optional[str]]:
+        """Next `count` candidates after `cursor`, plus the cursor for the page after.
+
+        Reading a page never removes entries, only swipes do. Refills happen
+        inline only when the queue cannot fill the page.
+        """
+        after = self.decode_cursor(cursor)
+        entries = await self.backend.page(user_id, after, count)
+        if len(entries) < count:
+            last = entries[-1][0] if entries else after
+            await self.refill(user_id, last)
+            entries += await self.backend.page(user_id, last, count - len(entries))
+
+        if not entries:
+            return [], None
+        last = entries[-1][0]
+        if await self.backend.count_after(user_id, last) <= self.refill_threshold:
+            self.schedule_refill(user_id, last)
+        return [candidate_id for _, candidate_id in entries], self.encode_cursor(last)
+
+    async def consume(self, user_id: str, candidate_id: str) -> None:
+        """Drop a candidate the user has swiped on"""
+        await self.backend.discard(user_id, candidate_id)
+
+    def schedule_refill(self, user_id: str, after: Optional[int] = None) -> None:
+        if user_id in self._scheduled:
+            scheduled = self._scheduled[user_id]
+            if after is not None and (scheduled is None or after > scheduled):
+                self._scheduled[user_id] = after
+            return
+        self._scheduled[user_id] = after
+        self._pending.put_nowait(user_id)
+
+    async def refill(self, user_id: str, after: Optional[int] = None) -> int:
+        """Top up to `depth` unread candidates after sequence `after`; returns how many were added"""
+        missing = self.depth - await self.backend.count_after(user_id, after)
+        if missing <= 0:
+            return 0
+        # Everything still queued is excluded, including candidates already served
+        exclude_ids = await self.backend.exclusions(user_id)
+        candidate_ids = await self.fetch_candidates(user_id, exclude_ids, missing)
+        await self.backend.push(user_id, candidate_ids)
+        await self.backend.trim(user_id, self.depth + self.history)
+        return len(candidate_ids)
+
+    async def _worker(self):
+        while True:
+            user_id = await self._pending.get()
+            try:
+                await self.refill(user_id, self._scheduled.get(user_id))
+            except Exception:
+                logger.exception("Candidate refill failed for user %s", user_id)
+            finally:
+                self._scheduled.pop(user_id, None)
+                self._pending.task_done()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,40 @@
+from typing import Optional
+import hashlib
+import json
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+
+def content_etag(payload) -> str:
+    """Strong ETag from the canonical JSON encoding of a payload"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return f'"{hashlib.sha256(encoded).hexdigest()[:32]}"'
+
+
+def version_etag(*parts) -> str:
+    """ETag from values that change whenever the resource does (id, row version)"""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison; weak validators match their strong form"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def cached_json(content, etag: str, cache_control: str) -> JSONResponse:
+    return JSONResponse(content, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def cached_body(body: bytes, etag: str, cache_control: str) -> Response:
+    """Already-encoded JSON bytes, sent as they are"""
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": cache_control})
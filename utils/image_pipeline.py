@@ -0,0 +1,252 @@
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from .cache import TTLCache
+from .media_store import LocalObjectStore
+
+logger = logging.getLogger(__name__)
+
+QUEUED, PROCESSING, DONE, FAILED = "queued", "processing", "done", "failed"
+
+# Longest edge, in pixels, of each rendition
+DERIVATIVE_SIZES = {"thumb": 160, "card": 640, "full": 1440}
+
+# Largest source image decoded, in pixels. A small, highly compressible
+# upload can declare a huge canvas; this is checked from the header, before
+# any pixel data is decoded.
+MAX_SOURCE_PIXELS = 50_000_000
+
+
+class ImagePipelineFull(Exception):
+    pass
+
+
+def render_derivatives(
+    source: str,
+    targets: Dict[str, Tuple[str, int]],
+    quality: int,
+    force: bool,
+    max_pixels: int = MAX_SOURCE_PIXELS,
+) -> Dict[str, int]:
+    """Runs in a pool process: decode once, write each missing size as WEBP; returns bytes written per size"""
+    from PIL import Image, ImageOps
+
+    # Pillow's own bomb check (a warning past the limit, an error past twice
+    # it) is process-wide; pin it rather than rely on the library default
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    pending = {name: target for name, target in targets.items() if force or not os.path.exists(target[0])}
+    if not pending:
+        return {}
+    written = {}
+    with Image.open(source) as image:
+        if image.width * image.height > max_pixels:
+            raise ValueError(f"{image.width}x{image.height} image exceeds {max_pixels} pixels")
+        largest = max(edge for _, edge in pending.values())
+        # JPEGs decode straight at the smallest DCT scale that still covers the largest rendition
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        # Largest first, shrinking the same image in place for each smaller size
+        for name, (path, edge) in sorted(pending.items(), key=lambda item: -item[1][1]):
+            image.thumbnail((edge, edge), Image.LANCZOS)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            staged = f"{path}.{os.getpid()}.tmp"
+            image.save(staged, "WEBP", quality=quality, method=4)
+            os.replace(staged, path)
+            written[name] = os.path.getsize(path)
+    return written
+
+
+@dataclass
+class DerivativeJob:
+    key: str
+    force: bool = False
+    status: str = QUEUED
+    attempts: int = 0
+    # When a failed job may next be resubmitted, on the pipeline's clock
+    retry_at: Optional[float] = None
+    written: Dict[str, int] = field(default_factory=dict)
+    last_error: Optional[str] = None
+    duration_ms: Optional[float] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self) -> dict:
+        return {
+            "key": self.key,
+            "status": self.status,
+            "attempts": self.attempts,
+            "written": self.written,
+            "last_error": self.last_error,
+            "duration_ms": self.duration_ms,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class ImagePipeline:
+    """Renders resized WEBP copies of uploaded photos on a process pool.
+
+    `submit` only queues; a fixed set of asyncio workers hands each job to
+    the pool so decoding and resizing never run on the event loop. Jobs are
+    keyed by object key: submitting a photo that is already queued, running
+    or done returns that job, and `force` re-renders every size. Renditions
+    already on disk are skipped, so resubmitting after a restart is cheap.
+
+    A failed job is retried on a later submit only after `retry_backoff`
+    seconds, doubling each time, and at most `max_attempts` times in all;
+    after that it stays failed until submitted with `force`. Job state lives
+    for `status_ttl`, so the attempt budget comes back after that.
+    With `workers=0` jobs run inline, which is only meant for tests.
+    """
+
+    def __init__(
+        self,
+        store: LocalObjectStore,
+        sizes: Dict[str, int] = DERIVATIVE_SIZES,
+        workers: int = 2,
+        max_pending: int = 256,
+        quality: int = 80,
+        use_processes: bool = True,
+        status_ttl: float = 3_600,
+        max_pixels: int = MAX_SOURCE_PIXELS,
+        max_attempts: int = 3,
+        retry_backoff: float = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.store = store
+        self.sizes = sizes
+        self.workers = workers
+        self.max_pending = max_pending
+        self.quality = quality
+        self.use_processes = use_processes
+        self.max_pixels = max_pixels
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.clock = clock
+        self._jobs = TTLCache(max_entries=max(max_pending * 10, 1), ttl=status_ttl)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._executor: Optional[Executor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending = 0
+        self._finished_at = deque(maxlen=10_000)
+        self.stats = {
+            "submitted": 0, "done": 0, "failed": 0, "rejected": 0, "retried": 0,
+            "bytes_in": 0, "bytes_out": 0, "busy_seconds": 0.0,
+        }
+
+    def submit(self, key: str, force: bool = False) -> DerivativeJob:
+        job = self._jobs.get(key)
+        if job is not None and job.status in (QUEUED, PROCESSING):
+            job.force = job.force or force
+            return job
+        if job is not None and job.status == DONE and not force:
+            return job
+        if job is not None and job.status == FAILED and not force:
+            if job.attempts >= self.max_attempts or self.clock() < job.retry_at:
+                return job
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise ImagePipelineFull()
+        if job is not None and job.status == FAILED:
+            self.stats["retried"] += 1
+        job = DerivativeJob(key=key, force=force, attempts=job.attempts if job is not None else 0)
+        self._pending += 1
+        self.stats["submitted"] += 1
+        self._jobs.set(key, job)
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, key: str) -> Optional[DerivativeJob]:
+        return self._jobs.get(key)
+
+    def metrics(self) -> dict:
+        cutoff = time.monotonic() - 60
+        done = self.stats["done"]
+        return {
+            **self.stats,
+            "busy_seconds": round(self.stats["busy_seconds"], 2),
+            "pending": self._pending,
+            "queued": self._queue.qsize(),
+            "workers": self.workers,
+            "avg_ms": round(self.stats["busy_seconds"] / done * 1000, 1) if done else None,
+            "done_last_minute": sum(1 for finished in self._finished_at if finished >= cutoff),
+        }
+
+    def _mark(self, job: DerivativeJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.last_error = error
+        job.updated_at = datetime.now(timezone.utc)
+
+    async def process(self, job: DerivativeJob) -> None:
+        source = self.store.path_for(job.key)
+        targets = {name: (str(self.store.derivative_path(job.key, name)), edge) for name, edge in self.sizes.items()}
+        job.attempts += 1
+        self._mark(job, PROCESSING)
+        started = time.perf_counter()
+        try:
+            if self._executor is None:
+                written = render_derivatives(str(source), targets, self.quality, job.force, self.max_pixels)
+            else:
+                written = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, render_derivatives, str(source), targets, self.quality, job.force, self.max_pixels
+                )
+        except Exception as e:
+            self._finish(job, FAILED, started, str(e))
+            logger.warning("Derivatives for %s failed: %s", job.key, e)
+            return
+        job.written = written
+        if written:
+            self.stats["bytes_in"] += source.stat().st_size
+            self.stats["bytes_out"] += sum(written.values())
+        self._finish(job, DONE, started)
+
+    def _finish(self, job: DerivativeJob, status: str, started: float, error: Optional[str] = None) -> None:
+        elapsed = time.perf_counter() - started
+        job.duration_ms = round(elapsed * 1000, 1)
+        job.force = False
+        if status == FAILED:
+            job.retry_at = self.clock() + self.retry_backoff * 2 ** (job.attempts - 1)
+        self._mark(job, status, error)
+        self._pending -= 1
+        self.stats[status] += 1
+        self.stats["busy_seconds"] += elapsed
+        self._finished_at.append(time.monotonic())
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.process(job)
+            except Exception:
+                logger.exception("Image pipeline worker error")
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        if self.workers and self._executor is None:
+            pool = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.workers)
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(self.workers, 1))]
+
+    async def drain(self) -> None:
+        """Wait until every submitted job has finished"""
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            # Waiting for the pool processes to exit blocks, so do it off the event loop
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
@@ -0,0 +1,211 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Optional
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+_KEY = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,8}$")
+
+
+class MediaTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+@dataclass(frozen=True)
+class MediaPolicy:
+    """Accepted content types (mapped to file extensions) and size cap for one media_type"""
+    extensions: Dict[str, str]
+    max_bytes: int
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    key: str
+    digest: str
+    size: int
+    deduplicated: bool
+
+
+def _iso_media(head: bytes) -> bool:
+    return head[4:8] == b"ftyp"
+
+
+def _ebml(head: bytes) -> bool:
+    return head.startswith(b"\x1a\x45\xdf\xa3")
+
+
+# Leading bytes of each accepted content type. The client's Content-Type is
+# only a claim; the stored extension decides how the object is served.
+SIGNATURES: Dict[str, Callable[[bytes], bool]] = {
+    "image/jpeg": lambda head: head.startswith(b"\xff\xd8\xff"),
+    "image/png": lambda head: head.startswith(b"\x89PNG\r\n\x1a\n"),
+    "image/webp": lambda head: head[:4] == b"RIFF" and head[8:12] == b"WEBP",
+    "video/mp4": _iso_media,
+    "video/quicktime": lambda head: head[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free"),
+    "video/webm": _ebml,
+    "audio/mpeg": lambda head: head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0),
+    "audio/mp4": _iso_media,
+    "audio/webm": _ebml,
+    "audio/ogg": lambda head: head.startswith(b"OggS"),
+    "audio/wav": lambda head: head[:4] == b"RIFF" and head[8:12] == b"WAVE",
+}
+SNIFF_BYTES = 12
+
+
+def matches_signature(content_type: str, head: bytes) -> bool:
+    """Whether the first SNIFF_BYTES of a file look like `content_type`"""
+    check = SIGNATURES.get(content_type)
+    return check is not None and check(head)
+
+
+def parse_key(key: str) -> str:
+    """Validate an object key ("<sha256>.<ext>"); raises ValueError otherwise"""
+    if not _KEY.match(key):
+        raise ValueError(f"Invalid media key: {key!r}")
+    return key
+
+
+class ObjectStore(ABC):
+    """Immutable blobs addressed by the SHA-256 of their content.
+
+    `put` consumes an async stream of chunks, hashing while it writes, and
+    gives up as soon as `max_bytes` is passed. Storing content that is
+    already present keeps the existing object, so every copy of an upload
+    shares one key.
+    """
+
+    def __init__(self):
+        self._stats = {"stored": 0, "deduplicated": 0, "rejected": 0, "bytes_written": 0}
+
+    @abstractmethod
+    async def put(self, chunks: AsyncIterator[bytes], extension: str, max_bytes: Optional[int] = None) -> StoredObject:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    def metrics(self) -> dict:
+        return dict(self._stats)
+
+
+@dataclass
+class _Staged:
+    path: Path
+    handle: object
+    digest: object = field(default_factory=hashlib.sha256)
+    size: int = 0
+
+
+class LocalObjectStore(ObjectStore):
+    """Objects as files under `root`, sharded by the first two hex digits.
+
+    Uploads are written to `root/.staging` and renamed into place once
+    complete, so a reader never sees a partial object. File I/O and hashing
+    run in worker threads, one hop per chunk. Workers may share `root`, so
+    only staged files untouched for `staging_max_age` seconds count as
+    abandoned.
+    """
+
+    def __init__(self, root, staging_max_age: float = 3600):
+        super().__init__()
+        self.root = Path(root)
+        self.staging = self.root / ".staging"
+        self.staging_max_age = staging_max_age
+
+    def start(self) -> None:
+        """Create the directories and drop uploads a crashed process left half-written"""
+        self.staging.mkdir(parents=True, exist_ok=True)
+        cutoff = time.time() - self.staging_max_age
+        removed = 0
+        for leftover in self.staging.iterdir():
+            try:
+                if leftover.stat().st_mtime < cutoff:
+                    leftover.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                # Committed or discarded by its worker in the meantime
+                continue
+        if removed:
+            logger.info("Removed %d unfinished uploads from %s", removed, self.staging)
+
+    def path_for(self, key: str) -> Path:
+        key = parse_key(key)
+        return self.root / key[:2] / key
+
+    def derivative_path(self, key: str, name: str) -> Path:
+        """Where a derived rendition (e.g. a resized photo) of an object lives"""
+        key = parse_key(key)
+        if not name.isalnum():
+            raise ValueError(f"Invalid derivative name: {name!r}")
+        return self.root / "derived" / key[:2] / key / f"{name}.webp"
+
+    def _open(self) -> _Staged:
+        self.staging.mkdir(parents=True, exist_ok=True)
+        path = self.staging / uuid.uuid4().hex
+        return _Staged(path=path, handle=open(path, "wb"))
+
+    @staticmethod
+    def _write(staged: _Staged, chunk: bytes) -> None:
+        staged.digest.update(chunk)
+        staged.handle.write(chunk)
+
+    @staticmethod
+    def _discard(staged: _Staged) -> None:
+        staged.handle.close()
+        staged.path.unlink(missing_ok=True)
+
+    def _commit(self, staged: _Staged, extension: str) -> StoredObject:
+        staged.handle.close()
+        digest = staged.digest.hexdigest()
+        key = f"{digest}.{extension}"
+        final = self.path_for(key)
+        if final.exists():
+            staged.path.unlink(missing_ok=True)
+            return StoredObject(key=key, digest=digest, size=staged.size, deduplicated=True)
+        final.parent.mkdir(exist_ok=True)
+        # Atomic; two racing uploads of the same content both land the same bytes
+        os.replace(staged.path, final)
+        return StoredObject(key=key, digest=digest, size=staged.size, deduplicated=False)
+
+    async def put(self, chunks, extension, max_bytes=None):
+        staged = await asyncio.to_thread(self._open)
+        try:
+            async for chunk in chunks:
+                staged.size += len(chunk)
+                if max_bytes is not None and staged.size > max_bytes:
+                    self._stats["rejected"] += 1
+                    raise MediaTooLarge(max_bytes)
+                await asyncio.to_thread(self._write, staged, chunk)
+            stored = await asyncio.to_thread(self._commit, staged, extension)
+        except BaseException:
+            await asyncio.to_thread(self._discard, staged)
+            raise
+
+        if stored.deduplicated:
+            self._stats["deduplicated"] += 1
+        else:
+            self._stats["stored"] += 1
+            self._stats["bytes_written"] += stored.size
+        return stored
+
+    async def exists(self, key):
+        return await asyncio.to_thread(self.path_for(key).is_file)
+
+    async def delete(self, key):
+        await asyncio.to_thread(self.path_for(key).unlink, missing_ok=True)
@@ -0,0 +1,290 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import random
+import uuid
+
+import httpx
+
+from .cache import TTLCache
+from .provider_clients import ProviderClientRegistry, ProviderEndpoint
+
+logger = logging.getLogger(__name__)
+
+QUEUED, SENDING, RETRYING, DELIVERED, FAILED = "queued", "sending", "retrying", "delivered", "failed"
+
+
+class PermanentDeliveryError(Exception):
+    """The provider rejected the message; retrying will not help"""
+
+
+class NotificationQueueFull(Exception):
+    pass
+
+
+@dataclass
+class Notification:
+    channel: str
+    to: str
+    payload: dict
+    owner_id: Optional[str] = None
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = QUEUED
+    attempts: int = 0
+    provider_ref: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "channel": self.channel,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class NotificationProvider(ABC):
+    """Delivers notifications for one channel ("email" or "sms")"""
+
+    name: str
+    channel: str
+    # Calls this provider may have in flight at once
+    max_concurrency: int = 4
+
+    @abstractmethod
+    async def send(self, notification: Notification) -> Optional[str]:
+        """Deliver the notification; returns the provider's reference for it.
+
+        Raise PermanentDeliveryError for rejections, anything else is retried.
+        """
+        ...
+
+
+def raise_for_provider_status(response: httpx.Response) -> None:
+    """Client errors are permanent, except timeouts and rate limits; server errors are retried"""
+    if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+        raise PermanentDeliveryError(f"{response.status_code}: {response.text[:200]}")
+    response.raise_for_status()
+
+
+class ResendEmailProvider(NotificationProvider):
+    """Email through the Resend REST API"""
+
+    name = "resend"
+    channel = "email"
+
+    def __init__(self, clients: ProviderClientRegistry, api_key: Optional[str], sender: str,
+                 base_url: str = "https://api.resend.com", max_concurrency: int = 4):
+        self.clients = clients
+        self.api_key = api_key
+        self.sender = sender
+        self.max_concurrency = max_concurrency
+        if api_key:
+            clients.register(self.name, ProviderEndpoint(
+                base_url, headers={"Authorization": f"Bearer {api_key}"}, max_connections=max_concurrency,
+            ))
+
+    async def send(self, notification):
+        if not self.api_key:
+            raise PermanentDeliveryError("Resend is not configured")
+        params = {"from": self.sender, "to": [notification.to], **notification.payload}
+        response = await self.clients.client(self.name).post("/emails", json=params)
+        raise_for_provider_status(response)
+        return response.json().get("id")
+
+
+class TwilioVerifyProvider(NotificationProvider):
+    """SMS codes through the Twilio Verify REST API, which generates and checks the code itself"""
+
+    name = "twilio-verify"
+    channel = "sms"
+
+    def __init__(self, clients: ProviderClientRegistry, account_sid: Optional[str], auth_token: Optional[str],
+                 service_sid: Optional[str], base_url: str = "https://verify.twilio.com", max_concurrency: int = 4):
+        self.clients = clients
+        self.service_sid = service_sid
+        self.max_concurrency = max_concurrency
+        self.configured = bool(account_sid and auth_token and service_sid)
+        if self.configured:
+            clients.register(self.name, ProviderEndpoint(
+                base_url, auth=(account_sid, auth_token), max_connections=max_concurrency,
+            ))
+
+    async def send(self, notification):
+        if not self.configured:
+            raise PermanentDeliveryError("Twilio Verify is not configured")
+        response = await self.clients.client(self.name).post(
+            f"/v2/Services/{self.service_sid}/Verifications", data={"To": notification.to, "Channel": "sms"}
+        )
+        raise_for_provider_status(response)
+        return response.json().get("sid")
+
+    async def check(self, phone: str, code: str) -> bool:
+        if not self.configured:
+            return False
+        response = await self.clients.client(self.name).post(
+            f"/v2/Services/{self.service_sid}/VerificationCheck", data={"To": phone, "Code": code}
+        )
+        # 404: no pending verification for this number (expired or already used)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return response.json().get("status") == "approved"
+
+
+class FakeProvider(NotificationProvider):
+    """Records deliveries in memory; for local development and tests.
+
+    As an SMS provider it also plays Twilio Verify: it makes up a code per
+    phone number and `check` accepts only that code.
+    """
+
+    name = "fake"
+
+    def __init__(self, channel: str, fail_times: int = 0, max_concurrency: int = 4):
+        self.channel = channel
+        self.fail_times = fail_times
+        self.max_concurrency = max_concurrency
+        self.sent: List[Notification] = []
+        self.codes: Dict[str, str] = {}
+
+    async def send(self, notification):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("fake provider failure")
+        if self.channel == "sms":
+            self.codes[notification.to] = str(random.randint(100000, 999999))
+        self.sent.append(notification)
+        return f"fake-{len(self.sent)}"
+
+    async def check(self, phone: str, code: str) -> bool:
+        return self.codes.get(phone) == code
+
+
+class NotificationQueue:
+    """Delivers notifications in the background so request handlers only enqueue.
+
+    A fixed pool of workers drains the queue; each provider additionally
+    caps how many of its calls run at once. Failed deliveries are retried
+    with exponential backoff and jitter up to `max_attempts`. Every
+    notification's status stays queryable for `status_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, NotificationProvider],
+        workers: int = 4,
+        max_pending: int = 1_000,
+        max_attempts: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        status_ttl: float = 3_600,
+    ):
+        self.providers = providers
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._statuses = TTLCache(max_entries=max(max_pending * 10, 1), ttl=status_ttl)
+        self._limits = {channel: asyncio.Semaphore(provider.max_concurrency) for channel, provider in providers.items()}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending = 0
+        self._tasks: List[asyncio.Task] = []
+        self._retries: set = set()
+        self.stats = {"enqueued": 0, "delivered": 0, "failed": 0, "retried": 0, "rejected": 0}
+
+    def enqueue(self, channel: str, to: str, payload: dict, owner_id: Optional[str] = None) -> Notification:
+        if channel not in self.providers:
+            raise ValueError(f"No provider for channel {channel!r}")
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise NotificationQueueFull()
+        notification = Notification(channel=channel, to=to, payload=payload, owner_id=owner_id)
+        self._pending += 1
+        self.stats["enqueued"] += 1
+        self._statuses.set(notification.id, notification)
+        self._queue.put_nowait(notification)
+        return notification
+
+    def get(self, notification_id: str) -> Optional[Notification]:
+        return self._statuses.get(notification_id)
+
+    def metrics(self) -> dict:
+        return {**self.stats, "pending": self._pending, "queued": self._queue.qsize()}
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _mark(self, notification: Notification, status: str, error: Optional[str] = None) -> None:
+        notification.status = status
+        notification.last_error = error
+        notification.updated_at = datetime.now(timezone.utc)
+
+    async def _retry_later(self, notification: Notification, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(notification)
+
+    async def deliver(self, notification: Notification) -> None:
+        provider = self.providers[notification.channel]
+        notification.attempts += 1
+        self._mark(notification, SENDING)
+        try:
+            async with self._limits[notification.channel]:
+                notification.provider_ref = await provider.send(notification)
+        except PermanentDeliveryError as e:
+            self._finish(notification, FAILED, str(e))
+        except Exception as e:
+            if notification.attempts >= self.max_attempts:
+                self._finish(notification, FAILED, str(e))
+                return
+            self.stats["retried"] += 1
+            self._mark(notification, RETRYING, str(e))
+            task = asyncio.create_task(self._retry_later(notification, self._backoff(notification.attempts)))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+        else:
+            self._finish(notification, DELIVERED)
+
+    def _finish(self, notification: Notification, status: str, error: Optional[str] = None) -> None:
+        self._mark(notification, status, error)
+        self._pending -= 1
+        self.stats[status] += 1
+        if status == FAILED:
+            logger.warning("%s delivery %s failed after %d attempts: %s", notification.channel, notification.id, notification.attempts, error)
+
+    async def _worker(self):
+        while True:
+            notification = await self._queue.get()
+            try:
+                await self.deliver(notification)
+            except Exception:
+                logger.exception("Notification worker error")
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def drain(self) -> None:
+        """Wait until nothing is queued or waiting to be retried"""
+        while self._pending:
+            await self._queue.join()
+            if self._retries:
+                await asyncio.gather(*list(self._retries), return_exceptions=True)
+
+    async def stop(self) -> None:
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
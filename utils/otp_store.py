@@ -0,0 +1,158 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import hmac
+import logging
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of OTPStore.verify
+VERIFIED, INVALID, EXPIRED, TOO_MANY_ATTEMPTS = "verified", "invalid", "expired", "too_many_attempts"
+
+
+def hash_code(key: str, code: str) -> str:
+    return hashlib.sha256(f"{key}:{code}".encode()).hexdigest()
+
+
+class OTPStore(ABC):
+    """Short-lived one-time codes keyed by purpose, user and destination.
+
+    Only a hash of each code is kept. Every verification attempt counts
+    against `max_attempts`, and a code is consumed by the first correct try.
+    Issuing a new code for a key replaces the old one and resets attempts.
+    """
+
+    def __init__(self, max_attempts: int = 5):
+        self.max_attempts = max_attempts
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def issue(self, key: str, code: str, ttl: timedelta) -> None:
+        ...
+
+    @abstractmethod
+    async def verify(self, key: str, code: str) -> str:
+        """VERIFIED, INVALID, EXPIRED or TOO_MANY_ATTEMPTS"""
+        ...
+
+    @abstractmethod
+    async def sweep(self) -> int:
+        """Delete expired codes; returns how many were removed"""
+        ...
+
+    async def _sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await self.sweep()
+                if removed:
+                    logger.info("Swept %d expired OTP codes", removed)
+            except Exception:
+                logger.exception("OTP sweep failed")
+
+    def start(self, sweep_interval: float = 300) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever(sweep_interval))
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+
+class InMemoryOTPStore(OTPStore):
+    """Process-local backend; codes are lost on restart and not shared between workers"""
+
+    def __init__(self, max_attempts: int = 5):
+        super().__init__(max_attempts)
+        # key -> (code hash, expires at, attempts)
+        self._codes: Dict[str, Tuple[str, datetime, int]] = {}
+
+    def __len__(self):
+        return len(self._codes)
+
+    async def issue(self, key, code, ttl):
+        self._codes[key] = (hash_code(key, code), datetime.now(timezone.utc) + ttl, 0)
+
+    async def verify(self, key, code):
+        entry = self._codes.get(key)
+        if entry is None:
+            return INVALID
+        code_hash, expires_at, attempts = entry
+        if expires_at <= datetime.now(timezone.utc):
+            del self._codes[key]
+            return EXPIRED
+        if attempts >= self.max_attempts:
+            return TOO_MANY_ATTEMPTS
+        if hmac.compare_digest(code_hash, hash_code(key, code)):
+            del self._codes[key]
+            return VERIFIED
+        self._codes[key] = (code_hash, expires_at, attempts + 1)
+        return INVALID
+
+    async def sweep(self):
+        now = datetime.now(timezone.utc)
+        expired = [key for key, (_, expires_at, _) in self._codes.items() if expires_at <= now]
+        for key in expired:
+            del self._codes[key]
+        return len(expired)
+
+
+class PostgresOTPStore(OTPStore):
+    """Codes in the compact otp_codes table, shared by every worker process"""
+
+    def __init__(self, engine: AsyncEngine, max_attempts: int = 5):
+        # Imported here so the in-memory backend works without a database configured
+        from models_pg import OTPCode
+
+        super().__init__(max_attempts)
+        self.engine = engine
+        self.model = OTPCode
+
+    async def issue(self, key, code, ttl):
+        values = {"key": key, "code_hash": hash_code(key, code), "expires_at": datetime.now(timezone.utc) + ttl, "attempts": 0}
+        statement = pg_insert(self.model).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.model.key],
+            set_={"code_hash": statement.excluded.code_hash, "expires_at": statement.excluded.expires_at, "attempts": 0},
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(statement)
+
+    async def verify(self, key, code):
+        async with self.engine.begin() as conn:
+            # Count the attempt and read the hash in one statement; concurrent
+            # guesses each take their own attempt
+            result = await conn.execute(
+                update(self.model)
+                .where(self.model.key == key, self.model.expires_at > datetime.now(timezone.utc), self.model.attempts < self.max_attempts)
+                .values(attempts=self.model.attempts + 1)
+                .returning(self.model.code_hash)
+            )
+            code_hash = result.scalar_one_or_none()
+            if code_hash is not None:
+                if not hmac.compare_digest(code_hash, hash_code(key, code)):
+                    return INVALID
+                await conn.execute(delete(self.model).where(self.model.key == key, self.model.code_hash == code_hash))
+                return VERIFIED
+
+            # Failure path only: tell expired and exhausted codes apart
+            result = await conn.execute(select(self.model.expires_at, self.model.attempts).where(self.model.key == key))
+            row = result.one_or_none()
+        if row is None:
+            return INVALID
+        if row.expires_at <= datetime.now(timezone.utc):
+            return EXPIRED
+        return TOO_MANY_ATTEMPTS
+
+    async def sweep(self):
+        async with self.engine.begin() as conn:
+            result = await conn.execute(delete(self.model).where(self.model.expires_at <= datetime.now(timezone.utc)))
+        return result.rowcount
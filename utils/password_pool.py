@@ -0,0 +1,63 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import asyncio
+
+from .auth import get_password_hash, verify_password
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised instead of queueing more password work than the pool can absorb"""
+
+
+class PasswordPool:
+    """Runs bcrypt hashing and verification away from the event loop.
+
+    At most `workers` operations run at once and up to `max_pending` more
+    may wait for a worker; anything beyond that is refused straight away
+    with PasswordPoolSaturated so a login storm cannot queue without bound.
+    With `workers=0` the work runs inline on the event loop as before.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, use_processes: bool = True):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self.stats = {"hashed": 0, "verified": 0, "rejected": 0}
+
+    def start(self) -> None:
+        if self.workers and self._executor is None:
+            pool = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.workers)
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            # Waiting for the workers to exit blocks, so do it off the event loop
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def metrics(self) -> dict:
+        return {**self.stats, "in_flight": self._in_flight, "workers": self.workers}
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        if self._in_flight >= self.workers + self.max_pending:
+            self.stats["rejected"] += 1
+            raise PasswordPoolSaturated()
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(get_password_hash, password)
+        self.stats["hashed"] += 1
+        return hashed
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        result = await self._run(verify_password, plain_password, hashed_password)
+        self.stats["verified"] += 1
+        return result
@@ -0,0 +1,81 @@
+from typing import Optional
+import asyncio
+import logging
+import threading
+import time
+
+import phonenumbers
+from phonenumbers import PhoneNumberType, carrier, geocoder
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = {"country_code": "Unknown", "country_name": "Unknown", "carrier": "", "is_valid": False}
+
+
+class PhoneMetadataService:
+    """Country and carrier lookups for phone numbers.
+
+    phonenumbers loads its geocoder and carrier tables lazily, per country,
+    on first use. `warm` loads them all up front (in a background thread via
+    `start`), and lookups are memoized per number in E.164 form. The tables
+    match prefixes of varying length and only describe valid numbers, so no
+    shorter key gives the same answer for every number that shares it. Until
+    warm-up finishes, uncached lookups run in a worker thread so the event
+    loop never blocks on a table load.
+    """
+
+    def __init__(self, max_entries: int = 10_000, language: str = "en"):
+        self.language = language
+        self._by_number = TTLCache(max_entries=max_entries)
+        self._warmed = threading.Event()
+        self.warmup_seconds: Optional[float] = None
+
+    @property
+    def warmed(self) -> bool:
+        return self._warmed.is_set()
+
+    def warm(self) -> None:
+        """Touch the geocoder and carrier tables of every supported region"""
+        started = time.perf_counter()
+        for region in phonenumbers.SUPPORTED_REGIONS:
+            for number_type in (PhoneNumberType.FIXED_LINE, PhoneNumberType.MOBILE):
+                example = phonenumbers.example_number_for_type(region, number_type)
+                if example is not None:
+                    geocoder.description_for_number(example, self.language)
+                    carrier.name_for_number(example, self.language)
+        self.warmup_seconds = time.perf_counter() - started
+        self._warmed.set()
+        logger.info("Phone metadata warmed in %.2fs", self.warmup_seconds)
+
+    def start(self) -> None:
+        if not self.warmed:
+            threading.Thread(target=self.warm, name="phone-metadata-warmup", daemon=True).start()
+
+    def _describe(self, parsed) -> dict:
+        return {
+            "country_code": phonenumbers.region_code_for_number(parsed),
+            "country_name": geocoder.description_for_number(parsed, self.language),
+            "carrier": carrier.name_for_number(parsed, self.language),
+        }
+
+    def lookup_sync(self, phone_number: str) -> dict:
+        try:
+            parsed = phonenumbers.parse(phone_number, None)
+        except phonenumbers.NumberParseException:
+            return dict(UNKNOWN)
+        number = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+        described = self._by_number.get(number)
+        if described is None:
+            described = {**self._describe(parsed), "is_valid": phonenumbers.is_valid_number(parsed)}
+            self._by_number.set(number, described)
+        return dict(described)
+
+    async def lookup(self, phone_number: str) -> dict:
+        if self.warmed:
+            return self.lookup_sync(phone_number)
+        return await asyncio.to_thread(self.lookup_sync, phone_number)
+
+    def metrics(self) -> dict:
+        return {**self._by_number.metrics(), "warmed": self.warmed, "warmup_seconds": self.warmup_seconds}
@@ -0,0 +1,69 @@
+from typing import Iterable, List
+from sqlalchemy import DateTime, select
+
+from models.user import UserPublic
+from models_pg import User
+
+_LIST_FIELDS = {"photos", "prompts", "lifestyle_tags", "preferred_gender"}
+_BOOL_FIELDS = {"is_premium", "face_verified", "email_verified", "phone_verified", "is_banned"}
+
+
+def _as_list(value):
+    return value or []
+
+
+def _as_bool(value):
+    return bool(value)
+
+
+def _as_isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _identity(value):
+    return value
+
+
+class CardProjection:
+    """A fixed set of users columns, selected as plain rows and emitted as dicts.
+
+    Reading rows instead of ORM entities skips identity-map bookkeeping and
+    never fetches the columns a response does not carry (password hash, OTPs,
+    unrelated JSON).
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        self.columns = tuple(getattr(User, field) for field in self.fields)
+        self._converters = tuple(self._converter(field) for field in self.fields)
+
+    @staticmethod
+    def _converter(field):
+        if field in _LIST_FIELDS:
+            return _as_list
+        if field in _BOOL_FIELDS:
+            return _as_bool
+        if isinstance(getattr(User, field).type, DateTime):
+            return _as_isoformat
+        return _identity
+
+    def select(self):
+        return select(*self.columns)
+
+    def to_dict(self, row) -> dict:
+        return {field: convert(value) for field, convert, value in zip(self.fields, self._converters, row)}
+
+    def to_dicts(self, rows) -> List[dict]:
+        return [self.to_dict(row) for row in rows]
+
+
+# Discovery cards follow the public profile shape
+PROFILE_CARD = CardProjection(UserPublic.model_fields)
+
+# Counterpart summary shown in the matches list
+MATCH_CARD = CardProjection(["id", "first_name", "age", "photos", "last_active"])
+
+ADMIN_USER_ROW = CardProjection([
+    "id", "email", "phone", "role", "first_name", "email_verified", "phone_verified",
+    "face_verified", "is_premium", "is_banned", "created_at",
+])
@@ -0,0 +1,77 @@
+from typing import Optional
+
+from sqlalchemy import JSON, cast, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
+from sqlalchemy.sql import Update
+
+from models_pg import User
+
+EDITABLE_FIELDS = (
+    "age", "gender", "orientation", "location", "income_bracket", "net_worth",
+    "allowance_expectation", "lifestyle_tags", "height", "education", "smoking",
+    "drinking", "photos", "video_url", "voice_url", "prompts", "preferred_gender",
+    "preferred_age_min", "preferred_age_max",
+)
+_LIST_FIELDS = {"photos", "prompts", "lifestyle_tags", "preferred_gender"}
+_PATCH_OPS = ("append", "remove")
+
+
+class ProfilePatchError(ValueError):
+    """A list-field patch that is not {"append": [...]} or {"remove": [...]}"""
+
+
+def _list_value(field: str, value) -> Optional[object]:
+    """The new jsonb value for a list field: a replacement or an in-place patch"""
+    if not isinstance(value, dict):
+        return literal(value, JSONB)
+    if len(value) != 1 or next(iter(value)) not in _PATCH_OPS or not isinstance(next(iter(value.values())), list):
+        raise ProfilePatchError(f"{field} patch must be {{\"append\": [...]}} or {{\"remove\": [...]}}")
+    op, items = next(iter(value.items()))
+    if not items:
+        return None
+
+    current = func.coalesce(cast(getattr(User, field), JSONB), literal([], JSONB))
+    if op == "append":
+        return current.op("||")(literal(items, JSONB))
+    # render_derived names the columns (AS element(value, position)); a bare
+    # alias would leave the function's single output column named "element"
+    element = func.jsonb_array_elements(current).table_valued("value", with_ordinality="position").render_derived(name="element")
+    removed = func.jsonb_array_elements(literal(items, JSONB)).table_valued("value").render_derived(name="removed")
+    return (
+        select(func.coalesce(func.jsonb_agg(aggregate_order_by(element.c.value, element.c.position)), literal([], JSONB)))
+        .where(element.c.value.not_in(select(removed.c.value)))
+        .scalar_subquery()
+    )
+
+
+def profile_update(user_id: str, data: dict) -> Optional[Update]:
+    """One UPDATE ... RETURNING for the editable fields present in `data`.
+
+    Only the given columns are written, list patches are applied in SQL
+    without reading the array first, and the WHERE clause requires at least
+    one value to differ from what is stored, so an unchanged body matches no
+    row and writes nothing. Returns None when there is nothing to apply.
+    """
+    values, changed = {}, []
+    for field in EDITABLE_FIELDS:
+        if field not in data:
+            continue
+        column = getattr(User, field)
+        if field in _LIST_FIELDS:
+            new_value = _list_value(field, data[field])
+            if new_value is None:
+                continue
+            values[field] = cast(new_value, JSON)
+            changed.append(cast(column, JSONB).is_distinct_from(new_value))
+        else:
+            values[field] = data[field]
+            changed.append(column.is_distinct_from(data[field]))
+
+    if not values:
+        return None
+    return (
+        update(User)
+        .where(User.id == user_id, or_(*changed))
+        .values(**values, version=User.version + 1)
+        .returning(*User.__table__.c)
+    )
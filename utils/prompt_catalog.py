@@ -0,0 +1,169 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import threading
+
+from pydantic import ValidationError
+
+from models.prompt import PROMPT_LIBRARY, PromptTemplate
+
+logger = logging.getLogger(__name__)
+
+
+class PromptCatalogError(ValueError):
+    """A catalog source that cannot be loaded, or a profile prompt that is not in the catalog"""
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    body: bytes
+    etag: str
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: str
+    prompts: Tuple[dict, ...]
+    by_id: Dict[str, dict]
+    id_by_question: Dict[str, str]
+    # None is the whole catalog; other keys are category names
+    encoded: Dict[Optional[str], EncodedBody]
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+def _encode(payload) -> EncodedBody:
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    return EncodedBody(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+EMPTY = _encode([])
+
+
+def _build(entries: List[dict]) -> CatalogSnapshot:
+    prompts = []
+    for entry in entries:
+        if not isinstance(entry, dict) or "id" not in entry:
+            raise PromptCatalogError(f"Prompt without an id: {entry!r}")
+        try:
+            prompts.append(PromptTemplate(**entry).model_dump())
+        except ValidationError as e:
+            raise PromptCatalogError(f"Invalid prompt {entry['id']!r}: {e}") from e
+    by_id = {prompt["id"]: prompt for prompt in prompts}
+    if len(by_id) != len(prompts):
+        raise PromptCatalogError("Prompt ids must be unique")
+
+    encoded = {None: _encode(prompts)}
+    for category in dict.fromkeys(prompt["category"] for prompt in prompts):
+        encoded[category] = _encode([prompt for prompt in prompts if prompt["category"] == category])
+    canonical = json.dumps(prompts, sort_keys=True, separators=(",", ":")).encode()
+    return CatalogSnapshot(
+        version=hashlib.sha256(canonical).hexdigest()[:12],
+        prompts=tuple(prompts),
+        by_id=by_id,
+        id_by_question={prompt["question"]: prompt["id"] for prompt in prompts},
+        encoded=encoded,
+    )
+
+
+class PromptCatalog:
+    """Profile prompt templates, loaded once and served as pre-encoded JSON.
+
+    The source is a JSON file of {"id", "category", "question"} objects, or
+    PROMPT_LIBRARY when no path is given. `reload` builds a new snapshot and
+    swaps it in whole, so readers never see a half-loaded catalog; a bad
+    source leaves the current one in place. Profiles store prompt answers as
+    {"prompt_id", "answer"} and `expand` adds the question text on the way
+    out. Retire prompts by keeping them in the source, or answers that point
+    at them lose their question.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._reload_lock = threading.Lock()
+        self._snapshot = self._load()
+
+    def _load(self) -> CatalogSnapshot:
+        if self.path is None:
+            return _build(PROMPT_LIBRARY)
+        try:
+            entries = json.loads(self.path.read_text())
+        except (OSError, ValueError) as e:
+            raise PromptCatalogError(f"Cannot read prompt catalog {self.path}: {e}") from e
+        if not isinstance(entries, list):
+            raise PromptCatalogError(f"Prompt catalog {self.path} must be a JSON list")
+        return _build(entries)
+
+    def reload(self) -> str:
+        """Re-read the source; returns the new version"""
+        with self._reload_lock:
+            snapshot = self._load()
+            previous, self._snapshot = self._snapshot.version, snapshot
+        if snapshot.version != previous:
+            logger.info("Prompt catalog reloaded: %s -> %s (%d prompts)", previous, snapshot.version, len(snapshot.prompts))
+        return snapshot.version
+
+    @property
+    def version(self) -> str:
+        return self._snapshot.version
+
+    def encoded(self, category: Optional[str] = None) -> EncodedBody:
+        """The catalog, or one category of it, as ready-to-send JSON bytes"""
+        return self._snapshot.encoded.get(category, EMPTY)
+
+    def get(self, prompt_id: str) -> Optional[dict]:
+        return self._snapshot.by_id.get(prompt_id)
+
+    def compact(self, answers):
+        """Profile prompt answers as {"prompt_id", "answer"} references.
+
+        Accepts a list of answers or a {"append"/"remove": [...]} patch of
+        them. Entries may name their prompt by `prompt_id` or by the exact
+        question text. Free-text answers saved before prompts were stored by
+        reference have a question the catalog doesn't know; they are kept
+        as they are, so a profile read and written back loses nothing.
+        """
+        if isinstance(answers, dict):
+            return {op: self.compact(items) for op, items in answers.items()}
+        if not isinstance(answers, list):
+            return answers
+        snapshot = self._snapshot
+        compacted = []
+        for entry in answers:
+            if not isinstance(entry, dict):
+                raise PromptCatalogError(f"Prompt answer must be an object: {entry!r}")
+            if "prompt_id" not in entry and entry.get("question") not in snapshot.id_by_question:
+                if not isinstance(entry.get("question"), str):
+                    raise PromptCatalogError(f"Prompt answer needs a prompt_id or a question: {entry!r}")
+                compacted.append(entry)
+                continue
+            prompt_id = entry.get("prompt_id") or snapshot.id_by_question.get(entry.get("question"))
+            if prompt_id not in snapshot.by_id:
+                raise PromptCatalogError(f"Unknown prompt: {entry.get('prompt_id') or entry.get('question')!r}")
+            compacted.append({"prompt_id": prompt_id, "answer": entry.get("answer", "")})
+        return compacted
+
+    def expand(self, answers) -> List[dict]:
+        """Stored answers with their prompt's category and question filled in"""
+        by_id = self._snapshot.by_id
+        expanded = []
+        for entry in answers or []:
+            prompt = by_id.get(entry.get("prompt_id")) if isinstance(entry, dict) else None
+            if prompt is None:
+                # Answers saved before prompts were stored by reference carry their own text
+                expanded.append(entry)
+                continue
+            expanded.append({**entry, "category": prompt["category"], "question": prompt["question"]})
+        return expanded
+
+    def metrics(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "prompts": len(snapshot.prompts),
+            "categories": len(snapshot.encoded) - 1,
+            "loaded_at": snapshot.loaded_at.isoformat(),
+        }
@@ -0,0 +1,59 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+
+@dataclass
+class ProviderEndpoint:
+    base_url: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    auth: Optional[Tuple[str, str]] = None
+    timeout: float = 10.0
+    max_connections: int = 20
+    keepalive_expiry: float = 60.0
+
+
+class ProviderClientRegistry:
+    """One long-lived, keep-alive HTTP client per outbound provider.
+
+    Clients are created once at startup and shared by every request, so
+    calls reuse pooled connections instead of paying a new TCP and TLS
+    handshake each time.
+    """
+
+    def __init__(self):
+        self.endpoints: Dict[str, ProviderEndpoint] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def register(self, name: str, endpoint: ProviderEndpoint) -> None:
+        if name in self._clients:
+            raise RuntimeError(f"Provider {name!r} is already started")
+        self.endpoints[name] = endpoint
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        try:
+            return self._clients[name]
+        except KeyError:
+            raise RuntimeError(f"Provider client {name!r} is not started") from None
+
+    async def start(self) -> None:
+        for name, endpoint in self.endpoints.items():
+            if name in self._clients:
+                continue
+            self._clients[name] = httpx.AsyncClient(
+                base_url=endpoint.base_url,
+                headers=endpoint.headers,
+                auth=endpoint.auth,
+                timeout=endpoint.timeout,
+                limits=httpx.Limits(
+                    max_connections=endpoint.max_connections,
+                    max_keepalive_connections=endpoint.max_connections,
+                    keepalive_expiry=endpoint.keepalive_expiry,
+                ),
+            )
+
+    async def close(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
@@ -0,0 +1,112 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import chain
+from typing import List, Optional, Sequence
+import numpy as np
+
+# Relative weight of each signal in the final score; each signal is in [0, 1]
+RANKING_WEIGHTS = {"tags": 0.4, "recency": 0.25, "age": 0.2, "media": 0.15}
+RECENCY_HALF_LIFE_HOURS = 72.0
+AGE_DISTANCE_SCALE = 5.0
+MAX_PHOTOS = 8
+
+
+@dataclass
+class ViewerPreferences:
+    lifestyle_tags: List[str] = field(default_factory=list)
+    preferred_age_min: Optional[int] = None
+    preferred_age_max: Optional[int] = None
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(
+            lifestyle_tags=list(user.lifestyle_tags or []),
+            preferred_age_min=user.preferred_age_min,
+            preferred_age_max=user.preferred_age_max,
+        )
+
+
+@dataclass
+class CandidateBatch:
+    """Column-oriented candidate data, one array entry per candidate"""
+    ids: List[str]
+    ages: np.ndarray           # float, NaN when unknown
+    last_active: np.ndarray    # epoch seconds, NaN when unknown
+    tag_values: np.ndarray     # every candidate's tags, flattened
+    tag_owners: np.ndarray     # candidate index for each entry of tag_values
+    photo_counts: np.ndarray
+    has_video: np.ndarray
+    has_voice: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]):
+        """Build a batch from (id, age, last_active, lifestyle_tags, photo count,
+        has video, has voice) rows, as selected by the server's RANKING_COLUMNS"""
+        n = len(rows)
+        ids, ages, last_active, tags, photos, video, voice = zip(*rows) if n else ((),) * 7
+        tags = [t if isinstance(t, list) else [] for t in tags]
+        return cls(
+            ids=list(ids),
+            ages=np.array([np.nan if a is None else a for a in ages], dtype=np.float64),
+            last_active=np.array(
+                [np.nan if t is None else t.timestamp() for t in last_active], dtype=np.float64
+            ),
+            tag_values=np.array(list(chain.from_iterable(tags)), dtype=object),
+            tag_owners=np.repeat(np.arange(n), [len(t) for t in tags]),
+            photo_counts=np.array(photos, dtype=np.float64),
+            has_video=np.array(video, dtype=bool),
+            has_voice=np.array(voice, dtype=bool),
+        )
+
+
+def score_candidates(viewer: ViewerPreferences, batch: CandidateBatch, now: Optional[datetime] = None) -> np.ndarray:
+    """Score every candidate in one vectorized pass"""
+    n = len(batch)
+    now = (now or datetime.now(timezone.utc)).timestamp()
+
+    # Share of the viewer's lifestyle tags the candidate also lists
+    if viewer.lifestyle_tags and batch.tag_values.size:
+        hits = np.isin(batch.tag_values, np.array(list(set(viewer.lifestyle_tags)), dtype=object))
+        overlap = np.bincount(batch.tag_owners, weights=hits.astype(np.float64), minlength=n)
+        tags = overlap / len(set(viewer.lifestyle_tags))
+    else:
+        tags = np.zeros(n)
+
+    # Halves every RECENCY_HALF_LIFE_HOURS since last activity
+    hours_idle = np.clip((now - batch.last_active) / 3600.0, 0.0, None)
+    recency = np.nan_to_num(np.exp2(-hours_idle / RECENCY_HALF_LIFE_HOURS), nan=0.0)
+
+    # Full marks inside the preferred range, decaying with distance outside it
+    low = -np.inf if viewer.preferred_age_min is None else viewer.preferred_age_min
+    high = np.inf if viewer.preferred_age_max is None else viewer.preferred_age_max
+    distance = np.maximum(np.maximum(low - batch.ages, batch.ages - high), 0.0)
+    age = np.nan_to_num(np.exp(-distance / AGE_DISTANCE_SCALE), nan=0.5)
+
+    media = (
+        0.6 * np.minimum(batch.photo_counts, MAX_PHOTOS) / MAX_PHOTOS
+        + 0.2 * batch.has_video
+        + 0.2 * batch.has_voice
+    )
+
+    return (
+        RANKING_WEIGHTS["tags"] * tags
+        + RANKING_WEIGHTS["recency"] * recency
+        + RANKING_WEIGHTS["age"] * age
+        + RANKING_WEIGHTS["media"] * media
+    )
+
+
+def rank_candidates(viewer: ViewerPreferences, batch: CandidateBatch, k: int, now: Optional[datetime] = None) -> List[str]:
+    """Ids of the k best-scoring candidates, best first"""
+    if not len(batch) or k <= 0:
+        return []
+    scores = score_candidates(viewer, batch, now)
+    if k < len(batch):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(batch))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [batch.ids[i] for i in top]
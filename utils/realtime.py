@@ -0,0 +1,53 @@
+from collections import defaultdict
+from typing import Dict, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionHub:
+    """Fan-out of chat events to the open push connections of each user.
+
+    Every connection owns a bounded queue; publishing never waits on a slow
+    client. A connection whose queue is full is closed so the client
+    reconnects and resumes from its last seen message instead of silently
+    missing events.
+    """
+
+    def __init__(self, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._connections: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.max_pending)
+        self._connections[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._connections.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._connections[user_id]
+
+    def publish(self, user_id: str, event: dict) -> int:
+        """Queue an event for every connection of the user; returns how many got it"""
+        delivered = 0
+        for queue in list(self._connections.get(user_id, ())):
+            try:
+                queue.put_nowait(event)
+                delivered += 1
+            except asyncio.QueueFull:
+                logger.warning("Dropping slow push connection for user %s", user_id)
+                self.unsubscribe(user_id, queue)
+                # The sentinel tells the connection loop to close
+                queue.get_nowait()
+                queue.put_nowait(None)
+        return delivered
+
+    def connection_count(self, user_id: str = None) -> int:
+        if user_id is not None:
+            return len(self._connections.get(user_id, ()))
+        return sum(len(queues) for queues in self._connections.values())
@@ -0,0 +1,141 @@
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# flush(entries) persists one batch; entries maps key -> coalesced value
+BatchWriter = Callable[[Dict[Hashable, object]], Awaitable[None]]
+
+
+def keep_latest(old, new):
+    return new
+
+
+class WriteBehindBuffer:
+    """Collects writes in memory, coalesced per key, and persists them in batches.
+
+    `add` never touches the database. A background task hands everything
+    buffered to `flush` every `interval` seconds, or sooner once
+    `max_entries` keys are waiting. Entries from a failed flush are kept for
+    the next attempt as long as there is room for them.
+    """
+
+    def __init__(
+        self,
+        flush: BatchWriter,
+        interval: float = 1.0,
+        max_entries: int = 10_000,
+        merge: Callable[[object, object], object] = keep_latest,
+        name: str = "write-behind",
+    ):
+        self.writer = flush
+        self.interval = interval
+        self.max_entries = max_entries
+        self.merge = merge
+        self.name = name
+        # key -> (value, monotonic time the key was first buffered)
+        self._entries: Dict[Hashable, Tuple[object, float]] = {}
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {
+            "added": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "flushed_entries": 0,
+            "failed_flushes": 0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key: Hashable, value) -> None:
+        self.stats["added"] += 1
+        current = self._entries.get(key)
+        if current is not None:
+            self.stats["coalesced"] += 1
+            self._entries[key] = (self.merge(current[0], value), current[1])
+            return
+        if len(self._entries) >= self.max_entries:
+            # Still full after an early flush was requested: shed instead of growing
+            self.stats["dropped"] += 1
+            self._full.set()
+            return
+        self._entries[key] = (value, time.monotonic())
+        if len(self._entries) >= self.max_entries:
+            self._full.set()
+
+    def oldest_pending_seconds(self) -> float:
+        if not self._entries:
+            return 0.0
+        return time.monotonic() - min(since for _, since in self._entries.values())
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "pending": len(self._entries),
+            "oldest_pending_seconds": round(self.oldest_pending_seconds(), 3),
+        }
+
+    async def flush(self) -> int:
+        """Persist everything buffered so far; returns the number of keys written"""
+        async with self._lock:
+            self._full.clear()
+            if not self._entries:
+                return 0
+            batch, self._entries = self._entries, {}
+            try:
+                await self.writer({key: value for key, (value, _) in batch.items()})
+            except Exception:
+                self.stats["failed_flushes"] += 1
+                logger.exception("%s flush of %d entries failed", self.name, len(batch))
+                self._requeue(batch)
+                return 0
+
+            now = time.monotonic()
+            lag = now - min(since for _, since in batch.values())
+            self.stats["flushes"] += 1
+            self.stats["flushed_entries"] += len(batch)
+            self.stats["last_lag_seconds"] = round(lag, 3)
+            self.stats["max_lag_seconds"] = round(max(self.stats["max_lag_seconds"], lag), 3)
+            return len(batch)
+
+    def _requeue(self, batch: Dict[Hashable, Tuple[object, float]]) -> None:
+        for key, (value, since) in batch.items():
+            current = self._entries.get(key)
+            if current is not None:
+                self._entries[key] = (self.merge(value, current[0]), since)
+            elif len(self._entries) < self.max_entries:
+                self._entries[key] = (value, since)
+            else:
+                self.stats["dropped"] += 1
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            if not self._stopping:
+                await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out whatever is still buffered"""
+        if self._task is not None:
+            # Let an in-flight flush finish rather than cancelling it mid-write
+            self._stopping = True
+            self._full.set()
+            await self._task
+            self._task = None
+        await self.flush()